@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import functools
+import json
 import logging
 from typing import Dict, List, Optional
 
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import (
 	AIMessage,
 	BaseMessage,
@@ -12,23 +15,46 @@ from langchain_core.messages import (
 )
 from pydantic import BaseModel
 
-from browser_use.agent.message_manager.views import MessageMetadata
-from browser_use.agent.prompts import AgentMessagePrompt
+from browser_use.agent.message_manager.utils import CacheMarker, TokenCounter, get_token_counter, image_token_cost
+from browser_use.agent.message_manager.views import ManagedMessage, MessageMetadata
+from browser_use.agent.prompts import AgentMessagePrompt, ElementsDiff, ElementsSnapshot
 from browser_use.agent.views import ActionResult, AgentOutput, AgentStepInfo, MessageManagerState
-from browser_use.browser.views import BrowserState
+from browser_use.browser.views import BrowserState, image_dimensions
 from browser_use.utils import time_execution_sync
 
 logger = logging.getLogger(__name__)
 
+HISTORY_PLACEHOLDER = '[Your task history memory starts here]'
+HISTORY_SUMMARY_HEADER = '[Summary of earlier steps]'
+HISTORY_SUMMARY_PROMPT = (
+	'You compress the history of a browser automation agent. Rewrite the steps below as a short summary that keeps '
+	'every fact the agent found out, what it already tried, what failed and what is left to do. Drop anything redundant. '
+	'Answer with the summary only.'
+)
+
 
 class MessageManagerSettings(BaseModel):
 	max_input_tokens: int = 128000
+	# Token counting: token_counter if given, else a local tokenizer for model_name (tiktoken),
+	# else estimated_characters_per_token. image_tokens is used when an image's size cannot be read.
+	model_name: Optional[str] = None
+	token_counter: Optional[TokenCounter] = None
 	estimated_characters_per_token: int = 3
 	image_tokens: int = 800
 	include_attributes: list[str] = []
 	message_context: Optional[str] = None
 	sensitive_data: Optional[Dict[str, str]] = None
 	available_file_paths: Optional[List[str]] = None
+	# Send only the elements that changed since the last full page snapshot, which stays in history
+	state_diff: bool = False
+	full_state_interval: int = 5  # Send a full snapshot at least every N steps
+	max_state_diff_ratio: float = 0.5  # Send a full snapshot when more than this share of the page changed
+	# Summarize older steps into one memory message once history uses this share of max_input_tokens (None disables it)
+	history_compaction_ratio: Optional[float] = None
+	keep_recent_steps: int = 5  # Steps kept verbatim after the summary
+	max_summary_lines: int = 40
+	# Marks prompt cache breakpoints in the messages sent to the LLM, for providers that need explicit markers
+	cache_marker: Optional[CacheMarker] = None
 
 
 class MessageManager:
@@ -44,6 +70,19 @@ class MessageManager:
 		self.state = state
 		self.system_prompt = system_message
 
+		# Counts are memoized per text and image, messages are recounted when trimmed or stripped of images.
+		# The default counter memoizes itself, once its tokenizer has replaced the characters estimate
+		if settings.token_counter:
+			self._cached_text_tokens = functools.lru_cache(maxsize=1024)(settings.token_counter)
+		else:
+			self._cached_text_tokens = get_token_counter(settings.model_name, settings.estimated_characters_per_token)
+		self._cached_image_tokens = functools.lru_cache(maxsize=32)(self._image_tokens)
+
+		# Last full page snapshot and its message, the reference for diffs when state_diff is enabled
+		self._state_reference: Optional[ElementsSnapshot] = None
+		self._state_reference_message: Optional[ManagedMessage] = None
+		self._steps_since_full_state = 0
+
 		# Only initialize messages if state is empty
 		if len(self.state.history.messages) == 0:
 			self._init_messages()
@@ -93,7 +132,7 @@ class MessageManager:
 		self._add_message_with_tokens(example_tool_call)
 		self.add_tool_message(content='Browser started')
 
-		placeholder_message = HumanMessage(content='[Your task history memory starts here]')
+		placeholder_message = HumanMessage(content=HISTORY_PLACEHOLDER)
 		self._add_message_with_tokens(placeholder_message)
 
 		if self.settings.available_file_paths:
@@ -133,15 +172,49 @@ class MessageManager:
 						self._add_message_with_tokens(msg)
 					result = None  # if result in history, we dont want to add it again
 
+		snapshot = None
+		elements_diff = None
+		if self.settings.state_diff:
+			snapshot = ElementsSnapshot.from_state(state, self.settings.include_attributes)
+			elements_diff = self._get_state_diff(snapshot)
+
 		# otherwise add state message and result to next message (which will not stay in memory)
 		state_message = AgentMessagePrompt(
 			state,
 			result,
 			include_attributes=self.settings.include_attributes,
 			step_info=step_info,
+			snapshot=snapshot,
+			elements_diff=elements_diff,
 		).get_user_message(use_vision)
 		self._add_message_with_tokens(state_message)
 
+		if snapshot is not None and elements_diff is None:
+			# Full snapshot: it replaces the previous one as the reference kept in history
+			if self._state_reference_message is not None:
+				self.state.history.remove_message(self._state_reference_message)
+			self._state_reference = snapshot
+			self._state_reference_message = self.state.history.messages[-1]
+			self._steps_since_full_state = 0
+		elif elements_diff is not None:
+			self._steps_since_full_state += 1
+
+	def _get_state_diff(self, snapshot: ElementsSnapshot) -> Optional[ElementsDiff]:
+		"""Diff to the last full snapshot, or None when a full snapshot should be sent instead"""
+		reference = self._state_reference
+		if reference is None or reference.url != snapshot.url:
+			return None
+		# The reference message can be gone, e.g. trimmed by cut_messages
+		if not any(msg is self._state_reference_message for msg in self.state.history.messages):
+			return None
+		if self._steps_since_full_state + 1 >= self.settings.full_state_interval:
+			return None
+
+		elements_diff = snapshot.diff(reference)
+		if len(elements_diff) > self.settings.max_state_diff_ratio * max(len(snapshot), 1):
+			return None
+		return elements_diff
+
 	def add_model_output(self, model_output: AgentOutput) -> None:
 		"""Add model output as AI message"""
 		tool_calls = [
@@ -168,7 +241,7 @@ class MessageManager:
 			self._add_message_with_tokens(msg, position)
 
 	@time_execution_sync('--get_messages')
-	def get_messages(self) -> List[BaseMessage]:
+	def get_messages(self, cache_markers: bool = True) -> List[BaseMessage]:
 		"""Get current message list, potentially trimmed to max tokens"""
 
 		msg = [m.message for m in self.state.history.messages]
@@ -180,8 +253,43 @@ class MessageManager:
 			logger.debug(f'{m.message.__class__.__name__} - Token count: {m.metadata.tokens}')
 		logger.debug(f'Total input tokens: {total_input_tokens}')
 
+		if cache_markers and self.settings.cache_marker:
+			msg = self._mark_cache_breakpoints(msg)
 		return msg
 
+	def _is_initial_message(self, managed_message: ManagedMessage) -> bool:
+		content = managed_message.message.content
+		return isinstance(content, str) and content.startswith('Here are file paths you can use:')
+
+	def _prefix_length(self) -> int:
+		"""Number of initial messages, which stay the same for the whole run"""
+		messages = self.state.history.messages
+		for i, managed_message in enumerate(messages):
+			if managed_message.message.content == HISTORY_PLACEHOLDER:
+				end = i + 1
+				while end < len(messages) and self._is_initial_message(messages[end]):
+					end += 1
+				return end
+		return 1
+
+	def _mark_cache_breakpoints(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+		"""Mark the system prompt (shared between agents), the initial messages (shared between steps) and the history
+		before the current state (shared with the next step until it is compacted). Stored messages are not changed."""
+		assert self.settings.cache_marker is not None
+		marked = list(messages)
+		marked_indices: set[int] = set()
+		for index in sorted({0, self._prefix_length() - 1, len(messages) - 2}):
+			# Walk back to the nearest message that can carry a marker, e.g. skipping empty tool messages
+			for i in range(index, -1, -1):
+				if i in marked_indices:
+					break
+				message = self.settings.cache_marker(messages[i])
+				if message is not None:
+					marked[i] = message
+					marked_indices.add(i)
+					break
+		return marked
+
 	def _add_message_with_tokens(self, message: BaseMessage, position: int | None = None) -> None:
 		"""Add message with token count metadata
 		position: None for last, -1 for second last, etc.
@@ -223,7 +331,7 @@ class MessageManager:
 		if isinstance(message.content, list):
 			for item in message.content:
 				if 'image_url' in item:
-					tokens += self.settings.image_tokens
+					tokens += self._image_item_tokens(item)
 				elif isinstance(item, dict) and 'text' in item:
 					tokens += self._count_text_tokens(item['text'])
 		else:
@@ -235,8 +343,20 @@ class MessageManager:
 
 	def _count_text_tokens(self, text: str) -> int:
 		"""Count tokens in a text string"""
-		tokens = len(text) // self.settings.estimated_characters_per_token  # Rough estimate if no tokenizer available
-		return tokens
+		return self._cached_text_tokens(text)
+
+	def _image_item_tokens(self, item: dict) -> int:
+		image_url = item['image_url']
+		return self._cached_image_tokens(image_url.get('url', '') if isinstance(image_url, dict) else image_url)
+
+	def _image_tokens(self, url: str) -> int:
+		"""Tokens of an image from its dimensions, image_tokens for remote urls or unreadable images"""
+		dimensions = None
+		if url.startswith('data:') and ';base64,' in url:
+			dimensions = image_dimensions(url.split(';base64,', 1)[1])
+		if dimensions is None:
+			return self.settings.image_tokens
+		return image_token_cost(*dimensions, model_name=self.settings.model_name)
 
 	def cut_messages(self):
 		"""Get current message list, potentially trimmed to max tokens"""
@@ -252,11 +372,12 @@ class MessageManager:
 			for item in msg.message.content:
 				if 'image_url' in item:
 					msg.message.content.remove(item)
-					diff -= self.settings.image_tokens
-					msg.metadata.tokens -= self.settings.image_tokens
-					self.state.history.current_tokens -= self.settings.image_tokens
+					image_tokens = self._image_item_tokens(item)
+					diff -= image_tokens
+					msg.metadata.tokens -= image_tokens
+					self.state.history.current_tokens -= image_tokens
 					logger.debug(
-						f'Removed image with {self.settings.image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
+						f'Removed image with {image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
 					)
 				elif 'text' in item and isinstance(item, dict):
 					text += item['text']
@@ -295,10 +416,107 @@ class MessageManager:
 			f'Added message with {last_msg.metadata.tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens} - total messages: {len(self.state.history.messages)}'
 		)
 
+	def needs_compaction(self) -> bool:
+		ratio = self.settings.history_compaction_ratio
+		return ratio is not None and self.state.history.current_tokens > ratio * self.settings.max_input_tokens
+
+	async def compact_history(self, llm: Optional[BaseChatModel] = None) -> bool:
+		"""Replace all but the last keep_recent_steps steps with one summary message.
+
+		The summary is templated from the model outputs and action results; if llm is given it is asked to compress
+		it further. Returns False if there was nothing to compact.
+		"""
+		messages = self.state.history.messages
+		start = self._prefix_length()
+
+		# A step ends with the empty tool message that follows its model output
+		step_ends = [
+			i + 1
+			for i in range(start + 1, len(messages))
+			if isinstance(messages[i].message, ToolMessage)
+			and isinstance(messages[i - 1].message, AIMessage)
+			and messages[i - 1].message.tool_calls
+		]
+		if len(step_ends) <= self.settings.keep_recent_steps:
+			return False
+		end = step_ends[-self.settings.keep_recent_steps - 1]
+
+		compacted = messages[start:end]
+		# The full page snapshot is the reference for the following state diffs, so it stays
+		kept = [m for m in compacted if m is self._state_reference_message]
+		summary = self._summarize_history([m for m in compacted if m is not self._state_reference_message])
+		if llm is not None:
+			try:
+				response = await llm.ainvoke([SystemMessage(content=HISTORY_SUMMARY_PROMPT), HumanMessage(content=summary)])
+				summary = f'{HISTORY_SUMMARY_HEADER}\n{str(response.content).strip()}'
+			except Exception as e:
+				logger.debug(f'History summary LLM failed, using the templated summary: {e}')
+
+		message = HumanMessage(content=summary)
+		if self.settings.sensitive_data:
+			message = self._filter_sensitive_data(message)
+		summary_message = ManagedMessage(message=message, metadata=MessageMetadata(tokens=self._count_tokens(message)))
+		tokens_before = self.state.history.current_tokens
+		self.state.history.replace_messages(start, end, [summary_message] + kept)
+		logger.debug(
+			f'Compacted {len(step_ends) - self.settings.keep_recent_steps} steps into a summary - '
+			f'tokens {tokens_before} -> {self.state.history.current_tokens}'
+		)
+		return True
+
+	def _summarize_history(self, messages: list[ManagedMessage]) -> str:
+		"""Deterministic summary: the latest memory of the model, then one line per goal, action and result"""
+		max_line = 300
+		memory = None
+		lines: list[str] = []
+		for managed_message in messages:
+			message = managed_message.message
+			content = message.content if isinstance(message.content, str) else ''
+			if isinstance(message, AIMessage) and message.tool_calls:
+				args = message.tool_calls[0].get('args', {})
+				current_state = args.get('current_state') or {}
+				memory = current_state.get('memory') or memory
+				actions = '; '.join(
+					f'{name}({json.dumps(params, separators=(",", ":"), ensure_ascii=False)})'
+					for action in args.get('action') or []
+					for name, params in action.items()
+				)
+				lines.append(f'Goal: {current_state.get("next_goal", "")} -> {actions}'[:max_line])
+			elif isinstance(message, HumanMessage) and content.startswith(HISTORY_SUMMARY_HEADER):
+				# Earlier summary: keep its lines, its memory is older than anything that follows
+				previous = content.split('\n')[1:]
+				if previous and previous[0].startswith('Memory: '):
+					memory = memory or previous[0][len('Memory: ') :]
+					previous = previous[1:]
+				lines.extend(line for line in previous if line != '...')
+			elif isinstance(message, HumanMessage) and content.startswith(('Action result: ', 'Action error: ')):
+				lines.append(content.replace('\n', ' ')[:max_line])
+
+		if len(lines) > self.settings.max_summary_lines:
+			lines = ['...'] + lines[-self.settings.max_summary_lines :]
+		header = [HISTORY_SUMMARY_HEADER]
+		if memory:
+			header.append(f'Memory: {memory}'[:max_line])
+		return '\n'.join(header + lines)
+
 	def _remove_last_state_message(self) -> None:
 		"""Remove last state message from history"""
+		messages = self.state.history.messages
+		if messages and messages[-1] is self._state_reference_message:
+			# The full snapshot stays as the reference for the following diffs, only its screenshot is dropped
+			self._remove_images(messages[-1])
+			return
 		self.state.history.remove_last_state_message()
 
+	def _remove_images(self, managed_message: ManagedMessage) -> None:
+		content = managed_message.message.content
+		if not isinstance(content, list):
+			return
+		managed_message.message.content = ''.join(item['text'] for item in content if isinstance(item, dict) and 'text' in item)
+		tokens = self._count_tokens(managed_message.message)
+		self.state.history.current_tokens += tokens - managed_message.metadata.tokens
+		managed_message.metadata.tokens = tokens
+
 	def add_tool_message(self, content: str) -> None:
 		"""Add tool message to history"""
 		msg = ToolMessage(content=content, tool_call_id=str(self.state.tool_id))
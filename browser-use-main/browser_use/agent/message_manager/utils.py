@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import functools
 import json
 import logging
+import math
 import os
-from typing import Any, Optional, Type
+import threading
+from typing import Any, Callable, Optional, Type
 
 from langchain_core.messages import (
 	AIMessage,
@@ -15,6 +18,10 @@ from langchain_core.messages import (
 
 logger = logging.getLogger(__name__)
 
+TokenCounter = Callable[[str], int]
+# Returns a copy of the message marked as the end of a cacheable prompt prefix, or None if it cannot carry a marker
+CacheMarker = Callable[[BaseMessage], Optional[BaseMessage]]
+
 
 def extract_json_from_model_output(content: str) -> dict:
 	"""Extract JSON from model output, handling both plain JSON and code-block-wrapped JSON."""
@@ -125,3 +132,108 @@ def _write_response_to_file(f: Any, response: Any) -> None:
 	"""Write model response to conversation file"""
 	f.write(' RESPONSE\n')
 	f.write(json.dumps(json.loads(response.model_dump_json(exclude_unset=True)), indent=2))
+
+
+def _load_tiktoken_encoding(model_name: Optional[str]) -> Any:
+	"""tiktoken encoding for a model, None if tiktoken or its encoding files are unavailable"""
+	try:
+		import tiktoken
+	except ImportError:
+		return None
+	try:
+		try:
+			return tiktoken.encoding_for_model(model_name or '')
+		except KeyError:
+			# Not an OpenAI model name, its encoding is still a closer estimate than counting characters
+			lowered = (model_name or '').lower()
+			return tiktoken.get_encoding('o200k_base' if 'gpt-4o' in lowered or 'o1' in lowered else 'cl100k_base')
+	except Exception as e:
+		# Encodings are downloaded on first use, which fails offline
+		logger.debug(f'tiktoken encoding unavailable for {model_name}, estimating tokens from characters: {e}')
+		return None
+
+
+# Encoding per model name once loading finished (None if unavailable), absent while it is still loading
+_encodings: dict[Optional[str], Any] = {}
+_encoding_threads: dict[Optional[str], threading.Thread] = {}
+_encoding_lock = threading.Lock()
+
+
+def _start_encoding_load(model_name: Optional[str]) -> None:
+	"""Load the encoding in a daemon thread, tiktoken downloads missing encodings without a timeout"""
+
+	def load() -> None:
+		_encodings[model_name] = _load_tiktoken_encoding(model_name)
+
+	with _encoding_lock:
+		if model_name in _encoding_threads:
+			return
+		thread = threading.Thread(target=load, name='tiktoken-encoding', daemon=True)
+		_encoding_threads[model_name] = thread
+	thread.start()
+
+
+def get_token_counter(model_name: Optional[str] = None, characters_per_token: int = 3) -> TokenCounter:
+	"""Local tokenizer for the model once tiktoken has loaded it, the characters per token estimate until then or without it.
+
+	Only tokenizer counts are memoized per text, so no estimate outlives the switch to the tokenizer.
+	"""
+	_start_encoding_load(model_name)
+
+	@functools.lru_cache(maxsize=1024)
+	def encode(text: str) -> int:
+		return len(_encodings[model_name].encode(text, disallowed_special=()))
+
+	def count(text: str) -> int:
+		if _encodings.get(model_name) is None:
+			return len(text) // characters_per_token
+		return encode(text)
+
+	return count
+
+
+def image_token_cost(width: int, height: int, model_name: Optional[str] = None) -> int:
+	"""Input tokens of an image as the provider bills it, from its dimensions in pixels"""
+	lowered = (model_name or '').lower()
+	if 'claude' in lowered:
+		# Scaled down to at most 1568px on the long edge and about 1600 tokens, one token per 750 pixels
+		scale = min(1.0, 1568 / max(width, height))
+		return min(math.ceil(width * scale * height * scale / 750), 1600)
+	if 'gemini' in lowered:
+		# 258 tokens for small images, otherwise per 768px tile
+		if width <= 384 and height <= 384:
+			return 258
+		return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+	# OpenAI high detail: fit into 2048x2048, scale the short side to 768px, then 170 per 512px tile plus 85
+	scale = min(1.0, 2048 / max(width, height))
+	width, height = width * scale, height * scale
+	scale = min(1.0, 768 / min(width, height))
+	width, height = width * scale, height * scale
+	return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def anthropic_cache_marker(message: BaseMessage) -> Optional[BaseMessage]:
+	"""Copy of a human or system message with an ephemeral cache_control on its last text block"""
+	if not isinstance(message, (HumanMessage, SystemMessage)):
+		return None
+	if isinstance(message.content, str):
+		blocks: list[Any] = [{'type': 'text', 'text': message.content}]
+	else:
+		blocks = [dict(block) if isinstance(block, dict) else {'type': 'text', 'text': block} for block in message.content]
+	for block in reversed(blocks):
+		if block.get('type') == 'text' and block.get('text'):
+			block['cache_control'] = {'type': 'ephemeral'}
+			return message.model_copy(update={'content': blocks})
+	return None
+
+
+# Providers that cache prompt prefixes only at explicit markers. OpenAI, DeepSeek and Gemini cache stable prefixes
+# automatically, so they only need the message layout to stay stable.
+CACHE_MARKERS: dict[str, CacheMarker] = {
+	'ChatAnthropic': anthropic_cache_marker,
+	'ChatAnthropicVertex': anthropic_cache_marker,
+}
+
+
+def get_cache_marker(chat_model_library: str) -> Optional[CacheMarker]:
+	return CACHE_MARKERS.get(chat_model_library)
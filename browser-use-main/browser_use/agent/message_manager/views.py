@@ -113,6 +113,21 @@ class MessageHistory(BaseModel):
 				self.messages.pop(i)
 				break
 
+	def remove_message(self, message: ManagedMessage) -> None:
+		"""Remove a specific message (compared by identity) from history"""
+		for i, msg in enumerate(self.messages):
+			if msg is message:
+				self.current_tokens -= msg.metadata.tokens
+				self.messages.pop(i)
+				break
+
+	def replace_messages(self, start: int, end: int, messages: list[ManagedMessage]) -> None:
+		"""Replace messages[start:end] with the given messages, keeping the token total in sync"""
+		removed = self.messages[start:end]
+		self.current_tokens -= sum(m.metadata.tokens for m in removed)
+		self.current_tokens += sum(m.metadata.tokens for m in messages)
+		self.messages[start:end] = messages
+
 	def remove_last_state_message(self) -> None:
 		"""Remove last state message from history"""
 		if len(self.messages) > 2 and isinstance(self.messages[-1].message, HumanMessage):
@@ -1,10 +1,14 @@
 import datetime
 import importlib.resources
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from browser_use.browser.views import screenshot_media_type
+
 if TYPE_CHECKING:
 	from browser_use.agent.views import ActionResult, AgentStepInfo
 	from browser_use.browser.views import BrowserState
@@ -60,6 +64,80 @@ class SystemPrompt:
 # {self.default_action_description}
 
 
+@dataclass
+class ElementsDiff:
+	"""Element lines that differ between a step and the last full page snapshot"""
+
+	added: list[str] = field(default_factory=list)
+	changed: list[str] = field(default_factory=list)
+	removed: list[str] = field(default_factory=list)
+	added_texts: list[str] = field(default_factory=list)
+	removed_texts: list[str] = field(default_factory=list)
+
+	def __len__(self) -> int:
+		return len(self.added) + len(self.changed) + len(self.removed) + len(self.added_texts) + len(self.removed_texts)
+
+	def to_string(self) -> str:
+		if not len(self):
+			return 'No changes'
+		sections = []
+		for title, lines in (
+			('New elements', self.added),
+			('Changed elements (new index, attributes or text)', self.changed),
+			('Removed elements (these indexes are no longer valid)', self.removed),
+			('New text', self.added_texts),
+			('Removed text', self.removed_texts),
+		):
+			if lines:
+				sections.append(f'{title}:\n' + '\n'.join(lines))
+		return '\n'.join(sections)
+
+
+@dataclass
+class ElementsSnapshot:
+	"""Serialized interactive elements of one step, keyed by element hash so later steps can be sent as a diff"""
+
+	url: str
+	text: str
+	# Keyed by branch path and xpath hash, so typing into a field shows up as a change of that element
+	elements: dict[tuple[str, str, int], str]
+	texts: list[str]
+
+	@classmethod
+	def from_state(cls, state: 'BrowserState', include_attributes: list[str]) -> 'ElementsSnapshot':
+		lines = state.element_tree.clickable_elements_to_lines(include_attributes=include_attributes)
+		elements: dict[tuple[str, str, int], str] = {}
+		texts: list[str] = []
+		for node, line in lines:
+			if node is None:
+				texts.append(line)
+				continue
+			# Elements with identical hashes are told apart by their order on the page
+			occurrence = 0
+			while (node.hash.branch_path_hash, node.hash.xpath_hash, occurrence) in elements:
+				occurrence += 1
+			elements[(node.hash.branch_path_hash, node.hash.xpath_hash, occurrence)] = line
+		return cls(url=state.url, text='\n'.join(line for _, line in lines), elements=elements, texts=texts)
+
+	def __len__(self) -> int:
+		return len(self.elements) + len(self.texts)
+
+	def diff(self, reference: 'ElementsSnapshot') -> ElementsDiff:
+		elements_diff = ElementsDiff()
+		for key, line in self.elements.items():
+			reference_line = reference.elements.get(key)
+			if reference_line is None:
+				elements_diff.added.append(line)
+			elif reference_line != line:
+				elements_diff.changed.append(line)
+		elements_diff.removed = [line for key, line in reference.elements.items() if key not in self.elements]
+
+		texts, reference_texts = Counter(self.texts), Counter(reference.texts)
+		elements_diff.added_texts = list((texts - reference_texts).elements())
+		elements_diff.removed_texts = list((reference_texts - texts).elements())
+		return elements_diff
+
+
 class AgentMessagePrompt:
 	def __init__(
 		self,
@@ -67,18 +145,39 @@ class AgentMessagePrompt:
 		result: Optional[List['ActionResult']] = None,
 		include_attributes: list[str] = [],
 		step_info: Optional['AgentStepInfo'] = None,
+		snapshot: Optional[ElementsSnapshot] = None,
+		elements_diff: Optional[ElementsDiff] = None,
 	):
 		self.state = state
 		self.result = result
 		self.include_attributes = include_attributes
 		self.step_info = step_info
+		# Already serialized elements of this state, and their diff to the last full snapshot in diff mode
+		self.snapshot = snapshot
+		self.elements_diff = elements_diff
 
 	def get_user_message(self, use_vision: bool = True) -> HumanMessage:
-		elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
-
 		has_content_above = (self.state.pixels_above or 0) > 0
 		has_content_below = (self.state.pixels_below or 0) > 0
 
+		if self.elements_diff is not None:
+			elements_header = (
+				'Changes to the interactive elements since the last full page snapshot above '
+				'(all other elements and their indexes are unchanged):'
+			)
+			elements_text = self.elements_diff.to_string()
+			if has_content_above:
+				elements_text = f'... {self.state.pixels_above} pixels above ...\n{elements_text}'
+			if has_content_below:
+				elements_text = f'{elements_text}\n... {self.state.pixels_below} pixels below ...'
+			return self._build_message(elements_header, elements_text, use_vision)
+
+		elements_header = 'Interactive elements from top layer of the current page inside the viewport:'
+		if self.snapshot is not None:
+			elements_text = self.snapshot.text
+		else:
+			elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
+
 		if elements_text != '':
 			if has_content_above:
 				elements_text = (
@@ -95,6 +194,9 @@ class AgentMessagePrompt:
 		else:
 			elements_text = 'empty page'
 
+		return self._build_message(elements_header, elements_text, use_vision)
+
+	def _build_message(self, elements_header: str, elements_text: str, use_vision: bool) -> HumanMessage:
 		if self.step_info:
 			step_info_description = f'Current step: {self.step_info.step_number + 1}/{self.step_info.max_steps}'
 		else:
@@ -109,7 +211,7 @@ The following is one-time information - if you need to remember it write it to m
 Current url: {self.state.url}
 Available tabs:
 {self.state.tabs}
-Interactive elements from top layer of the current page inside the viewport:
+{elements_header}
 {elements_text}
 {step_info_description}
 """
@@ -130,7 +232,7 @@ Interactive elements from top layer of the current page inside the viewport:
 					{'type': 'text', 'text': state_description},
 					{
 						'type': 'image_url',
-						'image_url': {'url': f'data:image/png;base64,{self.state.screenshot}'},  # , 'detail': 'low'
+						'image_url': {'url': f'data:{screenshot_media_type(self.state.screenshot)};base64,{self.state.screenshot}'},  # , 'detail': 'low'
 					},
 				]
 			)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from playwright.async_api import Locator, Page
+
+from browser_use.agent.views import ActionResult, AgentHistoryList
+from browser_use.browser.context import BrowserContext
+from browser_use.controller.registry.views import ActionModel
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement
+
+logger = logging.getLogger(__name__)
+
+# Indexed actions that can run directly on a Playwright locator, without a DOM state
+LOCATOR_ACTIONS = {'click_element', 'input_text', 'select_dropdown_option'}
+
+# Actions that only read the page (through the extraction LLM) and are not replayed
+SKIPPED_ACTIONS = {'extract_content'}
+
+# Attributes that usually identify a form control on its own, tried in order after css selector and xpath
+LOCATOR_ATTRIBUTES = ('id', 'name', 'data-testid', 'aria-label', 'placeholder')
+
+LOCATOR_POLL_INTERVAL = 0.1  # s
+
+
+def _css_attribute_value(value: str) -> str:
+	return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+@dataclass
+class ElementLocator:
+	"""Ways to find a recorded element on a live page, most specific first"""
+
+	tag_name: str
+	css_selector: Optional[str] = None
+	xpath: Optional[str] = None
+	attributes: dict[str, str] = field(default_factory=dict)
+	in_iframe: bool = False
+
+	@classmethod
+	def from_history_element(cls, element: DOMHistoryElement) -> 'ElementLocator':
+		return cls(
+			tag_name=element.tag_name,
+			css_selector=element.css_selector,
+			xpath=element.xpath,
+			attributes=element.attributes,
+			in_iframe='iframe' in element.entire_parent_branch_path[:-1],
+		)
+
+	def selectors(self) -> list[str]:
+		selectors = []
+		if self.css_selector:
+			selectors.append(self.css_selector)
+		if self.xpath:
+			selectors.append(f'xpath=/{self.xpath.lstrip("/")}')
+		for key in LOCATOR_ATTRIBUTES:
+			value = self.attributes.get(key)
+			if value:
+				selectors.append(f'{self.tag_name}[{key}="{_css_attribute_value(value)}"]')
+		return selectors
+
+
+@dataclass
+class ReplayStep:
+	"""One recorded action with everything needed to replay it without the LLM"""
+
+	step_number: int
+	action_name: str
+	action: ActionModel
+	history_element: Optional[DOMHistoryElement] = None
+	locator: Optional[ElementLocator] = None
+
+	@property
+	def params(self) -> Any:
+		return getattr(self.action, self.action_name)
+
+
+def compile_history(history: AgentHistoryList) -> list[ReplayStep]:
+	"""Flatten a recorded history into replay steps, copying actions so the history is left untouched"""
+	steps: list[ReplayStep] = []
+	for step_number, history_item in enumerate(history.history, start=1):
+		if not history_item.model_output:
+			continue
+		for i, action in enumerate(history_item.model_output.action):
+			if action is None:
+				continue
+			action_data = action.model_dump(exclude_unset=True)
+			if not action_data:
+				continue
+			action_name = next(iter(action_data))
+			if action_name in SKIPPED_ACTIONS:
+				continue
+
+			interacted = history_item.state.interacted_element
+			history_element = interacted[i] if i < len(interacted) else None
+			locator = None
+			if history_element is not None and action.get_index() is not None:
+				locator = ElementLocator.from_history_element(history_element)
+
+			steps.append(
+				ReplayStep(
+					step_number=step_number,
+					action_name=action_name,
+					action=action.model_copy(deep=True),
+					history_element=history_element,
+					locator=locator,
+				)
+			)
+	return steps
+
+
+async def resolve_locator(page: Page, element_locator: ElementLocator, timeout: float) -> Optional[Locator]:
+	"""First selector that matches exactly one element, polling until timeout (ms) while the page settles"""
+	if element_locator.in_iframe:
+		return None
+
+	selectors = element_locator.selectors()
+	deadline = time.monotonic() + timeout / 1000
+	while True:
+		for selector in selectors:
+			locator = page.locator(selector)
+			try:
+				if await locator.count() == 1:
+					return locator
+			except Exception as e:
+				# Selectors built from odd attribute values can be invalid, just try the next one
+				logger.debug(f'Replay selector {selector} failed: {e}')
+		if time.monotonic() > deadline:
+			return None
+		await asyncio.sleep(LOCATOR_POLL_INTERVAL)
+
+
+async def run_on_locator(
+	browser: BrowserContext, step: ReplayStep, locator: Locator, timeout: float, has_sensitive_data: bool = False
+) -> Optional[ActionResult]:
+	"""Execute a LOCATOR_ACTIONS step directly; None if the step has to go through a DOM state instead"""
+	params = step.params
+	try:
+		if step.action_name == 'click_element':
+			page = await browser.get_current_page()
+			initial_pages = len(page.context.pages)
+			await locator.click(timeout=timeout)
+			await page.wait_for_load_state()
+			msg = f'🖱️  Replayed click on index {params.index}'
+			if len(page.context.pages) > initial_pages:
+				msg += ' - New tab opened - switching to it'
+				await browser.switch_to_tab(-1)
+		elif step.action_name == 'input_text':
+			await locator.fill(params.text, timeout=timeout)
+			if not has_sensitive_data:
+				msg = f'⌨️  Replayed input {params.text} into index {params.index}'
+			else:
+				msg = f'⌨️  Replayed input of sensitive data into index {params.index}'
+		elif step.action_name == 'select_dropdown_option':
+			if step.locator is None or step.locator.tag_name != 'select':
+				return None
+			await locator.select_option(label=params.text, timeout=timeout)
+			msg = f'Replayed selection of option {params.text} at index {params.index}'
+		else:
+			return None
+	except Exception as e:
+		logger.debug(f'Direct replay of {step.action_name} failed: {e}')
+		return None
+
+	logger.info(msg)
+	return ActionResult(extracted_content=msg, include_in_memory=True)
@@ -15,14 +15,21 @@ from langchain_core.messages import (
 	HumanMessage,
 	SystemMessage,
 )
+from langchain_core.messages.ai import UsageMetadata
 
 # from lmnr.sdk.decorators import observe
 from pydantic import BaseModel, ValidationError
 
 from browser_use.agent.gif import create_history_gif
 from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
-from browser_use.agent.message_manager.utils import convert_input_messages, extract_json_from_model_output, save_conversation
+from browser_use.agent.message_manager.utils import (
+	convert_input_messages,
+	extract_json_from_model_output,
+	get_cache_marker,
+	save_conversation,
+)
 from browser_use.agent.prompts import AgentMessagePrompt, PlannerPrompt, SystemPrompt
+from browser_use.agent.replay import LOCATOR_ACTIONS, ReplayStep, compile_history, resolve_locator, run_on_locator
 from browser_use.agent.views import (
 	ActionResult,
 	AgentError,
@@ -47,6 +54,7 @@ from browser_use.dom.history_tree_processor.service import (
 from browser_use.telemetry.service import ProductTelemetry
 from browser_use.telemetry.views import (
 	AgentEndTelemetryEvent,
+	BaseTelemetryEvent,
 	AgentRunTelemetryEvent,
 	AgentStepTelemetryEvent,
 )
@@ -124,6 +132,13 @@ class Agent(Generic[Context]):
 		page_extraction_llm: Optional[BaseChatModel] = None,
 		planner_llm: Optional[BaseChatModel] = None,
 		planner_interval: int = 1,  # Run planner every N steps
+		state_diff: bool = False,  # Send only changed elements between full page snapshots
+		full_state_interval: int = 5,
+		history_summary_llm: Optional[BaseChatModel] = None,
+		history_compaction_ratio: Optional[float] = None,
+		prompt_caching: bool = True,
+		prefetch_state: bool = False,
+		concurrent_planner: bool = False,
 		# Inject state
 		injected_agent_state: Optional[AgentState] = None,
 		#
@@ -158,6 +173,13 @@ class Agent(Generic[Context]):
 			page_extraction_llm=page_extraction_llm,
 			planner_llm=planner_llm,
 			planner_interval=planner_interval,
+			state_diff=state_diff,
+			full_state_interval=full_state_interval,
+			history_summary_llm=history_summary_llm,
+			history_compaction_ratio=history_compaction_ratio,
+			prompt_caching=prompt_caching,
+			prefetch_state=prefetch_state,
+			concurrent_planner=concurrent_planner,
 		)
 
 		# Initialize state
@@ -175,6 +197,13 @@ class Agent(Generic[Context]):
 		self.available_actions = self.controller.registry.get_prompt_description()
 
 		self.tool_calling_method = self._set_tool_calling_method()
+		# Usage reported by the provider for the last main LLM call
+		self._last_token_usage: Optional[UsageMetadata] = None
+
+		# Work that overlaps with the step: the next state, the concurrent plan and telemetry
+		self._next_state_task: Optional[asyncio.Task[BrowserState]] = None
+		self._plan_task: Optional[asyncio.Task[Optional[str]]] = None
+		self._background_tasks: set[asyncio.Task] = set()
 		self.settings.message_context = self._set_message_context()
 
 		# Initialize message manager with state
@@ -188,10 +217,15 @@ class Agent(Generic[Context]):
 			).get_system_message(),
 			settings=MessageManagerSettings(
 				max_input_tokens=self.settings.max_input_tokens,
+				model_name=self.model_name,
 				include_attributes=self.settings.include_attributes,
 				message_context=self.settings.message_context,
 				sensitive_data=sensitive_data,
 				available_file_paths=self.settings.available_file_paths,
+				state_diff=self.settings.state_diff,
+				full_state_interval=self.settings.full_state_interval,
+				history_compaction_ratio=self.settings.history_compaction_ratio,
+				cache_marker=get_cache_marker(self.chat_model_library) if self.settings.prompt_caching else None,
 			),
 			state=self.state.message_manager_state,
 		)
@@ -330,19 +364,31 @@ class Agent(Generic[Context]):
 		result: list[ActionResult] = []
 		step_start_time = time.time()
 		tokens = 0
+		self._last_token_usage = None
 
 		try:
-			state = await self.browser_context.get_state()
+			state = await self._get_step_state()
 
 			await self._raise_if_stopped_or_paused()
 
+			if self._message_manager.needs_compaction():
+				await self._message_manager.compact_history(self.settings.history_summary_llm)
+
+			if self._plan_task is not None:
+				# Plan of the planner that ran alongside the previous step
+				self._message_manager.add_plan(await self._collect_plan())
+
 			self._message_manager.add_state_message(state, self.state.last_result, step_info, self.settings.use_vision)
 
 			# Run planner at specified intervals if planner is configured
 			if self.settings.planner_llm and self.state.n_steps % self.settings.planner_interval == 0:
-				plan = await self._run_planner()
-				# add plan before last state message
-				self._message_manager.add_plan(plan, position=-1)
+				if self.settings.concurrent_planner:
+					# Messages are taken now, the planner then runs alongside the main model call and the actions
+					self._plan_task = asyncio.create_task(self._run_planner(self._get_planner_messages()))
+				else:
+					plan = await self._run_planner()
+					# add plan before last state message
+					self._message_manager.add_plan(plan, position=-1)
 
 			if step_info and step_info.is_last_step():
 				# Add last step warning if needed
@@ -383,6 +429,11 @@ class Agent(Generic[Context]):
 
 			self.state.last_result = result
 
+			if self.settings.prefetch_state and not (result and result[-1].is_done):
+				# The next step starts from this state, capture it while this step is recorded
+				next_state = self.browser_context.get_state(include_screenshot=self._needs_screenshot)
+				self._next_state_task = asyncio.create_task(next_state)
+
 			if len(result) > 0 and result[-1].is_done:
 				logger.info(f'📄 Result: {result[-1].extracted_content}')
 
@@ -403,7 +454,7 @@ class Agent(Generic[Context]):
 		finally:
 			step_end_time = time.time()
 			actions = [a.model_dump(exclude_unset=True) for a in model_output.action] if model_output else []
-			self.telemetry.capture(
+			self._capture_in_background(
 				AgentStepTelemetryEvent(
 					agent_id=self.state.agent_id,
 					step=self.state.n_steps,
@@ -421,9 +472,57 @@ class Agent(Generic[Context]):
 					step_start_time=step_start_time,
 					step_end_time=step_end_time,
 					input_tokens=tokens,
+					**self._prompt_cache_usage(),
 				)
 				self._make_history_item(model_output, state, result, metadata)
 
+	async def _get_step_state(self) -> BrowserState:
+		"""State prefetched after the last actions if there is one, otherwise captured now"""
+		next_state_task, self._next_state_task = self._next_state_task, None
+		if next_state_task is not None:
+			try:
+				return await next_state_task
+			except Exception as e:
+				logger.debug(f'Prefetched state failed, capturing it again: {e}')
+		return await self.browser_context.get_state(include_screenshot=self._needs_screenshot)
+
+	async def _collect_plan(self) -> Optional[str]:
+		"""Result of the concurrent planner, None if it failed"""
+		plan_task, self._plan_task = self._plan_task, None
+		if plan_task is None:
+			return None
+		try:
+			return await plan_task
+		except Exception as e:
+			logger.warning(f'Planner failed: {e}')
+			return None
+
+	def _capture_in_background(self, event: BaseTelemetryEvent) -> None:
+		"""Send a telemetry event from a worker thread, off the step's critical path"""
+		task = asyncio.create_task(asyncio.to_thread(self.telemetry.capture, event))
+		self._background_tasks.add(task)
+		task.add_done_callback(self._background_tasks.discard)
+
+	async def _stop_pipeline(self) -> None:
+		"""Cancel the prefetched state and the pending plan, and wait for background telemetry"""
+		tasks = [task for task in (self._next_state_task, self._plan_task) if task is not None]
+		for task in tasks:
+			task.cancel()
+		self._next_state_task = self._plan_task = None
+		tasks.extend(self._background_tasks)
+		if tasks:
+			await asyncio.gather(*tasks, return_exceptions=True)
+
+	def _prompt_cache_usage(self) -> dict[str, Optional[int]]:
+		"""Cached and uncached input tokens of the last LLM call, if the provider reported its usage"""
+		usage = self._last_token_usage
+		if not usage:
+			return {}
+		cached = (usage.get('input_token_details') or {}).get('cache_read') or 0
+		uncached = max(usage['input_tokens'] - cached, 0)
+		logger.debug(f'Prompt cache: {cached} of {usage["input_tokens"]} input tokens read from cache')
+		return {'cached_input_tokens': cached, 'uncached_input_tokens': uncached}
+
 	@time_execution_async('--handle_step_error (agent)')
 	async def _handle_step_error(self, error: Exception) -> list[ActionResult]:
 		"""Handle all types of errors that can occur during a step"""
@@ -507,6 +606,7 @@ class Agent(Generic[Context]):
 			output = self.llm.invoke(input_messages)
 			# TODO: currently invoke does not return reasoning_content, we should override invoke
 			output.content = self._remove_think_tags(str(output.content))
+			self._last_token_usage = output.usage_metadata
 			try:
 				parsed_json = extract_json_from_model_output(output.content)
 				parsed = self.AgentOutput(**parsed_json)
@@ -518,10 +618,12 @@ class Agent(Generic[Context]):
 			structured_llm = self.llm.with_structured_output(self.AgentOutput, include_raw=True)
 			response: dict[str, Any] = await structured_llm.ainvoke(input_messages)  # type: ignore
 			parsed: AgentOutput | None = response['parsed']
+			self._last_token_usage = getattr(response.get('raw'), 'usage_metadata', None)
 		else:
 			structured_llm = self.llm.with_structured_output(self.AgentOutput, include_raw=True, method=self.tool_calling_method)
 			response: dict[str, Any] = await structured_llm.ainvoke(input_messages)  # type: ignore
 			parsed: AgentOutput | None = response['parsed']
+			self._last_token_usage = getattr(response.get('raw'), 'usage_metadata', None)
 
 		if parsed is None:
 			raise ValueError('Could not parse response.')
@@ -615,6 +717,8 @@ class Agent(Generic[Context]):
 
 			return self.state.history
 		finally:
+			await self._stop_pipeline()
+
 			self.telemetry.capture(
 				AgentEndTelemetryEvent(
 					agent_id=self.state.agent_id,
@@ -652,15 +756,19 @@ class Agent(Generic[Context]):
 		results = []
 
 		cached_selector_map = await self.browser_context.get_selector_map()
-		cached_path_hashes = set(e.hash.branch_path_hash for e in cached_selector_map.values())
+		# Element hashes are cached on the nodes, so each tree is hashed at most once
+		cached_path_hashes = None
+		if check_for_new_elements and any(action.get_index() is not None for action in actions[1:]):
+			cached_path_hashes = {e.hash.branch_path_hash for e in cached_selector_map.values()}
 
 		await self.browser_context.remove_highlights()
 
 		for i, action in enumerate(actions):
 			if action.get_index() is not None and i != 0:
-				new_state = await self.browser_context.get_state()
-				new_path_hashes = set(e.hash.branch_path_hash for e in new_state.selector_map.values())
-				if check_for_new_elements and not new_path_hashes.issubset(cached_path_hashes):
+				new_state = await self.browser_context.get_state(include_screenshot=False)
+				if cached_path_hashes is not None and not all(
+					e.hash.branch_path_hash in cached_path_hashes for e in new_state.selector_map.values()
+				):
 					# next action requires index but there are new elements on the page
 					msg = f'Something new appeared after action {i} / {len(actions)}'
 					logger.info(msg)
@@ -703,7 +811,7 @@ class Agent(Generic[Context]):
 		)
 
 		if self.browser_context.session:
-			state = await self.browser_context.get_state()
+			state = await self.browser_context.get_state(include_screenshot=self.settings.use_vision)
 			content = AgentMessagePrompt(
 				state=state,
 				result=self.state.last_result,
@@ -751,6 +859,7 @@ class Agent(Generic[Context]):
 		max_retries: int = 3,
 		skip_failures: bool = True,
 		delay_between_actions: float = 2.0,
+		fuzzy_match: bool = True,
 	) -> list[ActionResult]:
 		"""
 		Rerun a saved history of actions with error handling and retry logic.
@@ -760,6 +869,7 @@ class Agent(Generic[Context]):
 				max_retries: Maximum number of retries per action
 				skip_failures: Whether to skip failed actions or stop execution
 				delay_between_actions: Delay between actions in seconds
+				fuzzy_match: Fall back to the most similar element (tag and attributes) when an exact match is missing
 
 		Returns:
 				List of action results
@@ -787,7 +897,7 @@ class Agent(Generic[Context]):
 			retry_count = 0
 			while retry_count < max_retries:
 				try:
-					result = await self._execute_history_step(history_item, delay_between_actions)
+					result = await self._execute_history_step(history_item, delay_between_actions, fuzzy_match)
 					results.extend(result)
 					break
 
@@ -805,17 +915,21 @@ class Agent(Generic[Context]):
 
 		return results
 
-	async def _execute_history_step(self, history_item: AgentHistory, delay: float) -> list[ActionResult]:
+	async def _execute_history_step(
+		self, history_item: AgentHistory, delay: float, fuzzy_match: bool = True
+	) -> list[ActionResult]:
 		"""Execute a single step from history with element validation"""
-		state = await self.browser_context.get_state()
+		state = await self.browser_context.get_state(include_screenshot=False)
 		if not state or not history_item.model_output:
 			raise ValueError('Invalid state or model output')
 		updated_actions = []
+		# All actions of the step are resolved against one hash index of this state (state.hash_index)
 		for i, action in enumerate(history_item.model_output.action):
 			updated_action = await self._update_action_indices(
 				history_item.state.interacted_element[i],
 				action,
 				state,
+				fuzzy_match,
 			)
 			updated_actions.append(updated_action)
 
@@ -832,6 +946,7 @@ class Agent(Generic[Context]):
 		historical_element: Optional[DOMHistoryElement],
 		action: ActionModel,  # Type this properly based on your action model
 		current_state: BrowserState,
+		fuzzy_match: bool = True,
 	) -> Optional[ActionModel]:
 		"""
 		Update action indices based on current page state.
@@ -840,7 +955,13 @@ class Agent(Generic[Context]):
 		if not historical_element or not current_state.element_tree:
 			return action
 
-		current_element = HistoryTreeProcessor.find_history_element_in_tree(historical_element, current_state.element_tree)
+		current_element = HistoryTreeProcessor.find_history_element_in_tree(
+			historical_element, current_state.element_tree, current_state.hash_index
+		)
+		if current_element is None and fuzzy_match:
+			current_element = HistoryTreeProcessor.find_similar_element(historical_element, current_state.selector_map.values())
+			if current_element is not None:
+				logger.info(f'No exact match for recorded element, using similar element {current_element}')
 
 		if not current_element or current_element.highlight_index is None:
 			return None
@@ -865,6 +986,103 @@ class Agent(Generic[Context]):
 		history = AgentHistoryList.load_from_file(history_file, self.AgentOutput)
 		return await self.rerun_history(history, **kwargs)
 
+	async def fast_rerun_history(
+		self,
+		history: AgentHistoryList,
+		locator_timeout: float = 5000,
+		resume_agent: bool = True,
+		max_steps: int = 100,
+	) -> list[ActionResult]:
+		"""
+		Replay a saved history without LLM calls, screenshots or fixed delays.
+
+		Recorded elements are found through their css selector, xpath or identifying attributes and
+		acted on directly; only when none of them matches is the DOM state rebuilt to resolve the
+		element by hash. If that fails too, the agent takes over the task from the current page.
+
+		Args:
+				history: The history to replay
+				locator_timeout: How long to wait for a recorded element to appear, in milliseconds
+				resume_agent: Run the agent from the current page when a step cannot be replayed, otherwise raise
+				max_steps: Maximum number of agent steps after resuming
+		"""
+		if self.initial_actions:
+			result = await self.multi_act(self.initial_actions, check_for_new_elements=False)
+			self.state.last_result = result
+
+		results: list[ActionResult] = []
+		for step in compile_history(history):
+			await self._raise_if_stopped_or_paused()
+			result = await self._replay_step(step, locator_timeout)
+
+			if result is None or result.error:
+				error = result.error if result else 'element not found'
+				logger.warning(f'Replay of step {step.step_number} ({step.action_name}) failed: {error}')
+				if not resume_agent:
+					raise RuntimeError(f'Step {step.step_number} could not be replayed: {error}')
+
+				logger.info('🤖 Resuming the agent from the current page')
+				initial_actions, self.initial_actions = self.initial_actions, None
+				try:
+					agent_history = await self.run(max_steps=max_steps)
+				finally:
+					self.initial_actions = initial_actions
+				if agent_history.history:
+					results.extend(agent_history.history[-1].result)
+				return results
+
+			results.append(result)
+			if result.is_done:
+				break
+
+		return results
+
+	async def load_and_fast_rerun(self, history_file: Optional[str | Path] = None, **kwargs) -> list[ActionResult]:
+		"""Load history from file and replay it with fast_rerun_history"""
+		if not history_file:
+			history_file = 'AgentHistory.json'
+		history = AgentHistoryList.load_from_file(history_file, self.AgentOutput)
+		return await self.fast_rerun_history(history, **kwargs)
+
+	async def _replay_step(self, step: ReplayStep, locator_timeout: float) -> Optional[ActionResult]:
+		"""Run one compiled step, rebuilding the DOM state only if its recorded element cannot be located"""
+		if step.locator is None:
+			if step.action.get_index() is None:
+				return await self.controller.act(
+					step.action,
+					self.browser_context,
+					self.settings.page_extraction_llm,
+					self.sensitive_data,
+					self.settings.available_file_paths,
+					context=self.context,
+				)
+		elif step.action_name in LOCATOR_ACTIONS:
+			page = await self.browser_context.get_current_page()
+			locator = await resolve_locator(page, step.locator, locator_timeout)
+			if locator is not None:
+				has_sensitive_data = False
+				if self.sensitive_data and step.action_name == 'input_text':
+					params = self.controller.registry._replace_sensitive_data(step.params, self.sensitive_data)
+					setattr(step.action, step.action_name, params)
+					has_sensitive_data = True
+				result = await run_on_locator(self.browser_context, step, locator, locator_timeout, has_sensitive_data)
+				if result is not None:
+					return result
+			logger.debug(f'No direct locator for step {step.step_number}, rebuilding the DOM state')
+
+		state = await self.browser_context.get_state(include_screenshot=False)
+		action = await self._update_action_indices(step.history_element, step.action, state)
+		if action is None:
+			return None
+		return await self.controller.act(
+			action,
+			self.browser_context,
+			self.settings.page_extraction_llm,
+			self.sensitive_data,
+			self.settings.available_file_paths,
+			context=self.context,
+		)
+
 	def save_history(self, file_path: Optional[str | Path] = None) -> None:
 		"""Save the history to a file"""
 		if not file_path:
@@ -875,6 +1093,10 @@ class Agent(Generic[Context]):
 		"""Pause the agent before the next step"""
 		logger.info('🔄 pausing Agent ')
 		self.state.paused = True
+		# The page can change while paused, so a state prefetched before the pause is not used
+		if self._next_state_task is not None:
+			self._next_state_task.cancel()
+			self._next_state_task = None
 
 	def resume(self) -> None:
 		"""Resume the agent"""
@@ -908,16 +1130,38 @@ class Agent(Generic[Context]):
 
 		return converted_actions
 
-	async def _run_planner(self) -> Optional[str]:
+	async def _run_planner(self, planner_messages: Optional[list[BaseMessage]] = None) -> Optional[str]:
 		"""Run the planner to analyze state and suggest next steps"""
 		# Skip planning if no planner_llm is set
 		if not self.settings.planner_llm:
 			return None
 
-		# Create planner message history using full message history
+		if planner_messages is None:
+			planner_messages = self._get_planner_messages()
+
+		# Get planner output
+		response = await self.settings.planner_llm.ainvoke(planner_messages)
+		plan = str(response.content)
+		# if deepseek-reasoner, remove think tags
+		if self.planner_model_name == 'deepseek-reasoner':
+			plan = self._remove_think_tags(plan)
+		try:
+			plan_json = json.loads(plan)
+			logger.info(f'Planning Analysis:\n{json.dumps(plan_json, indent=4)}')
+		except json.JSONDecodeError:
+			logger.info(f'Planning Analysis:\n{plan}')
+		except Exception as e:
+			logger.debug(f'Error parsing planning analysis: {e}')
+			logger.info(f'Plan: {plan}')
+
+		return plan
+
+	def _get_planner_messages(self) -> list[BaseMessage]:
+		"""Create planner message history using full message history"""
 		planner_messages = [
 			PlannerPrompt(self.controller.registry.get_prompt_description()).get_system_message(),
-			*self._message_manager.get_messages()[1:],  # Use full message history except the first
+			# Use full message history except the first, without the cache markers of the main model
+			*self._message_manager.get_messages(cache_markers=False)[1:],
 		]
 
 		if not self.settings.use_vision_for_planner and self.settings.use_vision:
@@ -935,25 +1179,13 @@ class Agent(Generic[Context]):
 
 			planner_messages[-1] = HumanMessage(content=new_msg)
 
-		planner_messages = convert_input_messages(planner_messages, self.planner_model_name)
-
-		# Get planner output
-		response = await self.settings.planner_llm.ainvoke(planner_messages)
-		plan = str(response.content)
-		# if deepseek-reasoner, remove think tags
-		if self.planner_model_name == 'deepseek-reasoner':
-			plan = self._remove_think_tags(plan)
-		try:
-			plan_json = json.loads(plan)
-			logger.info(f'Planning Analysis:\n{json.dumps(plan_json, indent=4)}')
-		except json.JSONDecodeError:
-			logger.info(f'Planning Analysis:\n{plan}')
-		except Exception as e:
-			logger.debug(f'Error parsing planning analysis: {e}')
-			logger.info(f'Plan: {plan}')
-
-		return plan
+		return convert_input_messages(planner_messages, self.planner_model_name)
 
 	@property
 	def message_manager(self) -> MessageManager:
 		return self._message_manager
+
+	@property
+	def _needs_screenshot(self) -> bool:
+		"""Screenshots are only captured when the LLM sees them (vision) or a GIF is rendered from history"""
+		return self.settings.use_vision or bool(self.settings.generate_gif)
@@ -58,6 +58,14 @@ class AgentSettings(BaseModel):
 	page_extraction_llm: Optional[BaseChatModel] = None
 	planner_llm: Optional[BaseChatModel] = None
 	planner_interval: int = 1  # Run planner every N steps
+	state_diff: bool = False  # Send only changed elements between full page snapshots
+	full_state_interval: int = 5
+	history_summary_llm: Optional[BaseChatModel] = None  # Compresses older steps, templated summary if None
+	history_compaction_ratio: Optional[float] = None  # Share of max_input_tokens that triggers it (e.g. 0.75), None disables it
+	prompt_caching: bool = True  # Mark cache breakpoints for providers that need explicit markers
+	# Capture the next browser state while the finished step is recorded; it then misses changes made between steps
+	prefetch_state: bool = False
+	concurrent_planner: bool = False  # Run the planner alongside the main model, its plan is used from the next step
 
 
 class AgentState(BaseModel):
@@ -105,6 +113,9 @@ class StepMetadata(BaseModel):
 	step_end_time: float
 	input_tokens: int  # Approximate tokens from message manager for this step
 	step_number: int
+	# Input tokens the provider reports as read from its prompt cache and as processed in full, None if not reported
+	cached_input_tokens: Optional[int] = None
+	uncached_input_tokens: Optional[int] = None
 
 	@property
 	def duration_seconds(self) -> float:
@@ -218,6 +229,10 @@ class AgentHistoryList(BaseModel):
 				total += h.metadata.input_tokens
 		return total
 
+	def total_cached_input_tokens(self) -> int:
+		"""Get input tokens read from the provider's prompt cache across all steps"""
+		return sum(h.metadata.cached_input_tokens or 0 for h in self.history if h.metadata)
+
 	def input_token_usage(self) -> list[int]:
 		"""Get token usage for each step"""
 		return [h.metadata.input_tokens for h in self.history if h.metadata]
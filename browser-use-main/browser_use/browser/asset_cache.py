@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from playwright.async_api import Request, Route
+
+from browser_use.browser.network import fallback_route
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_RESOURCE_TYPES = {'script', 'stylesheet', 'font', 'image'}
+
+# Not replayed from the cache: the stored body is already decoded, its length is recomputed and cookies are not resent
+UNCACHED_HEADERS = {
+	'connection',
+	'content-encoding',
+	'content-length',
+	'date',
+	'keep-alive',
+	'set-cookie',
+	'transfer-encoding',
+}
+
+
+@dataclass
+class CacheEntry:
+	url: str
+	status: int
+	headers: dict[str, str]
+	expires: float  # unix time, stale afterwards
+	size: int
+
+	def is_fresh(self) -> bool:
+		return time.time() < self.expires
+
+	def validators(self) -> dict[str, str]:
+		"""Conditional request headers to revalidate a stale entry"""
+		validators = {}
+		if 'etag' in self.headers:
+			validators['if-none-match'] = self.headers['etag']
+		if 'last-modified' in self.headers:
+			validators['if-modified-since'] = self.headers['last-modified']
+		return validators
+
+
+def freshness_lifetime(headers: dict[str, str]) -> Optional[float]:
+	"""Seconds a response may be served from cache, 0 to always revalidate, None if it must not be stored"""
+	directives = {}
+	for directive in headers.get('cache-control', '').lower().split(','):
+		name, _, value = directive.strip().partition('=')
+		directives[name] = value.strip('"')
+
+	if 'no-store' in directives:
+		return None
+	vary = {v.strip() for v in headers.get('vary', '').lower().split(',') if v.strip()}
+	# Entries are keyed by url only
+	if vary - {'accept-encoding'}:
+		return None
+	if 'no-cache' in directives:
+		return 0.0
+
+	age = float(headers['age']) if headers.get('age', '').isdigit() else 0.0
+	if directives.get('max-age', '').isdigit():
+		return max(int(directives['max-age']) - age, 0.0)
+	if 'expires' in headers:
+		try:
+			expires = parsedate_to_datetime(headers['expires']).timestamp()
+			date = parsedate_to_datetime(headers['date']).timestamp() if 'date' in headers else time.time()
+		except (TypeError, ValueError):
+			return 0.0
+		return max(expires - date - age, 0.0)
+	# Without explicit freshness only responses that can be revalidated are kept
+	if 'etag' in headers or 'last-modified' in headers:
+		return 0.0
+	return None
+
+
+@dataclass
+class AssetCacheStats:
+	hits: int = 0
+	revalidated: int = 0
+	misses: int = 0
+	stored_bytes: int = 0
+	served_bytes: int = 0
+	evicted: int = 0
+
+
+@dataclass
+class AssetCache:
+	"""Size-bounded on-disk cache of static GET responses, shared by every context and run using the same directory.
+
+	Each entry is a metadata file and a body file named by the hash of the url; the least recently used entries
+	are evicted once the cache grows past max_size bytes.
+	"""
+
+	directory: str
+	max_size: int = 200 * 1024 * 1024
+	stats: AssetCacheStats = field(default_factory=AssetCacheStats)
+	_size: Optional[int] = field(default=None, init=False, repr=False)
+
+	def __post_init__(self):
+		os.makedirs(self.directory, exist_ok=True)
+
+	async def handle(self, route: Route, request: Request) -> None:
+		if request.method != 'GET' or request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+			await route.fallback()
+			return
+
+		try:
+			cached = await asyncio.to_thread(self._load, request.url)
+			if cached is not None and cached[0].is_fresh():
+				entry, body = cached
+				self.stats.hits += 1
+				self.stats.served_bytes += len(body)
+				await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+				return
+
+			# Stale entries are revalidated, a 304 renews them without downloading the body again
+			headers = dict(request.headers)
+			if cached is not None:
+				headers.update(cached[0].validators())
+			response = await route.fetch(headers=headers)
+
+			if cached is not None and response.status == 304:
+				entry, body = cached
+				lifetime = freshness_lifetime({k.lower(): v for k, v in response.headers.items()})
+				entry.expires = time.time() + (lifetime or 0.0)
+				await asyncio.to_thread(self._write_entry, entry, None)
+				self.stats.revalidated += 1
+				self.stats.served_bytes += len(body)
+				await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+				return
+
+			self.stats.misses += 1
+			body = await response.body()
+			await route.fulfill(response=response, body=body)
+			await self._store(request.url, response.status, response.headers, body)
+		except Exception as e:
+			# The page may have navigated away or closed while the request was routed
+			logger.debug(f'Asset cache failed for {request.url}: {e}')
+			await fallback_route(route)
+
+	async def _store(self, url: str, status: int, headers: dict[str, str], body: bytes) -> None:
+		if status != 200:
+			return
+		headers = {k.lower(): v for k, v in headers.items()}
+		lifetime = freshness_lifetime(headers)
+		if lifetime is None:
+			return
+		entry = CacheEntry(
+			url=url,
+			status=status,
+			headers={k: v for k, v in headers.items() if k not in UNCACHED_HEADERS},
+			expires=time.time() + lifetime,
+			size=len(body),
+		)
+		# A single large asset would evict most of the cache
+		if entry.size > self.max_size // 10:
+			return
+		await asyncio.to_thread(self._write_entry, entry, body)
+		self.stats.stored_bytes += entry.size
+
+	def _path(self, url: str) -> str:
+		return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+	def _load(self, url: str) -> Optional[tuple[CacheEntry, bytes]]:
+		path = self._path(url)
+		try:
+			with open(f'{path}.json') as f:
+				entry = CacheEntry(**json.load(f))
+			# Hash collisions are not served
+			if entry.url != url:
+				return None
+			with open(f'{path}.body', 'rb') as f:
+				body = f.read()
+			os.utime(f'{path}.json')  # Last use for LRU eviction
+		except (OSError, ValueError, TypeError):
+			return None
+		return entry, body
+
+	def _write_entry(self, entry: CacheEntry, body: Optional[bytes]) -> None:
+		"""Write metadata and, if given, the body; replaced atomically so concurrent runs never read partial files"""
+		path = self._path(entry.url)
+		if body is not None:
+			size = self._current_size()
+			previous_size = os.path.getsize(f'{path}.body') if os.path.exists(f'{path}.body') else 0
+			self._write_file(f'{path}.body', body)
+			self._size = size + entry.size - previous_size
+		self._write_file(f'{path}.json', json.dumps(entry.__dict__).encode())
+		if body is not None and self._current_size() > self.max_size:
+			self._evict()
+
+	@staticmethod
+	def _write_file(path: str, data: bytes) -> None:
+		tmp_path = f'{path}.{os.getpid()}.tmp'
+		with open(tmp_path, 'wb') as f:
+			f.write(data)
+		os.replace(tmp_path, path)
+
+	def _current_size(self) -> int:
+		if self._size is None:
+			self._size = sum(
+				entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.body') and entry.is_file()
+			)
+		return self._size
+
+	def _evict(self) -> None:
+		"""Remove least recently used entries until the cache is below 90% of max_size"""
+		entries = []
+		for entry in os.scandir(self.directory):
+			if entry.name.endswith('.json'):
+				try:
+					entries.append((entry.stat().st_mtime, entry.path[: -len('.json')]))
+				except OSError:
+					continue
+		entries.sort()
+
+		size = self._current_size()
+		for _, path in entries:
+			if size <= self.max_size * 0.9:
+				break
+			try:
+				body_size = os.path.getsize(f'{path}.body')
+				os.remove(f'{path}.body')
+				os.remove(f'{path}.json')
+			except OSError:
+				continue
+			size -= body_size
+			self.stats.evicted += 1
+		self._size = size
+
+
+_asset_caches: dict[str, AssetCache] = {}
+
+
+def get_asset_cache(directory: str, max_size: int) -> AssetCache:
+	"""Shared cache per directory, so contexts of one process agree on its size"""
+	directory = os.path.abspath(os.path.expanduser(directory))
+	cache = _asset_caches.get(directory)
+	if cache is None:
+		cache = _asset_caches[directory] = AssetCache(directory, max_size)
+	return cache
@@ -12,7 +12,7 @@ import re
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Optional, TypedDict
+from typing import TYPE_CHECKING, Literal, Optional, TypedDict
 
 from playwright._impl._errors import TimeoutError
 from playwright.async_api import Browser as PlaywrightBrowser
@@ -25,6 +25,8 @@ from playwright.async_api import (
 	Page,
 )
 
+from browser_use.browser.asset_cache import get_asset_cache
+from browser_use.browser.network import NetworkIdleTracker, NetworkWait, RequestBlocker, RequestBlockingProfile
 from browser_use.browser.views import (
 	BrowserError,
 	BrowserState,
@@ -59,7 +61,7 @@ class BrowserContextConfig:
 	                Disable browser security features
 
 	    minimum_wait_page_load_time: 0.5
-	        Minimum time to wait before getting page state for LLM input
+	        Minimum time to wait before getting page state for LLM input, skipped if the network was idle already
 
 	        wait_for_network_idle_page_load_time: 1.0
 	                Time to wait for network requests to finish before getting page state.
@@ -107,6 +109,42 @@ class BrowserContextConfig:
 
 	    include_dynamic_attributes: bool = True
 	        Include dynamic attributes in the CSS selector. If you want to reuse the css_selectors, it might be better to set this to False.
+
+	    screenshot_format: 'png'
+	        Encoding of state screenshots: 'png', 'jpeg' or 'webp'. JPEG/WebP are much smaller to hold in history and send to the LLM.
+
+	    screenshot_quality: 80
+	        Quality (0-100) for 'jpeg' and 'webp' screenshots.
+
+	    screenshot_max_width: None
+	    screenshot_max_height: None
+	        Downscale screenshots to fit these dimensions (in output pixels). None keeps the full resolution.
+
+	    skip_unchanged_screenshots: False
+	        Reuse the previous screenshot when a cheap page signature (url, scroll position, viewport, element count, text length, form values) is unchanged.
+	        The signature misses purely visual changes (hover, validation colours, images finishing loading), so this is opt-in.
+
+	    incremental_dom: False
+	        Keep a MutationObserver in the page and only rebuild the DOM subtrees that changed since the last step.
+	        Much cheaper on large pages; the tree is still rebuilt fully on navigation, scroll, resize and every full_dom_refresh_interval steps.
+
+	    full_dom_refresh_interval: 10
+	        With incremental_dom, force a full DOM rebuild after this many steps.
+
+	    unique_selectors: False
+	        While building the DOM, find the shortest css selector that matches only one element for every highlighted element.
+	        Used to locate elements and recorded in history for replay; costs extra selector queries on every build.
+
+	    request_blocking: None
+	        Abort requests the agent does not need: 'trackers', 'light' (also media, fonts and images over 1MB), 'text' (also all images)
+	        or a RequestBlockingProfile. Counts are kept in BrowserContext.request_blocker.stats. Routing disables the browser's HTTP cache.
+
+	    asset_cache_dir: None
+	        Directory of an on-disk cache for scripts, stylesheets, fonts and images, shared by contexts and runs. Honors cache headers.
+	        Every new browser profile starts cold otherwise. Hits and misses are kept in BrowserContext.asset_cache.stats.
+
+	    asset_cache_max_size: 200MB
+	        Least recently used assets are evicted beyond this size (bytes).
 	"""
 
 	cookies_file: str | None = None
@@ -133,13 +171,56 @@ class BrowserContextConfig:
 	allowed_domains: list[str] | None = None
 	include_dynamic_attributes: bool = True
 
+	screenshot_format: Literal['png', 'jpeg', 'webp'] = 'png'
+	screenshot_quality: int = 80
+	screenshot_max_width: int | None = None
+	screenshot_max_height: int | None = None
+	skip_unchanged_screenshots: bool = False
+
+	incremental_dom: bool = False
+	full_dom_refresh_interval: int = 10
+	unique_selectors: bool = False
+
+	request_blocking: str | RequestBlockingProfile | None = None
+	asset_cache_dir: str | None = None
+	asset_cache_max_size: int = 200 * 1024 * 1024
+
 	_force_keep_context_alive: bool = False
 
 
+@dataclass
+class ElementLocatorCache:
+	"""Css selectors and element handles of the nodes of one browser state, dropped once the next state is captured"""
+
+	state: BrowserState | None = None
+	page: Page | None = None
+	# Keyed by id() of the node, the state keeps its nodes alive
+	selectors: dict[int, str] = field(default_factory=dict)
+	handles: dict[int, ElementHandle] = field(default_factory=dict)
+
+	async def dispose(self) -> None:
+		"""Release the element handles, Playwright keeps their remote objects alive in the page until then"""
+		handles, self.handles = list(self.handles.values()), {}
+		await asyncio.gather(*(_dispose_handle(handle) for handle in handles))
+
+
+async def _dispose_handle(handle: ElementHandle) -> None:
+	try:
+		await handle.dispose()
+	except Exception as e:
+		logger.debug(f'Failed to dispose element handle: {e}')
+
+
 @dataclass
 class BrowserSession:
 	context: PlaywrightBrowserContext
 	cached_state: BrowserState | None
+	# (page signature, base64 screenshot) of the last captured screenshot
+	last_screenshot: tuple[str, str] | None = None
+	# DomService holding the cached tree of the current page when incremental_dom is enabled
+	dom_service: DomService | None = None
+	network_trackers: dict[Page, NetworkIdleTracker] = field(default_factory=dict)
+	locator_cache: ElementLocatorCache = field(default_factory=ElementLocatorCache)
 
 
 @dataclass
@@ -168,6 +249,11 @@ class BrowserContext:
 
 		# Initialize these as None - they'll be set up when needed
 		self.session: BrowserSession | None = None
+		self._cookie_save_task: Optional[asyncio.Task] = None
+		self.request_blocker = RequestBlocker(config.request_blocking) if config.request_blocking else None
+		self.asset_cache = None
+		if config.asset_cache_dir:
+			self.asset_cache = get_asset_cache(config.asset_cache_dir, config.asset_cache_max_size)
 
 	async def __aenter__(self):
 		"""Async context manager entry"""
@@ -196,8 +282,16 @@ class BrowserContext:
 					logger.debug(f'Failed to remove CDP listener: {e}')
 				self._page_event_handler = None
 
+			if self._cookie_save_task is not None:
+				await self._cookie_save_task
 			await self.save_cookies()
 
+			if self.request_blocker:
+				stats = self.request_blocker.stats
+				logger.debug(f'Blocked {stats.requests} requests ({stats.bytes} bytes withheld): {stats.by_reason}')
+			if self.asset_cache:
+				logger.debug(f'Asset cache: {self.asset_cache.stats}')
+
 			if self.config.trace_path:
 				try:
 					await self.session.context.tracing.stop(path=os.path.join(self.config.trace_path, f'{self.context_id}.zip'))
@@ -278,6 +372,9 @@ class BrowserContext:
 						self.state.target_id = target['targetId']
 						break
 
+		# Track requests from the start, so the first wait already knows what is loading
+		self._get_network_tracker(self.session, active_page)
+
 		# Bring page to front
 		await active_page.bring_to_front()
 		await active_page.wait_for_load_state('load')
@@ -286,6 +383,8 @@ class BrowserContext:
 
 	def _add_new_page_listener(self, context: PlaywrightBrowserContext):
 		async def on_page(page: Page):
+			if self.session is not None:
+				self._get_network_tracker(self.session, page)
 			if self.browser.config.cdp_url:
 				await page.reload()  # Reload the page to avoid timeout errors
 			await page.wait_for_load_state()
@@ -331,6 +430,12 @@ class BrowserContext:
 		if self.config.trace_path:
 			await context.tracing.start(screenshots=True, snapshots=True, sources=True)
 
+		# Routes registered last run first: blocked requests never reach the cache
+		if self.asset_cache:
+			await context.route('**/*', self.asset_cache.handle)
+		if self.request_blocker:
+			await context.route('**/*', self.request_blocker.handle)
+
 		# Load cookies if they exist
 		if self.config.cookies_file and os.path.exists(self.config.cookies_file):
 			with open(self.config.cookies_file, 'r') as f:
@@ -377,187 +482,44 @@ class BrowserContext:
 
 		return context
 
-	async def _wait_for_stable_network(self):
-		page = await self.get_current_page()
+	def _get_network_tracker(self, session: BrowserSession, page: Page) -> NetworkIdleTracker:
+		"""Network tracker of the page, attached on first use and kept for the lifetime of the page"""
+		tracker = session.network_trackers.get(page)
+		if tracker is None or tracker.closed:
+			tracker = NetworkIdleTracker(page, self.config.wait_for_network_idle_page_load_time)
+			session.network_trackers[page] = tracker
+			page.once('close', lambda _: session.network_trackers.pop(page, None))
+		return tracker
 
-		pending_requests = set()
-		last_activity = asyncio.get_event_loop().time()
-
-		# Define relevant resource types and content types
-		RELEVANT_RESOURCE_TYPES = {
-			'document',
-			'stylesheet',
-			'image',
-			'font',
-			'script',
-			'iframe',
-		}
-
-		RELEVANT_CONTENT_TYPES = {
-			'text/html',
-			'text/css',
-			'application/javascript',
-			'image/',
-			'font/',
-			'application/json',
-		}
-
-		# Additional patterns to filter out
-		IGNORED_URL_PATTERNS = {
-			# Analytics and tracking
-			'analytics',
-			'tracking',
-			'telemetry',
-			'beacon',
-			'metrics',
-			# Ad-related
-			'doubleclick',
-			'adsystem',
-			'adserver',
-			'advertising',
-			# Social media widgets
-			'facebook.com/plugins',
-			'platform.twitter',
-			'linkedin.com/embed',
-			# Live chat and support
-			'livechat',
-			'zendesk',
-			'intercom',
-			'crisp.chat',
-			'hotjar',
-			# Push notifications
-			'push-notifications',
-			'onesignal',
-			'pushwoosh',
-			# Background sync/heartbeat
-			'heartbeat',
-			'ping',
-			'alive',
-			# WebRTC and streaming
-			'webrtc',
-			'rtmp://',
-			'wss://',
-			# Common CDNs for dynamic content
-			'cloudfront.net',
-			'fastly.net',
-		}
-
-		async def on_request(request):
-			# Filter by resource type
-			if request.resource_type not in RELEVANT_RESOURCE_TYPES:
-				return
-
-			# Filter out streaming, websocket, and other real-time requests
-			if request.resource_type in {
-				'websocket',
-				'media',
-				'eventsource',
-				'manifest',
-				'other',
-			}:
-				return
-
-			# Filter out by URL patterns
-			url = request.url.lower()
-			if any(pattern in url for pattern in IGNORED_URL_PATTERNS):
-				return
-
-			# Filter out data URLs and blob URLs
-			if url.startswith(('data:', 'blob:')):
-				return
-
-			# Filter out requests with certain headers
-			headers = request.headers
-			if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in [
-				'video',
-				'audio',
-			]:
-				return
-
-			nonlocal last_activity
-			pending_requests.add(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request started: {request.url} ({request.resource_type})')
-
-		async def on_response(response):
-			request = response.request
-			if request not in pending_requests:
-				return
-
-			# Filter by content type if available
-			content_type = response.headers.get('content-type', '').lower()
-
-			# Skip if content type indicates streaming or real-time data
-			if any(
-				t in content_type
-				for t in [
-					'streaming',
-					'video',
-					'audio',
-					'webm',
-					'mp4',
-					'event-stream',
-					'websocket',
-					'protobuf',
-				]
-			):
-				pending_requests.remove(request)
-				return
-
-			# Only process relevant content types
-			if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
-				pending_requests.remove(request)
-				return
-
-			# Skip if response is too large (likely not essential for page load)
-			content_length = response.headers.get('content-length')
-			if content_length and int(content_length) > 5 * 1024 * 1024:  # 5MB
-				pending_requests.remove(request)
-				return
-
-			nonlocal last_activity
-			pending_requests.remove(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request resolved: {request.url} ({content_type})')
-
-		# Attach event listeners
-		page.on('request', on_request)
-		page.on('response', on_response)
-
-		try:
-			# Wait for idle time
-			start_time = asyncio.get_event_loop().time()
-			while True:
-				await asyncio.sleep(0.1)
-				now = asyncio.get_event_loop().time()
-				if len(pending_requests) == 0 and (now - last_activity) >= self.config.wait_for_network_idle_page_load_time:
-					break
-				if now - start_time > self.config.maximum_wait_page_load_time:
-					logger.debug(
-						f'Network timeout after {self.config.maximum_wait_page_load_time}s with {len(pending_requests)} '
-						f'pending requests: {[r.url for r in pending_requests]}'
-					)
-					break
-
-		finally:
-			# Clean up event listeners
-			page.remove_listener('request', on_request)
-			page.remove_listener('response', on_response)
+	async def _wait_for_stable_network(self) -> NetworkWait:
+		session = await self.get_session()
+		page = await self.get_current_page()
+		tracker = self._get_network_tracker(session, page)
 
-		logger.debug(f'Network stabilized for {self.config.wait_for_network_idle_page_load_time} seconds')
+		result = await tracker.wait_for_idle(self.config.maximum_wait_page_load_time)
+		if result.reason == 'timeout':
+			logger.debug(
+				f'Network timeout after {self.config.maximum_wait_page_load_time}s with {len(result.pending_urls)} '
+				f'pending requests: {result.pending_urls}'
+			)
+		else:
+			logger.debug(f'Network {result.reason} after {result.waited:.2f}s')
+		return result
 
 	async def _wait_for_page_and_frames_load(self, timeout_overwrite: float | None = None):
 		"""
 		Ensures page is fully loaded before continuing.
 		Waits for either network to be idle or minimum WAIT_TIME, whichever is longer.
+		The minimum is skipped when the network was idle already.
 		Also checks if the loaded URL is allowed.
 		"""
 		# Start timing
 		start_time = time.time()
 
 		# Wait for page load
+		network_wait = None
 		try:
-			await self._wait_for_stable_network()
+			network_wait = await self._wait_for_stable_network()
 
 			# Check if the loaded URL is allowed
 			page = await self.get_current_page()
@@ -568,9 +530,11 @@ class BrowserContext:
 			logger.warning('Page load failed, continuing...')
 			pass
 
-		# Calculate remaining time to meet minimum WAIT_TIME
+		# Calculate remaining time to meet minimum WAIT_TIME, not needed if nothing was loading
 		elapsed = time.time() - start_time
 		remaining = max((timeout_overwrite or self.config.minimum_wait_page_load_time) - elapsed, 0)
+		if timeout_overwrite is None and network_wait is not None and network_wait.reason == 'already_idle':
+			remaining = 0
 
 		logger.debug(f'--Page loaded in {elapsed:.2f} seconds, waiting for additional {remaining:.2f} seconds')
 
@@ -741,19 +705,23 @@ class BrowserContext:
 		return structure
 
 	@time_execution_sync('--get_state')  # This decorator might need to be updated to handle async
-	async def get_state(self) -> BrowserState:
-		"""Get the current state of the browser"""
+	async def get_state(self, include_screenshot: bool = True) -> BrowserState:
+		"""Get the current state of the browser
+
+		Pass include_screenshot=False when nothing will look at the screenshot (no vision, no GIF) to skip capturing it.
+		"""
 		await self._wait_for_page_and_frames_load()
 		session = await self.get_session()
-		session.cached_state = await self._update_state()
+		session.cached_state = await self._update_state(include_screenshot=include_screenshot)
+		await session.locator_cache.dispose()
 
-		# Save cookies if a file is specified
-		if self.config.cookies_file:
-			asyncio.create_task(self.save_cookies())
+		# Save cookies if a file is specified, in the background and skipped while the last save is still running
+		if self.config.cookies_file and (self._cookie_save_task is None or self._cookie_save_task.done()):
+			self._cookie_save_task = asyncio.create_task(self.save_cookies())
 
 		return session.cached_state
 
-	async def _update_state(self, focus_element: int = -1) -> BrowserState:
+	async def _update_state(self, focus_element: int = -1, include_screenshot: bool = True) -> BrowserState:
 		"""Update and return state."""
 		session = await self.get_session()
 
@@ -775,19 +743,24 @@ class BrowserContext:
 
 		try:
 			await self.remove_highlights()
-			dom_service = DomService(page)
+			dom_service = self._get_dom_service(page)
 			content = await dom_service.get_clickable_elements(
 				focus_element=focus_element,
 				viewport_expansion=self.config.viewport_expansion,
 				highlight_elements=self.config.highlight_elements,
+				incremental=self.config.incremental_dom,
+				full_refresh_interval=self.config.full_dom_refresh_interval,
+				unique_selectors=self.config.unique_selectors,
+				include_dynamic_attributes=self.config.include_dynamic_attributes,
 			)
 
-			screenshot_b64 = await self.take_screenshot()
+			screenshot_b64 = await self._get_state_screenshot(page, focus_element) if include_screenshot else None
 			pixels_above, pixels_below = await self.get_scroll_info(page)
 
 			self.current_state = BrowserState(
 				element_tree=content.element_tree,
 				selector_map=content.selector_map,
+				elements_token=content.elements_token,
 				url=page.url,
 				title=await page.title(),
 				tabs=await self.get_tabs_info(),
@@ -804,21 +777,44 @@ class BrowserContext:
 				return self.current_state
 			raise
 
+	def _get_dom_service(self, page: Page) -> DomService:
+		"""DomService for the page; with incremental_dom it is kept so its cached tree can be patched"""
+		if not self.config.incremental_dom or self.session is None:
+			return DomService(page)
+		if self.session.dom_service is None or self.session.dom_service.page is not page:
+			self.session.dom_service = DomService(page)
+		return self.session.dom_service
+
 	# region - Browser Actions
 	@time_execution_async('--take_screenshot')
 	async def take_screenshot(self, full_page: bool = False) -> str:
 		"""
-		Returns a base64 encoded screenshot of the current page.
+		Returns a base64 encoded screenshot of the current page, encoded as configured by
+		screenshot_format / screenshot_quality / screenshot_max_width / screenshot_max_height.
 		"""
 		page = await self.get_current_page()
 
 		await page.bring_to_front()
 		await page.wait_for_load_state()
 
-		screenshot = await page.screenshot(
-			full_page=full_page,
-			animations='disabled',
-		)
+		screenshot_format = self.config.screenshot_format
+		if screenshot_format != 'png' or self.config.screenshot_max_width or self.config.screenshot_max_height:
+			try:
+				# CDP encodes, downscales and base64-encodes in the browser in one call
+				return await self._capture_screenshot_cdp(page, full_page)
+			except Exception as e:
+				logger.debug(f'CDP screenshot failed, falling back to Playwright screenshot: {str(e)}')
+
+		if screenshot_format == 'png':
+			screenshot = await page.screenshot(full_page=full_page, animations='disabled')
+		else:
+			# Playwright cannot encode WebP, JPEG is the closest fallback
+			screenshot = await page.screenshot(
+				full_page=full_page,
+				animations='disabled',
+				type='jpeg',
+				quality=self.config.screenshot_quality,
+			)
 
 		screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
 
@@ -826,6 +822,88 @@ class BrowserContext:
 
 		return screenshot_b64
 
+	async def _capture_screenshot_cdp(self, page: Page, full_page: bool) -> str:
+		"""Capture a screenshot with Page.captureScreenshot, applying format, quality and max dimensions"""
+		metrics = await page.evaluate(
+			"""(fullPage) => ({
+				x: fullPage ? 0 : window.scrollX,
+				y: fullPage ? 0 : window.scrollY,
+				width: fullPage ? document.documentElement.scrollWidth : window.innerWidth,
+				height: fullPage ? document.documentElement.scrollHeight : window.innerHeight,
+				dpr: window.devicePixelRatio || 1,
+			})""",
+			full_page,
+		)
+
+		scale = 1.0
+		output_width = metrics['width'] * metrics['dpr']
+		output_height = metrics['height'] * metrics['dpr']
+		if self.config.screenshot_max_width and output_width > self.config.screenshot_max_width:
+			scale = min(scale, self.config.screenshot_max_width / output_width)
+		if self.config.screenshot_max_height and output_height > self.config.screenshot_max_height:
+			scale = min(scale, self.config.screenshot_max_height / output_height)
+
+		params: dict = {
+			'format': self.config.screenshot_format,
+			'captureBeyondViewport': full_page,
+			'clip': {
+				'x': metrics['x'],
+				'y': metrics['y'],
+				'width': metrics['width'],
+				'height': metrics['height'],
+				'scale': scale,
+			},
+		}
+		if self.config.screenshot_format != 'png':
+			params['quality'] = self.config.screenshot_quality
+
+		cdp_session = await page.context.new_cdp_session(page)  # type: ignore
+		try:
+			result = await cdp_session.send('Page.captureScreenshot', params)
+		finally:
+			await cdp_session.detach()
+		return result['data']
+
+	async def _get_state_screenshot(self, page: Page, focus_element: int = -1) -> str:
+		"""Screenshot for a new state, reusing the previous one if the page has not visibly changed"""
+		if not self.config.skip_unchanged_screenshots:
+			return await self.take_screenshot()
+
+		session = await self.get_session()
+		try:
+			signature = await self._get_page_signature(page)
+			signature = f'{signature}|{focus_element}'
+		except Exception as e:
+			logger.debug(f'Failed to compute page signature: {str(e)}')
+			return await self.take_screenshot()
+
+		if session.last_screenshot is not None and session.last_screenshot[0] == signature:
+			logger.debug('Page unchanged since last screenshot, reusing it')
+			return session.last_screenshot[1]
+
+		screenshot_b64 = await self.take_screenshot()
+		session.last_screenshot = (signature, screenshot_b64)
+		return screenshot_b64
+
+	async def _get_page_signature(self, page: Page) -> str:
+		"""Cheap fingerprint of what is visible on the page, used to detect that nothing changed"""
+		return await page.evaluate(
+			"""() => {
+				const parts = [
+					location.href,
+					window.scrollX, window.scrollY,
+					window.innerWidth, window.innerHeight,
+					document.getElementsByTagName('*').length,
+					document.body ? document.body.innerText.length : 0,
+					document.activeElement ? document.activeElement.tagName : '',
+				];
+				for (const el of document.querySelectorAll('input, textarea, select')) {
+					parts.push(el.type === 'checkbox' || el.type === 'radio' ? (el.checked ? 1 : 0) : el.value);
+				}
+				return parts.join('|');
+			}"""
+		)
+
 	@time_execution_async('--remove_highlights')
 	async def remove_highlights(self):
 		"""
@@ -915,6 +993,8 @@ class BrowserContext:
 	def _enhanced_css_selector_for_element(cls, element: DOMElementNode, include_dynamic_attributes: bool = True) -> str:
 		"""
 		Creates a CSS selector for a DOM element, handling various edge cases and special characters.
+		Prefers the short selector buildDomTree.js verified to be unique on the page, if the element has one
+		and it only uses data-* attributes when dynamic attributes are allowed.
 
 		Args:
 		        element: The DOM element to create a selector for
@@ -922,6 +1002,9 @@ class BrowserContext:
 		Returns:
 		        A valid CSS selector string
 		"""
+		if element.unique_selector and (include_dynamic_attributes or '[data-' not in element.unique_selector):
+			return element.unique_selector
+
 		try:
 			# Get base selector from XPath
 			css_selector = cls._convert_simple_xpath_to_css_selector(element.xpath)
@@ -1018,48 +1101,112 @@ class BrowserContext:
 			return f"{tag_name}[highlight_index='{element.highlight_index}']"
 
 	@time_execution_async('--get_locate_element')
-	async def get_locate_element(self, element: DOMElementNode) -> Optional[ElementHandle]:
-		current_frame = await self.get_current_page()
-
-		# Start with the target element and collect all parents
-		parents: list[DOMElementNode] = []
-		current = element
-		while current.parent is not None:
-			parent = current.parent
-			parents.append(parent)
-			current = parent
-
-		# Reverse the parents list to process from top to bottom
-		parents.reverse()
-
-		# Process all iframe parents in sequence
-		iframes = [item for item in parents if item.tag_name == 'iframe']
-		for parent in iframes:
-			css_selector = self._enhanced_css_selector_for_element(
-				parent,
-				include_dynamic_attributes=self.config.include_dynamic_attributes,
-			)
-			current_frame = current_frame.frame_locator(css_selector)
+	async def get_locate_element(self, element: DOMElementNode, scroll_into_view: bool = True) -> Optional[ElementHandle]:
+		"""
+		Nodes of the current state are looked up by highlight index in the registry buildDomTree.js leaves on the page,
+		without matching a selector; their selectors and handles are reused until the next state is captured.
+		Elements inside iframes and nodes of other trees are located by css selector.
+		"""
+		page = await self.get_current_page()
+		cache = await self._get_locator_cache(page, element)
 
-		css_selector = self._enhanced_css_selector_for_element(
-			element, include_dynamic_attributes=self.config.include_dynamic_attributes
-		)
+		iframes: list[DOMElementNode] = []
+		current = element.parent
+		while current is not None:
+			if current.tag_name == 'iframe':
+				iframes.append(current)
+			current = current.parent
+		# Process from top to bottom
+		iframes.reverse()
 
 		try:
-			if isinstance(current_frame, FrameLocator):
-				element_handle = await current_frame.locator(css_selector).element_handle()
-				return element_handle
-			else:
-				# Try to scroll into view if hidden
+			element_handle = await self._cached_element_handle(cache, element)
+			if element_handle is None and cache is not None and not iframes:
+				element_handle = await self._get_highlighted_element(page, cache.state.elements_token, element)
+
+			if element_handle is None:
+				current_frame: Page | FrameLocator = page
+				for parent in iframes:
+					current_frame = current_frame.frame_locator(self._get_css_selector(cache, parent))
+				css_selector = self._get_css_selector(cache, element)
+
+				if isinstance(current_frame, FrameLocator):
+					# Elements inside iframes are not scrolled into view
+					return await current_frame.locator(css_selector).element_handle()
 				element_handle = await current_frame.query_selector(css_selector)
-				if element_handle:
-					await element_handle.scroll_into_view_if_needed()
-					return element_handle
-				return None
+				if element_handle is None:
+					return None
+
+			if cache is not None:
+				cache.handles[id(element)] = element_handle
+			# Playwright actions scroll on their own, callers using them skip this round trip
+			if scroll_into_view:
+				await element_handle.scroll_into_view_if_needed()
+			return element_handle
 		except Exception as e:
 			logger.error(f'Failed to locate element: {str(e)}')
 			return None
 
+	async def _get_locator_cache(self, page: Page, element: DOMElementNode) -> Optional[ElementLocatorCache]:
+		"""Locator cache of the current state, None if the node is not one of its highlighted elements"""
+		session = await self.get_session()
+		state = session.cached_state
+		if state is None or element.highlight_index is None or state.selector_map.get(element.highlight_index) is not element:
+			return None
+
+		cache = session.locator_cache
+		if cache.state is not state or cache.page is not page:
+			await cache.dispose()
+			cache = session.locator_cache = ElementLocatorCache(state=state, page=page)
+		return cache
+
+	def _get_css_selector(self, cache: Optional[ElementLocatorCache], element: DOMElementNode) -> str:
+		if cache is not None and id(element) in cache.selectors:
+			return cache.selectors[id(element)]
+		css_selector = self._enhanced_css_selector_for_element(
+			element, include_dynamic_attributes=self.config.include_dynamic_attributes
+		)
+		if cache is not None:
+			cache.selectors[id(element)] = css_selector
+		return css_selector
+
+	@staticmethod
+	async def _cached_element_handle(cache: Optional[ElementLocatorCache], element: DOMElementNode) -> Optional[ElementHandle]:
+		"""Handle found earlier for the same state, if the element is still attached"""
+		if cache is None or id(element) not in cache.handles:
+			return None
+		element_handle = cache.handles[id(element)]
+		try:
+			if await element_handle.evaluate('el => el.isConnected'):
+				return element_handle
+		except Exception:
+			pass
+		del cache.handles[id(element)]
+		await _dispose_handle(element_handle)
+		return None
+
+	@staticmethod
+	async def _get_highlighted_element(
+		page: Page, elements_token: Optional[str], element: DOMElementNode
+	) -> Optional[ElementHandle]:
+		"""Element registered by buildDomTree.js under its highlight index, None once the page changed since"""
+		if elements_token is None:
+			return None
+		js_handle = await page.evaluate_handle(
+			"""([token, index, tagName]) => {
+				const registry = window.__browserUseElements;
+				if (!registry || registry.token !== token) return null;
+				const el = registry.elements[index];
+				if (!el || !el.isConnected || el.tagName.toLowerCase() !== tagName) return null;
+				return el;
+			}""",
+			[elements_token, element.highlight_index, (element.tag_name or '').lower()],
+		)
+		element_handle = js_handle.as_element()
+		if element_handle is None:
+			await js_handle.dispose()
+		return element_handle
+
 	@time_execution_async('--input_text_element_node')
 	async def _input_text_element_node(self, element_node: DOMElementNode, text: str):
 		"""
@@ -1071,7 +1218,7 @@ class BrowserContext:
 			# if element_node.highlight_index is not None:
 			# 	await self._update_state(focus_element=element_node.highlight_index)
 
-			element_handle = await self.get_locate_element(element_node)
+			element_handle = await self.get_locate_element(element_node, scroll_into_view=False)
 
 			if element_handle is None:
 				raise BrowserError(f'Element: {repr(element_node)} not found')
@@ -1097,6 +1244,81 @@ class BrowserContext:
 			logger.debug(f'Failed to input text into element: {repr(element_node)}. Error: {str(e)}')
 			raise BrowserError(f'Failed to input text into index {element_node.highlight_index}')
 
+	@time_execution_async('--fill_elements')
+	async def _fill_elements(self, fields: list[dict]) -> list[dict]:
+		"""
+		Fill several form fields in a single page evaluation.
+		Each field is a dict with a css `selector` and/or an `xpath` (tried in that order) and a `value`.
+		Values are assigned through the native value setter and followed by input/change events,
+		so framework-controlled inputs (React, Vue) register the change.
+		Returns one result dict per field: {'status': 'ok' | 'not_found' | 'mismatch' | 'error', 'value', 'error'}.
+		"""
+		page = await self.get_current_page()
+		return await page.evaluate(
+			"""(fields) => {
+				const find = (field) => {
+					if (field.selector) {
+						try {
+							const el = document.querySelector(field.selector);
+							if (el) return el;
+						} catch (e) {}
+					}
+					if (field.xpath) {
+						const xpath = field.xpath.startsWith('/') ? field.xpath : '/' + field.xpath;
+						return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+					}
+					return null;
+				};
+				const setNativeValue = (el, value) => {
+					const proto = Object.getPrototypeOf(el);
+					const descriptor = Object.getOwnPropertyDescriptor(proto, 'value');
+					if (descriptor && descriptor.set) descriptor.set.call(el, value);
+					else el.value = value;
+				};
+				const fire = (el, type) => el.dispatchEvent(new Event(type, { bubbles: true }));
+
+				return fields.map((field) => {
+					try {
+						const el = find(field);
+						if (!el) return { status: 'not_found', value: null, error: null };
+						if (el.disabled || el.readOnly) return { status: 'error', value: null, error: 'element is disabled or read-only' };
+
+						const value = field.value;
+						const tag = el.tagName.toLowerCase();
+						const type = (el.getAttribute('type') || '').toLowerCase();
+						el.focus();
+						if (tag === 'select') {
+							const option = Array.from(el.options).find((o) => o.value === value || o.text.trim() === value.trim());
+							if (!option) return { status: 'error', value: el.value, error: `no option "${value}"` };
+							el.value = option.value;
+							fire(el, 'input');
+							fire(el, 'change');
+							return { status: 'ok', value: option.text.trim(), error: null };
+						}
+						if (type === 'checkbox' || type === 'radio') {
+							const checked = ['true', 'yes', '1', 'on', 'checked'].includes(value.trim().toLowerCase());
+							if (el.checked !== checked) el.click();
+							return { status: el.checked === checked ? 'ok' : 'mismatch', value: String(el.checked), error: null };
+						}
+						if (el.isContentEditable) {
+							el.textContent = value;
+							fire(el, 'input');
+							el.blur();
+							return { status: el.textContent === value ? 'ok' : 'mismatch', value: el.textContent, error: null };
+						}
+						setNativeValue(el, value);
+						fire(el, 'input');
+						fire(el, 'change');
+						el.blur();
+						return { status: el.value === value ? 'ok' : 'mismatch', value: el.value, error: null };
+					} catch (e) {
+						return { status: 'error', value: null, error: String(e) };
+					}
+				});
+			}""",
+			fields,
+		)
+
 	@time_execution_async('--click_element_node')
 	async def _click_element_node(self, element_node: DOMElementNode) -> Optional[str]:
 		"""
@@ -1109,7 +1331,7 @@ class BrowserContext:
 			# if element_node.highlight_index is not None:
 			# 	await self._update_state(focus_element=element_node.highlight_index)
 
-			element_handle = await self.get_locate_element(element_node)
+			element_handle = await self.get_locate_element(element_node, scroll_into_view=False)
 
 			if element_handle is None:
 				raise Exception(f'Element: {repr(element_node)} not found')
@@ -1258,16 +1480,21 @@ class BrowserContext:
 				cookies = await self.session.context.cookies()
 				logger.debug(f'Saving {len(cookies)} cookies to {self.config.cookies_file}')
 
-				# Check if the path is a directory and create it if necessary
-				dirname = os.path.dirname(self.config.cookies_file)
-				if dirname:
-					os.makedirs(dirname, exist_ok=True)
-
-				with open(self.config.cookies_file, 'w') as f:
-					json.dump(cookies, f)
+				# File I/O runs in a thread so it does not block the event loop
+				await asyncio.to_thread(self._write_cookies_file, self.config.cookies_file, cookies)
 			except Exception as e:
 				logger.warning(f'Failed to save cookies: {str(e)}')
 
+	@staticmethod
+	def _write_cookies_file(cookies_file: str, cookies: list) -> None:
+		# Check if the path is a directory and create it if necessary
+		dirname = os.path.dirname(cookies_file)
+		if dirname:
+			os.makedirs(dirname, exist_ok=True)
+
+		with open(cookies_file, 'w') as f:
+			json.dump(cookies, f)
+
 	async def is_file_uploader(self, element_node: DOMElementNode, max_depth: int = 3, current_depth: int = 0) -> bool:
 		"""Check if element or its children are file uploaders"""
 		if current_depth > max_depth:
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Literal, Optional, Union
+
+from playwright.async_api import Page, Request, Response, Route
+
+logger = logging.getLogger(__name__)
+
+# Requests that count towards page load
+RELEVANT_RESOURCE_TYPES = {
+	'document',
+	'stylesheet',
+	'image',
+	'font',
+	'script',
+	'iframe',
+}
+
+RELEVANT_CONTENT_TYPES = {
+	'text/html',
+	'text/css',
+	'application/javascript',
+	'image/',
+	'font/',
+	'application/json',
+}
+
+# Responses that keep streaming and never finish loading
+STREAMING_CONTENT_TYPES = (
+	'streaming',
+	'video',
+	'audio',
+	'webm',
+	'mp4',
+	'event-stream',
+	'websocket',
+	'protobuf',
+)
+
+# Third party trackers, ads and widgets a page works without, safe to block
+TRACKER_URL_PATTERNS = {
+	# Analytics and tracking
+	'analytics',
+	'telemetry',
+	'beacon',
+	# Ad-related
+	'doubleclick',
+	'adsystem',
+	'adserver',
+	'advertising',
+	# Social media widgets
+	'facebook.com/plugins',
+	'platform.twitter',
+	'linkedin.com/embed',
+	# Live chat and support
+	'livechat',
+	'zendesk',
+	'intercom',
+	'crisp.chat',
+	'hotjar',
+	# Push notifications
+	'push-notifications',
+	'onesignal',
+	'pushwoosh',
+}
+
+# Additional patterns to filter out
+IGNORED_URL_PATTERNS = TRACKER_URL_PATTERNS | {
+	# Analytics and tracking
+	'tracking',
+	'metrics',
+	# Background sync/heartbeat
+	'heartbeat',
+	'ping',
+	'alive',
+	# WebRTC and streaming
+	'webrtc',
+	'rtmp://',
+	'wss://',
+	# Common CDNs for dynamic content
+	'cloudfront.net',
+	'fastly.net',
+}
+
+MAX_RELEVANT_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB, larger responses are likely not essential for page load
+
+
+def is_relevant_request(request: Request) -> bool:
+	"""Whether the page has to wait for this request before it counts as loaded"""
+	if request.resource_type not in RELEVANT_RESOURCE_TYPES:
+		return False
+
+	# Filter out by URL patterns, data URLs and blob URLs
+	url = request.url.lower()
+	if url.startswith(('data:', 'blob:')):
+		return False
+	if any(pattern in url for pattern in IGNORED_URL_PATTERNS):
+		return False
+
+	# Filter out prefetches and media
+	headers = request.headers
+	if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in ('video', 'audio'):
+		return False
+	return True
+
+
+def is_relevant_response(response: Response) -> bool:
+	"""Whether a finished response counts as network activity, streams and large downloads do not"""
+	content_type = response.headers.get('content-type', '').lower()
+	if any(t in content_type for t in STREAMING_CONTENT_TYPES):
+		return False
+	if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
+		return False
+	content_length = response.headers.get('content-length')
+	if content_length and content_length.isdigit() and int(content_length) > MAX_RELEVANT_CONTENT_LENGTH:
+		return False
+	return True
+
+
+@dataclass
+class NetworkWait:
+	"""Outcome of waiting for the network to go idle"""
+
+	reason: Literal['already_idle', 'idle', 'timeout', 'closed']
+	waited: float  # s
+	pending_urls: list[str] = field(default_factory=list)
+
+
+class NetworkIdleTracker:
+	"""Follows the relevant requests of one page through its events and resolves waiters once the network is idle.
+
+	Attached once per page, so requests started by an action are tracked before anyone waits for them.
+	The network is idle when no relevant request is pending and none finished within idle_time seconds.
+	A new tracker counts as active, it cannot know what the page requested before it was attached.
+	"""
+
+	def __init__(self, page: Page, idle_time: float):
+		self.page = page
+		self.idle_time = idle_time
+		self.pending: set[Request] = set()
+		self.closed = False
+
+		self._loop = asyncio.get_running_loop()
+		self.last_activity = self._loop.time()
+		self._idle_timer: Optional[asyncio.TimerHandle] = None
+		self._idle_future: Optional[asyncio.Future[None]] = None
+
+		page.on('request', self._on_request)
+		page.on('response', self._on_response)
+		page.on('requestfinished', self._on_request_done)
+		page.on('requestfailed', self._on_request_done)
+		page.on('close', self._on_close)
+
+	def detach(self) -> None:
+		for event, handler in (
+			('request', self._on_request),
+			('response', self._on_response),
+			('requestfinished', self._on_request_done),
+			('requestfailed', self._on_request_done),
+			('close', self._on_close),
+		):
+			try:
+				self.page.remove_listener(event, handler)
+			except Exception as e:
+				logger.debug(f'Failed to remove {event} listener: {e}')
+		self._on_close()
+
+	def is_idle(self) -> bool:
+		return self.closed or (not self.pending and self._loop.time() - self.last_activity >= self.idle_time)
+
+	async def wait_for_idle(self, timeout: float) -> NetworkWait:
+		"""Wait until the network is idle, at most timeout seconds"""
+		start = self._loop.time()
+		if self.is_idle():
+			return NetworkWait('closed' if self.closed else 'already_idle', 0.0)
+
+		if self._idle_future is None or self._idle_future.done():
+			self._idle_future = self._loop.create_future()
+			self._schedule_idle_check()
+		try:
+			await asyncio.wait_for(asyncio.shield(self._idle_future), timeout)
+		except asyncio.TimeoutError:
+			return NetworkWait('timeout', self._loop.time() - start, [r.url for r in self.pending])
+		return NetworkWait('closed' if self.closed else 'idle', self._loop.time() - start)
+
+	def _on_request(self, request: Request) -> None:
+		if not is_relevant_request(request):
+			return
+		self.pending.add(request)
+		self._mark_activity()
+
+	def _on_response(self, response: Response) -> None:
+		request = response.request
+		if request not in self.pending:
+			return
+		self.pending.discard(request)
+		if is_relevant_response(response):
+			self._mark_activity()
+		else:
+			self._schedule_idle_check()
+
+	def _on_request_done(self, request: Request) -> None:
+		# Finished requests were usually settled by their response already, failed ones never get one
+		if request in self.pending:
+			self.pending.discard(request)
+			self._mark_activity()
+
+	def _on_close(self, *args) -> None:
+		self.closed = True
+		self.pending.clear()
+		self._resolve_idle()
+
+	def _mark_activity(self) -> None:
+		self.last_activity = self._loop.time()
+		self._schedule_idle_check()
+
+	def _schedule_idle_check(self) -> None:
+		"""(Re)arm the timer that resolves waiters once idle_time passed without activity"""
+		if self._idle_timer is not None:
+			self._idle_timer.cancel()
+			self._idle_timer = None
+		if self.pending or self._idle_future is None or self._idle_future.done():
+			return
+		delay = max(self.last_activity + self.idle_time - self._loop.time(), 0)
+		self._idle_timer = self._loop.call_later(delay, self._resolve_idle)
+
+	def _resolve_idle(self) -> None:
+		self._idle_timer = None
+		if self._idle_future is not None and not self._idle_future.done() and (self.closed or not self.pending):
+			self._idle_future.set_result(None)
+
+
+@dataclass
+class RequestBlockingProfile:
+	"""Requests aborted before they reach the network. Documents are never blocked.
+
+	Requests of max_content_length_resource_types are checked with a HEAD request first and answered with an empty
+	response if the reported size exceeds max_content_length (bytes); those of unknown size load normally.
+	"""
+
+	resource_types: set[str] = field(default_factory=set)
+	url_patterns: set[str] = field(default_factory=set)
+	max_content_length: Optional[int] = None
+	max_content_length_resource_types: set[str] = field(default_factory=lambda: {'image', 'media'})
+
+	def block_reason(self, request: Request) -> Optional[str]:
+		if request.resource_type == 'document':
+			return None
+		if request.resource_type in self.resource_types:
+			return request.resource_type
+		url = request.url.lower()
+		if not url.startswith(('data:', 'blob:')) and any(pattern in url for pattern in self.url_patterns):
+			return 'url_pattern'
+		return None
+
+
+BLOCKING_PROFILES = {
+	# Trackers, ads and chat widgets
+	'trackers': RequestBlockingProfile(url_patterns=TRACKER_URL_PATTERNS),
+	# Also video, audio, web fonts and images over 1MB
+	'light': RequestBlockingProfile(
+		resource_types={'media', 'font'},
+		url_patterns=TRACKER_URL_PATTERNS,
+		max_content_length=1024 * 1024,
+	),
+	# Also all images, for tasks that only read and fill forms without vision
+	'text': RequestBlockingProfile(resource_types={'media', 'font', 'image'}, url_patterns=TRACKER_URL_PATTERNS),
+}
+
+
+@dataclass
+class BlockedRequestStats:
+	"""What request blocking saved. Sizes of requests aborted before sending are unknown and count only as requests"""
+
+	requests: int = 0
+	bytes: int = 0
+	by_reason: dict[str, int] = field(default_factory=dict)
+
+	def record(self, reason: str, size: int = 0) -> None:
+		self.requests += 1
+		self.bytes += size
+		self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+
+class RequestBlocker:
+	"""Route handler applying a RequestBlockingProfile to every request of a browser context"""
+
+	def __init__(self, profile: Union[str, RequestBlockingProfile]):
+		if isinstance(profile, str):
+			if profile not in BLOCKING_PROFILES:
+				raise ValueError(f'Unknown request blocking profile {profile}, use one of {list(BLOCKING_PROFILES)}')
+			profile = BLOCKING_PROFILES[profile]
+		self.profile = profile
+		self.stats = BlockedRequestStats()
+		# Content length reported by HEAD per url, None if unknown
+		self._sizes: dict[str, Optional[int]] = {}
+
+	async def handle(self, route: Route, request: Request) -> None:
+		try:
+			reason = self.profile.block_reason(request)
+			if reason is not None:
+				self.stats.record(reason)
+				await route.abort('blockedbyclient')
+				return
+
+			max_content_length = self.profile.max_content_length
+			if max_content_length is not None and request.resource_type in self.profile.max_content_length_resource_types:
+				size = await self._content_length(route, request)
+				if size is not None and size > max_content_length:
+					self.stats.record('max_content_length', size)
+					await route.fulfill(status=204, body=b'')
+					return
+
+			# Not blocked: next route handler (e.g. the asset cache) or the network
+			await route.fallback()
+		except Exception as e:
+			# The page may have navigated away or closed while the request was routed
+			logger.debug(f'Request routing failed for {request.url}: {e}')
+			await fallback_route(route)
+
+	async def _content_length(self, route: Route, request: Request) -> Optional[int]:
+		"""Size from the headers of a HEAD request, so the body is never downloaded to decide"""
+		if request.method != 'GET' or request.url.startswith(('data:', 'blob:')):
+			return None
+		if request.url not in self._sizes:
+			size = None
+			try:
+				response = await route.fetch(method='HEAD')
+				content_length = response.headers.get('content-length')
+				if response.ok and content_length and content_length.isdigit():
+					size = int(content_length)
+			except Exception as e:
+				logger.debug(f'HEAD request failed for {request.url}: {e}')
+			self._sizes[request.url] = size
+		return self._sizes[request.url]
+
+
+async def fallback_route(route: Route) -> None:
+	"""Let the browser load a request normally, unless it was already handled"""
+	try:
+		await route.fallback()
+	except Exception:
+		pass
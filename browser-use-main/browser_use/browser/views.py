@@ -1,3 +1,6 @@
+import base64
+import binascii
+import struct
 from dataclasses import dataclass, field
 from typing import Any, Optional
 
@@ -16,6 +19,52 @@ class TabInfo(BaseModel):
 	title: str
 
 
+def screenshot_media_type(screenshot_b64: str) -> str:
+	"""Media type of a base64 encoded screenshot, detected from its leading bytes"""
+	if screenshot_b64.startswith('/9j/'):
+		return 'image/jpeg'
+	if screenshot_b64.startswith('UklGR'):
+		return 'image/webp'
+	return 'image/png'
+
+
+def image_dimensions(image_b64: str) -> Optional[tuple[int, int]]:
+	"""Width and height of a base64 encoded PNG, JPEG or WebP image, read from its header"""
+	try:
+		# Screenshot headers (including the JPEG frame header) sit well within the first 3 KB
+		data = base64.b64decode(image_b64[:4096])
+	except (binascii.Error, ValueError):
+		return None
+
+	if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+		return struct.unpack('>II', data[16:24])
+
+	if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+		chunk = data[12:16]
+		if chunk == b'VP8 ':
+			width, height = struct.unpack('<HH', data[26:30])
+			return width & 0x3FFF, height & 0x3FFF
+		if chunk == b'VP8L':
+			bits = int.from_bytes(data[21:25], 'little')
+			return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+		if chunk == b'VP8X':
+			return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+		return None
+
+	if data[:2] == b'\xff\xd8':
+		offset = 2
+		while offset + 9 <= len(data):
+			if data[offset] != 0xFF:
+				return None
+			marker = data[offset + 1]
+			# Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC)
+			if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+				height, width = struct.unpack('>HH', data[offset + 5 : offset + 9])
+				return width, height
+			offset += 2 + struct.unpack('>H', data[offset + 2 : offset + 4])[0]
+	return None
+
+
 @dataclass
 class BrowserState(DOMState):
 	url: str
@@ -136,7 +136,7 @@ class Registry(Generic[Context]):
 				extra_args['page_extraction_llm'] = page_extraction_llm
 			if 'available_file_paths' in parameter_names:
 				extra_args['available_file_paths'] = available_file_paths
-			if action_name == 'input_text' and sensitive_data:
+			if action_name in ('input_text', 'fill_fields') and sensitive_data:
 				extra_args['has_sensitive_data'] = True
 			if is_pydantic:
 				return await action.function(validated_params, **extra_args)
@@ -166,9 +166,8 @@ class Registry(Generic[Context]):
 				return [replace_secrets(v) for v in value]
 			return value
 
-		for key, value in params.model_dump().items():
-			params.__dict__[key] = replace_secrets(value)
-		return params
+		# Validated again so nested models (e.g. the fields of fill_fields) stay models instead of plain dicts
+		return type(params).model_validate(replace_secrets(params.model_dump()))
 
 	@time_execution_sync('--create_action_model')
 	def create_action_model(self, include_actions: Optional[list[str]] = None) -> Type[ActionModel]:
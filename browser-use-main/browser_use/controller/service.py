@@ -15,6 +15,7 @@ from browser_use.controller.registry.service import Registry
 from browser_use.controller.views import (
 	ClickElementAction,
 	DoneAction,
+	FillFieldsAction,
 	GoToUrlAction,
 	InputTextAction,
 	NoParamsAction,
@@ -24,6 +25,7 @@ from browser_use.controller.views import (
 	SendKeysAction,
 	SwitchTabAction,
 )
+from browser_use.dom.views import DOMElementNode
 from browser_use.utils import time_execution_sync
 
 logger = logging.getLogger(__name__)
@@ -32,6 +34,16 @@ logger = logging.getLogger(__name__)
 Context = TypeVar('Context')
 
 
+def _is_in_document_root(element: DOMElementNode) -> bool:
+	"""Whether the element can be found from the top-level document (not inside an iframe or shadow root)"""
+	current = element.parent
+	while current is not None:
+		if current.tag_name == 'iframe' or current.shadow_root:
+			return False
+		current = current.parent
+	return True
+
+
 class Controller(Generic[Context]):
 	def __init__(
 		self,
@@ -157,6 +169,71 @@ class Controller(Generic[Context]):
 			logger.debug(f'Element xpath: {element_node.xpath}')
 			return ActionResult(extracted_content=msg, include_in_memory=True)
 
+		@self.registry.action(
+			'Fill multiple input fields at once - give each field an element index (or css selector) and its value. Prefer this over several input_text actions when filling a form',
+			param_model=FillFieldsAction,
+		)
+		async def fill_fields(params: FillFieldsAction, browser: BrowserContext, has_sensitive_data: bool = False):
+			selector_map = await browser.get_selector_map()
+			batch: list[dict] = []
+			batch_positions: list[int] = []
+			# Elements inside iframes or shadow roots are not reachable from the document, fill them one by one
+			separate: list[tuple[int, DOMElementNode]] = []
+
+			for position, field in enumerate(params.fields):
+				if field.index is None:
+					batch.append({'selector': field.selector, 'xpath': None, 'value': field.value})
+					batch_positions.append(position)
+					continue
+				if field.index not in selector_map:
+					raise Exception(f'Element index {field.index} does not exist - retry or use alternative actions')
+				element_node = selector_map[field.index]
+				if _is_in_document_root(element_node):
+					batch.append(
+						{
+							'selector': browser._enhanced_css_selector_for_element(
+								element_node, include_dynamic_attributes=browser.config.include_dynamic_attributes
+							),
+							'xpath': element_node.xpath,
+							'value': field.value,
+						}
+					)
+					batch_positions.append(position)
+				else:
+					separate.append((position, element_node))
+
+			results: list[dict] = [{} for _ in params.fields]
+			if batch:
+				for position, result in zip(batch_positions, await browser._fill_elements(batch)):
+					results[position] = result
+			for position, element_node in separate:
+				try:
+					await browser._input_text_element_node(element_node, params.fields[position].value)
+					results[position] = {'status': 'ok', 'value': params.fields[position].value, 'error': None}
+				except Exception as e:
+					results[position] = {'status': 'error', 'value': None, 'error': str(e)}
+
+			lines = []
+			for field, result in zip(params.fields, results):
+				target = f'index {field.index}' if field.index is not None else field.selector
+				value = 'sensitive data' if has_sensitive_data else field.value
+				if result['status'] == 'ok':
+					lines.append(f'✅ {target}: {value}')
+				elif result['status'] == 'mismatch' and has_sensitive_data:
+					# What the field shows may be (part of) the secret
+					lines.append(f'⚠️ {target}: input does not show the expected {value}')
+				elif result['status'] == 'mismatch':
+					lines.append(f'⚠️ {target}: input shows {result["value"]!r} instead of {value!r}')
+				elif result['status'] == 'not_found':
+					lines.append(f'❌ {target}: element not found')
+				else:
+					lines.append(f'❌ {target}: {result["error"]}')
+
+			filled = sum(1 for result in results if result['status'] == 'ok')
+			msg = f'⌨️  Filled {filled}/{len(params.fields)} fields\n' + '\n'.join(lines)
+			logger.info(msg)
+			return ActionResult(extracted_content=msg, include_in_memory=True)
+
 		# Tab Management Actions
 		@self.registry.action('Switch tab', param_model=SwitchTabAction)
 		async def switch_tab(params: SwitchTabAction, browser: BrowserContext):
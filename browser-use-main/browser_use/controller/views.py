@@ -23,6 +23,22 @@ class InputTextAction(BaseModel):
 	xpath: Optional[str] = None
 
 
+class FillFieldItem(BaseModel):
+	index: Optional[int] = None
+	selector: Optional[str] = None
+	value: str
+
+	@model_validator(mode='after')
+	def require_target(self):
+		if self.index is None and not self.selector:
+			raise ValueError('Either index or selector is required')
+		return self
+
+
+class FillFieldsAction(BaseModel):
+	fields: list[FillFieldItem]
+
+
 class DoneAction(BaseModel):
 	text: str
 	success: bool
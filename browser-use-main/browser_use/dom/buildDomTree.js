@@ -4,10 +4,24 @@
     focusHighlightIndex: -1,
     viewportExpansion: 0,
     debugMode: false,
+    incremental: false,
+    baseVersion: null,
+    fullRefreshInterval: 10,
+    packed: false,
+    uniqueSelectors: false,
+    dynamicAttributes: true,
   }
 ) => {
   const { doHighlightElements, focusHighlightIndex, viewportExpansion, debugMode } = args;
+  const incremental = !!args.incremental;
+  const baseVersion = args.baseVersion ?? null;
+  const fullRefreshInterval = args.fullRefreshInterval ?? 10;
+  const packed = !!args.packed;
+  const uniqueSelectors = !!args.uniqueSelectors;
+  const dynamicAttributes = args.dynamicAttributes ?? true;
   let highlightIndex = 0; // Reset highlight index
+  // Highlighted elements by highlight index, published on the window once the tree is built
+  const HIGHLIGHTED_ELEMENTS = [];
 
   // Add timing stack to handle recursion
   const TIMING_STACK = {
@@ -40,6 +54,7 @@
       isInExpandedViewport: 0,
       isTextNodeVisible: 0,
       getEffectiveScroll: 0,
+      uniqueSelectors: 0,
     },
     cacheMetrics: {
       boundingRectCacheHits: 0,
@@ -187,6 +202,48 @@
 
   const HIGHLIGHT_CONTAINER_ID = "playwright-highlight-container";
 
+  /**
+   * Incremental mode state, kept on the window between calls:
+   * a persistent node -> id registry, the node data emitted by the last call,
+   * and a MutationObserver collecting what changed since then.
+   */
+  const STATE_KEY = "__browserUseDomState";
+  const MAX_PENDING_MUTATIONS = 5000;
+  let persistent = null;
+
+  /**
+   * Returns the id for a node. In incremental mode ids are stable across calls.
+   */
+  function nodeId(node, parentIframe) {
+    if (!incremental) return `${ID.current++}`;
+
+    let id = persistent.registry.get(node);
+    if (id === undefined) {
+      id = `${persistent.nextId++}`;
+      persistent.registry.set(node, id);
+    }
+    if (node.nodeType === Node.ELEMENT_NODE) {
+      persistent.elements.set(id, node);
+      if (parentIframe) persistent.iframes.set(id, parentIframe);
+    }
+    return id;
+  }
+
+  function observeRoot(root) {
+    if (!incremental || !persistent || persistent.observedRoots.has(root)) return;
+    try {
+      persistent.observer.observe(root, {
+        subtree: true,
+        childList: true,
+        attributes: true,
+        characterData: true,
+      });
+      persistent.observedRoots.add(root);
+    } catch (e) {
+      console.warn("Unable to observe root:", e);
+    }
+  }
+
   /**
    * Highlights an element in the DOM and returns the index of the next element.
    */
@@ -815,7 +872,7 @@
         if (domElement) nodeData.children.push(domElement);
       }
 
-      const id = `${ID.current++}`;
+      const id = nodeId(node, parentIframe);
       DOM_HASH_MAP[id] = nodeData;
       if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
       return id;
@@ -842,7 +899,7 @@
         return null;
       }
 
-      const id = `${ID.current++}`;
+      const id = nodeId(node, parentIframe);
       DOM_HASH_MAP[id] = {
         type: "TEXT_NODE",
         text: textContent,
@@ -907,7 +964,11 @@
           nodeData.isInteractive = isInteractiveElement(node);
           if (nodeData.isInteractive) {
             nodeData.isInViewport = true;
+          }
+          // In incremental mode indices are assigned over the whole patched tree afterwards
+          if (nodeData.isInteractive && !incremental) {
             nodeData.highlightIndex = highlightIndex++;
+            HIGHLIGHTED_ELEMENTS[nodeData.highlightIndex] = node;
 
             if (doHighlightElements) {
               if (focusHighlightIndex >= 0) {
@@ -932,6 +993,7 @@
         try {
           const iframeDoc = node.contentDocument || node.contentWindow?.document;
           if (iframeDoc) {
+            observeRoot(iframeDoc);
             for (const child of iframeDoc.childNodes) {
               const domElement = buildDomTree(child, node);
               if (domElement) nodeData.children.push(domElement);
@@ -958,6 +1020,7 @@
       // Handle shadow DOM
       else if (node.shadowRoot) {
         nodeData.shadowRoot = true;
+        observeRoot(node.shadowRoot);
         for (const child of node.shadowRoot.childNodes) {
           const domElement = buildDomTree(child, parentIframe);
           if (domElement) nodeData.children.push(domElement);
@@ -978,7 +1041,7 @@
       return null;
     }
 
-    const id = `${ID.current++}`;
+    const id = nodeId(node, parentIframe);
     DOM_HASH_MAP[id] = nodeData;
     if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
     return id;
@@ -994,7 +1057,472 @@
   isTextNodeVisible = measureTime(isTextNodeVisible);
   getEffectiveScroll = measureTime(getEffectiveScroll);
 
-  const rootId = buildDomTree(document.body);
+  /**
+   * Parent across shadow root and same-origin iframe boundaries.
+   */
+  function parentAcrossBoundaries(node) {
+    if (node.nodeType === Node.DOCUMENT_NODE) {
+      return node.defaultView ? node.defaultView.frameElement : null;
+    }
+    const parent = node.parentNode;
+    if (!parent) return null;
+    if (parent instanceof ShadowRoot) return parent.host;
+    if (parent.nodeType === Node.DOCUMENT_NODE) {
+      return parent.defaultView ? parent.defaultView.frameElement : null;
+    }
+    return parent;
+  }
+
+  function isHighlightMutation(record) {
+    const isHighlightNode = (node) =>
+      node.nodeType === Node.ELEMENT_NODE &&
+      (node.id === HIGHLIGHT_CONTAINER_ID || !!node.closest(`#${HIGHLIGHT_CONTAINER_ID}`));
+
+    if (isHighlightNode(record.target)) return true;
+    if (record.type !== "childList") return false;
+    const changedNodes = [...record.addedNodes, ...record.removedNodes];
+    return changedNodes.length > 0 && changedNodes.every(isHighlightNode);
+  }
+
+  /**
+   * Nearest node (itself or an ancestor) that was emitted by the previous call.
+   */
+  function emittedAncestor(node) {
+    let current = node;
+    while (current) {
+      const id = persistent.registry.get(current);
+      if (id !== undefined && persistent.nodes.has(id)) return current;
+      current = parentAcrossBoundaries(current);
+    }
+    return null;
+  }
+
+  function collectSubtreeIds(rootId, out) {
+    const stack = [rootId];
+    while (stack.length) {
+      const id = stack.pop();
+      out.push(id);
+      const data = persistent.nodes.get(id);
+      if (data && data.children) stack.push(...data.children);
+    }
+    return out;
+  }
+
+  /**
+   * Assigns highlight indices in document order over the whole cached tree and draws highlights.
+   */
+  function assignHighlightIndices(rootId) {
+    let index = 0;
+    const stack = [rootId];
+    while (stack.length) {
+      const id = stack.pop();
+      const data = persistent.nodes.get(id);
+      if (!data || data.type === "TEXT_NODE") continue;
+
+      if (data.isInteractive) {
+        data.highlightIndex = index;
+        HIGHLIGHTED_ELEMENTS[index] = persistent.elements.get(id);
+        if (doHighlightElements && (focusHighlightIndex < 0 || focusHighlightIndex === index)) {
+          highlightElement(persistent.elements.get(id), index, persistent.iframes.get(id) || null);
+        }
+        index++;
+      } else {
+        delete data.highlightIndex;
+      }
+
+      for (let i = data.children.length - 1; i >= 0; i--) {
+        stack.push(data.children[i]);
+      }
+    }
+  }
+
+  function viewportSnapshot() {
+    return [location.href, window.scrollX, window.scrollY, window.innerWidth, window.innerHeight, viewportExpansion].join("|");
+  }
+
+  function buildFull() {
+    const previous = window[STATE_KEY];
+    if (previous && previous.observer) previous.observer.disconnect();
+    for (const key of Object.keys(DOM_HASH_MAP)) delete DOM_HASH_MAP[key];
+
+    persistent = {
+      registry: previous ? previous.registry : new WeakMap(),
+      nextId: previous ? previous.nextId : 0,
+      version: previous ? previous.version + 1 : 1,
+      nodes: new Map(),
+      elements: new Map(),
+      iframes: new Map(),
+      observedRoots: new WeakSet(),
+      pending: [],
+      overflow: false,
+      callsSinceFull: 0,
+      snapshot: viewportSnapshot(),
+      rootId: null,
+    };
+    const state = persistent;
+    state.observer = new MutationObserver((records) => {
+      if (state.overflow) return;
+      state.pending.push(...records);
+      if (state.pending.length > MAX_PENDING_MUTATIONS) {
+        state.overflow = true;
+        state.pending = [];
+      }
+    });
+    window[STATE_KEY] = state;
+
+    observeRoot(document);
+    const rootId = buildDomTree(document.body);
+    state.rootId = rootId;
+    for (const [id, data] of Object.entries(DOM_HASH_MAP)) {
+      state.nodes.set(id, data);
+    }
+    assignHighlightIndices(rootId);
+
+    return { rootId, map: DOM_HASH_MAP, incremental: false, version: state.version };
+  }
+
+  /**
+   * Bounding box around the rebuilt subtrees and their emitted elements, null if none of them has a box.
+   */
+  function mutatedRegion(roots) {
+    let region = null;
+    const add = (element) => {
+      const rect = element && getCachedBoundingRect(element);
+      if (!rect || (rect.width === 0 && rect.height === 0)) return;
+      region = region
+        ? {
+            left: Math.min(region.left, rect.left),
+            top: Math.min(region.top, rect.top),
+            right: Math.max(region.right, rect.right),
+            bottom: Math.max(region.bottom, rect.bottom),
+          }
+        : { left: rect.left, top: rect.top, right: rect.right, bottom: rect.bottom };
+    };
+    roots.forEach(add);
+    for (const id of Object.keys(DOM_HASH_MAP)) {
+      add(persistent.elements.get(id));
+    }
+    return region;
+  }
+
+  function intersects(rect, region) {
+    return !!rect && !!region &&
+      rect.left < region.right && rect.right > region.left && rect.top < region.bottom && rect.bottom > region.top;
+  }
+
+  /**
+   * Rebuilds only the subtrees touched by mutations since the last call and
+   * returns them together with removed ids and flag changes of untouched nodes.
+   * Falls back to a full build whenever the cached tree cannot be trusted.
+   */
+  function buildIncremental() {
+    const state = window[STATE_KEY];
+    if (
+      !state ||
+      baseVersion === null ||
+      state.version !== baseVersion ||
+      state.overflow ||
+      state.snapshot !== viewportSnapshot() ||
+      state.callsSinceFull + 1 >= fullRefreshInterval ||
+      !document.body ||
+      state.registry.get(document.body) !== state.rootId
+    ) {
+      return buildFull();
+    }
+
+    persistent = state;
+    state.version++;
+    state.callsSinceFull++;
+    const records = state.pending.concat(state.observer.takeRecords()).filter((record) => !isHighlightMutation(record));
+    state.pending = [];
+
+    // Find the minimal set of emitted subtrees that contain every mutation
+    const roots = new Set();
+    for (const record of records) {
+      const target = record.target.nodeType === Node.ELEMENT_NODE ? record.target : parentAcrossBoundaries(record.target);
+      const root = target && emittedAncestor(target);
+      if (!root || root === document.body || !root.isConnected) return buildFull();
+      roots.add(root);
+    }
+    const topRoots = [...roots].filter((root) => {
+      for (let ancestor = parentAcrossBoundaries(root); ancestor; ancestor = parentAcrossBoundaries(ancestor)) {
+        if (roots.has(ancestor)) return false;
+      }
+      return true;
+    });
+
+    // Remember flags of nodes outside the rebuilt subtrees to report what changed
+    const oldIds = [];
+    for (const root of topRoots) {
+      collectSubtreeIds(state.registry.get(root), oldIds);
+    }
+    const rebuiltOld = new Set(oldIds);
+    const previousFlags = new Map();
+    for (const [id, data] of state.nodes) {
+      if (data.type === "TEXT_NODE" || rebuiltOld.has(id)) continue;
+      previousFlags.set(id, [!!data.isTopElement, !!data.isInteractive, !!data.isInViewport, data.highlightIndex ?? null]);
+    }
+
+    for (const id of oldIds) {
+      state.nodes.delete(id);
+      state.elements.delete(id);
+      state.iframes.delete(id);
+    }
+    for (const root of topRoots) {
+      const rootId = state.registry.get(root);
+      const parentIframe = root.ownerDocument !== document ? root.ownerDocument.defaultView?.frameElement || null : null;
+      if (buildDomTree(root, parentIframe) !== rootId) return buildFull();
+    }
+    for (const [id, data] of Object.entries(DOM_HASH_MAP)) {
+      state.nodes.set(id, data);
+    }
+    const removed = oldIds.filter((id) => !(id in DOM_HASH_MAP));
+
+    // Mutations elsewhere (e.g. an overlay opening) can cover or uncover untouched elements.
+    // Only elements that were covered before, or that overlap a rebuilt subtree, are hit-tested again
+    if (records.length) {
+      const region = mutatedRegion(topRoots);
+      for (const id of previousFlags.keys()) {
+        const data = state.nodes.get(id);
+        const element = state.elements.get(id);
+        if (!data.isVisible || !element) continue;
+        if (data.isTopElement && !intersects(getCachedBoundingRect(element), region)) continue;
+        data.isTopElement = isTopElement(element);
+        data.isInteractive = data.isTopElement && isInteractiveElement(element);
+        if (data.isInteractive) data.isInViewport = true;
+        else delete data.isInViewport;
+      }
+    }
+
+    assignHighlightIndices(state.rootId);
+
+    const flags = {};
+    for (const [id, before] of previousFlags) {
+      const data = state.nodes.get(id);
+      const after = [!!data.isTopElement, !!data.isInteractive, !!data.isInViewport, data.highlightIndex ?? null];
+      if (after.some((value, i) => value !== before[i])) {
+        flags[id] = {
+          isTopElement: after[0],
+          isInteractive: after[1],
+          isInViewport: after[2],
+          highlightIndex: after[3],
+        };
+      }
+    }
+
+    return { rootId: state.rootId, map: DOM_HASH_MAP, removed, flags, incremental: true, version: state.version };
+  }
+
+  // Flag bits of the packed format, must match PACKED_* in service.py
+  const PACKED_VISIBLE = 1;
+  const PACKED_TOP = 2;
+  const PACKED_INTERACTIVE = 4;
+  const PACKED_IN_VIEWPORT = 8;
+  const PACKED_SHADOW_ROOT = 16;
+  const PACKED_TEXT = 32;
+  const PACKED_ABSOLUTE_XPATH = 64;
+
+  /**
+   * Encodes a full tree column-wise in pre-order (parents before children, children in order):
+   * tag and attribute names/values go into a string table and element xpaths are stored as
+   * the last segment relative to the parent's xpath whenever possible.
+   */
+  function packTree(rootId, map) {
+    const strings = [];
+    const stringIndex = new Map();
+    const intern = (value) => {
+      let index = stringIndex.get(value);
+      if (index === undefined) {
+        index = strings.length;
+        strings.push(value);
+        stringIndex.set(value, index);
+      }
+      return index;
+    };
+
+    const ids = [];
+    const parents = [];
+    const flags = [];
+    const tags = [];
+    const xpaths = [];
+    const texts = [];
+    const highlights = [];
+    const attributes = [];
+    const attributeOffsets = [0];
+
+    const stack = [[rootId, -1]];
+    while (stack.length) {
+      const [id, parentPosition] = stack.pop();
+      const data = map[id];
+      if (!data) continue;
+
+      const position = ids.length;
+      ids.push(id);
+      parents.push(parentPosition);
+
+      if (data.type === "TEXT_NODE") {
+        flags.push(PACKED_TEXT | (data.isVisible ? PACKED_VISIBLE : 0));
+        tags.push(-1);
+        xpaths.push(null);
+        texts.push(data.text);
+        highlights.push(-1);
+        attributeOffsets.push(attributes.length);
+        continue;
+      }
+
+      let bits = 0;
+      if (data.isVisible) bits |= PACKED_VISIBLE;
+      if (data.isTopElement) bits |= PACKED_TOP;
+      if (data.isInteractive) bits |= PACKED_INTERACTIVE;
+      if (data.isInViewport) bits |= PACKED_IN_VIEWPORT;
+      if (data.shadowRoot) bits |= PACKED_SHADOW_ROOT;
+
+      const parentXpath = parentPosition >= 0 ? map[ids[parentPosition]].xpath : null;
+      const segment = parentXpath !== null && data.xpath.startsWith(parentXpath + "/")
+        ? data.xpath.slice(parentXpath.length + 1)
+        : null;
+      if (segment !== null && !segment.includes("/")) {
+        xpaths.push(segment);
+      } else {
+        bits |= PACKED_ABSOLUTE_XPATH;
+        xpaths.push(data.xpath);
+      }
+
+      flags.push(bits);
+      tags.push(intern(data.tagName));
+      texts.push(null);
+      highlights.push(data.highlightIndex ?? -1);
+      for (const [name, value] of Object.entries(data.attributes || {})) {
+        attributes.push(intern(name), intern(value));
+      }
+      attributeOffsets.push(attributes.length);
+
+      const children = data.children || [];
+      for (let i = children.length - 1; i >= 0; i--) {
+        stack.push([children[i], position]);
+      }
+    }
+
+    return { strings, ids, parents, flags, tags, xpaths, texts, highlights, attributes, attributeOffsets };
+  }
+
+  // Attributes tried for a unique selector after the id, in order: names, test hooks, then label-like attributes.
+  // data-* attributes count as dynamic and are only used with dynamicAttributes
+  const SELECTOR_ATTRIBUTES = dynamicAttributes
+    ? ["name", "data-testid", "data-test", "data-test-id", "data-qa", "data-cy"]
+    : ["name"];
+  const LABEL_ATTRIBUTES = ["aria-label", "aria-labelledby", "placeholder", "title", "alt"];
+  const MAX_SELECTOR_VALUE_LENGTH = 80;
+
+  /**
+   * Ids and attribute values that look generated (long, or with long digit runs) change between page loads.
+   */
+  function isStableValue(value) {
+    return !!value && value.length <= MAX_SELECTOR_VALUE_LENGTH && !/\d{4,}/.test(value) && !/^[:_-]|[:\s]/.test(value);
+  }
+
+  /**
+   * Shortest css selector matching only this element within its document, verified with querySelectorAll.
+   * Tried in order: id, name and data-* attributes, label-like attributes, then a structural path
+   * anchored at the nearest ancestor with a unique id. Elements in shadow roots get none,
+   * Playwright's css engine pierces shadow roots so uniqueness could not be verified here.
+   */
+  function computeUniqueSelectors(elements) {
+    const counts = new Map();
+    function isUnique(root, selector) {
+      const key = root === document ? selector : null;
+      if (key !== null && counts.has(key)) return counts.get(key) === 1;
+      let count;
+      try {
+        count = root.querySelectorAll(selector).length;
+      } catch (e) {
+        count = 0;
+      }
+      if (key !== null) counts.set(key, count);
+      return count === 1;
+    }
+
+    function idSelector(element) {
+      const id = element.getAttribute("id");
+      return isStableValue(id) ? `#${CSS.escape(id)}` : null;
+    }
+
+    function segment(element) {
+      const tag = CSS.escape(element.tagName.toLowerCase());
+      const parent = element.parentElement;
+      if (!parent) return tag;
+      let position = 0;
+      let sameTag = 0;
+      for (const sibling of parent.children) {
+        if (sibling.tagName === element.tagName) {
+          sameTag++;
+          if (sibling === element) position = sameTag;
+        }
+      }
+      return sameTag > 1 ? `${tag}:nth-of-type(${position})` : tag;
+    }
+
+    function uniqueSelector(element) {
+      const root = element.getRootNode();
+      if (root.nodeType !== Node.DOCUMENT_NODE) return null;
+
+      const id = idSelector(element);
+      if (id && isUnique(root, id)) return id;
+
+      const tag = CSS.escape(element.tagName.toLowerCase());
+      const dataAttributes = dynamicAttributes
+        ? element.getAttributeNames().filter((name) => name.startsWith("data-") && !SELECTOR_ATTRIBUTES.includes(name))
+        : [];
+      for (const name of [...SELECTOR_ATTRIBUTES, ...dataAttributes, ...LABEL_ATTRIBUTES]) {
+        const value = element.getAttribute(name);
+        // Label text is kept as is, digits in it are rarely generated
+        const usable = LABEL_ATTRIBUTES.includes(name) ? value && value.length <= MAX_SELECTOR_VALUE_LENGTH : isStableValue(value);
+        if (!usable) continue;
+        const selector = `${tag}[${name}="${CSS.escape(value)}"]`;
+        if (isUnique(root, selector)) return selector;
+      }
+
+      const parts = [];
+      for (let current = element; current; current = current.parentElement) {
+        const anchor = current !== element ? idSelector(current) : null;
+        if (anchor && isUnique(root, anchor)) {
+          const selector = [anchor, ...parts].join(" > ");
+          return isUnique(root, selector) ? selector : null;
+        }
+        parts.unshift(segment(current));
+        const selector = parts.join(" > ");
+        if (isUnique(root, selector)) return selector;
+      }
+      return null;
+    }
+
+    return elements.map((element) => {
+      try {
+        return element ? uniqueSelector(element) : null;
+      } catch (e) {
+        return null;
+      }
+    });
+  }
+
+  let result;
+  if (incremental) {
+    result = buildIncremental();
+  } else {
+    const rootId = buildDomTree(document.body);
+    result = { rootId, map: DOM_HASH_MAP };
+  }
+
+  // Lets the agent get a handle on an element by highlight index without matching a selector;
+  // the token ties the registry to the tree returned by this call
+  const elementsToken = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  window.__browserUseElements = { token: elementsToken, elements: HIGHLIGHTED_ELEMENTS };
+  result.elementsToken = elementsToken;
+  if (uniqueSelectors) {
+    const start = performance.now();
+    result.uniqueSelectors = computeUniqueSelectors(HIGHLIGHTED_ELEMENTS);
+    if (PERF_METRICS) PERF_METRICS.timings.uniqueSelectors += performance.now() - start;
+  }
 
   // Clear the cache before starting
   DOM_CACHE.clearCache();
@@ -1049,7 +1577,12 @@
     }
   }
 
-  return debugMode ?
-    { rootId, map: DOM_HASH_MAP, perfMetrics: PERF_METRICS } :
-    { rootId, map: DOM_HASH_MAP };
+  // Incremental patches are small and keyed by id, only full trees are packed
+  if (packed && !result.incremental) {
+    const { map, ...rest } = result;
+    result = { ...rest, packed: packTree(rest.rootId, map) };
+  }
+
+  if (debugMode) result.perfMetrics = PERF_METRICS;
+  return result;
 };
@@ -1,10 +1,24 @@
 import hashlib
-from typing import Optional
+from typing import Iterable, Optional
 
 from browser_use.dom.history_tree_processor.view import DOMHistoryElement, HashedDomElement
 from browser_use.dom.views import DOMElementNode
 
 
+def _digest(value: str) -> str:
+	# blake2b with a short digest is considerably cheaper than sha256 and collisions are irrelevant here
+	return hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
+
+
+EMPTY_BRANCH_PATH_HASH = _digest('')
+
+# Minimum similarity for a fuzzy match when the exact hash of a recorded element misses
+FUZZY_MATCH_THRESHOLD = 0.6
+
+# Attributes that identify an element across page versions weigh double in the similarity
+STABLE_ATTRIBUTES = {'id', 'name', 'type', 'for', 'role', 'placeholder', 'aria-label', 'title', 'alt', 'href', 'data-testid'}
+
+
 class HistoryTreeProcessor:
 	""" "
 	Operations on the DOM elements
@@ -32,27 +46,72 @@ class HistoryTreeProcessor:
 		)
 
 	@staticmethod
-	def find_history_element_in_tree(dom_history_element: DOMHistoryElement, tree: DOMElementNode) -> Optional[DOMElementNode]:
-		hashed_dom_history_element = HistoryTreeProcessor._hash_dom_history_element(dom_history_element)
-
-		def process_node(node: DOMElementNode):
+	def build_hash_index(tree: DOMElementNode) -> dict[HashedDomElement, DOMElementNode]:
+		"""Highlighted elements by hash; on collisions the first element in document order wins"""
+		index: dict[HashedDomElement, DOMElementNode] = {}
+		stack = [tree]
+		while stack:
+			node = stack.pop()
 			if node.highlight_index is not None:
-				hashed_node = HistoryTreeProcessor._hash_dom_element(node)
-				if hashed_node == hashed_dom_history_element:
-					return node
-			for child in node.children:
-				if isinstance(child, DOMElementNode):
-					result = process_node(child)
-					if result is not None:
-						return result
-			return None
-
-		return process_node(tree)
+				index.setdefault(node.hash, node)
+			stack.extend(child for child in reversed(node.children) if isinstance(child, DOMElementNode))
+		return index
+
+	@staticmethod
+	def find_history_element_in_tree(
+		dom_history_element: DOMHistoryElement,
+		tree: DOMElementNode,
+		index: Optional[dict[HashedDomElement, DOMElementNode]] = None,
+	) -> Optional[DOMElementNode]:
+		"""Pass an index from build_hash_index (e.g. DOMState.hash_index) to reuse it across lookups"""
+		if index is None:
+			index = HistoryTreeProcessor.build_hash_index(tree)
+		return index.get(HistoryTreeProcessor._hash_dom_history_element(dom_history_element))
+
+	@staticmethod
+	def find_similar_element(
+		dom_history_element: DOMHistoryElement,
+		candidates: Iterable[DOMElementNode],
+		threshold: float = FUZZY_MATCH_THRESHOLD,
+	) -> Optional[DOMElementNode]:
+		"""
+		Fallback for elements whose exact hash changed (e.g. a regenerated class or a moved container):
+		the candidate with the same tag and the most similar attributes, preferring an unchanged xpath.
+		Returns None below the threshold or when the best score is shared by several candidates.
+		"""
+		best_element: Optional[DOMElementNode] = None
+		best_score = threshold
+		ambiguous = False
+		for candidate in candidates:
+			if candidate.tag_name != dom_history_element.tag_name:
+				continue
+			score = 0.9 * HistoryTreeProcessor._attribute_similarity(dom_history_element.attributes, candidate.attributes)
+			if candidate.xpath == dom_history_element.xpath:
+				score += 0.1
+			if score > best_score:
+				best_element, best_score, ambiguous = candidate, score, False
+			elif score == best_score and best_element is not None:
+				ambiguous = True
+		return None if ambiguous else best_element
+
+	@staticmethod
+	def _attribute_similarity(attributes: dict[str, str], other_attributes: dict[str, str]) -> float:
+		keys = attributes.keys() | other_attributes.keys()
+		if not keys:
+			# Nothing to compare, bare elements only match by their exact hash
+			return 0.0
+		total = matched = 0.0
+		for key in keys:
+			weight = 2.0 if key in STABLE_ATTRIBUTES else 1.0
+			total += weight
+			if attributes.get(key) == other_attributes.get(key):
+				matched += weight
+		return matched / total
 
 	@staticmethod
 	def compare_history_element_and_dom_element(dom_history_element: DOMHistoryElement, dom_element: DOMElementNode) -> bool:
 		hashed_dom_history_element = HistoryTreeProcessor._hash_dom_history_element(dom_history_element)
-		hashed_dom_element = HistoryTreeProcessor._hash_dom_element(dom_element)
+		hashed_dom_element = dom_element.hash
 
 		return hashed_dom_history_element == hashed_dom_element
 
@@ -66,8 +125,7 @@ class HistoryTreeProcessor:
 
 	@staticmethod
 	def _hash_dom_element(dom_element: DOMElementNode) -> HashedDomElement:
-		parent_branch_path = HistoryTreeProcessor._get_parent_branch_path(dom_element)
-		branch_path_hash = HistoryTreeProcessor._parent_branch_path_hash(parent_branch_path)
+		branch_path_hash = HistoryTreeProcessor._element_branch_path_hash(dom_element)
 		attributes_hash = HistoryTreeProcessor._attributes_hash(dom_element.attributes)
 		xpath_hash = HistoryTreeProcessor._xpath_hash(dom_element.xpath)
 		# text_hash = DomTreeProcessor._text_hash(dom_element)
@@ -86,22 +144,47 @@ class HistoryTreeProcessor:
 
 		return [parent.tag_name for parent in parents]
 
+	@staticmethod
+	def _extend_branch_path_hash(parent_hash: str, tag_name: str) -> str:
+		return _digest(f'{parent_hash}/{tag_name}')
+
 	@staticmethod
 	def _parent_branch_path_hash(parent_branch_path: list[str]) -> str:
-		parent_branch_path_string = '/'.join(parent_branch_path)
-		return hashlib.sha256(parent_branch_path_string.encode()).hexdigest()
+		branch_path_hash = EMPTY_BRANCH_PATH_HASH
+		for tag_name in parent_branch_path:
+			branch_path_hash = HistoryTreeProcessor._extend_branch_path_hash(branch_path_hash, tag_name)
+		return branch_path_hash
+
+	@staticmethod
+	def _element_branch_path_hash(dom_element: DOMElementNode) -> str:
+		"""Same value as _parent_branch_path_hash(_get_parent_branch_path(dom_element)), built from the
+		nearest ancestor with a cached hash so every node of a tree is only hashed once"""
+		uncached: list[DOMElementNode] = []
+		current_element = dom_element
+		while current_element._branch_path_hash is None:
+			if current_element.parent is None:
+				current_element._branch_path_hash = EMPTY_BRANCH_PATH_HASH
+				break
+			uncached.append(current_element)
+			current_element = current_element.parent
+
+		branch_path_hash = current_element._branch_path_hash
+		for element in reversed(uncached):
+			branch_path_hash = HistoryTreeProcessor._extend_branch_path_hash(branch_path_hash, element.tag_name)
+			element._branch_path_hash = branch_path_hash
+		return branch_path_hash
 
 	@staticmethod
 	def _attributes_hash(attributes: dict[str, str]) -> str:
 		attributes_string = ''.join(f'{key}={value}' for key, value in attributes.items())
-		return hashlib.sha256(attributes_string.encode()).hexdigest()
+		return _digest(attributes_string)
 
 	@staticmethod
 	def _xpath_hash(xpath: str) -> str:
-		return hashlib.sha256(xpath.encode()).hexdigest()
+		return _digest(xpath)
 
 	@staticmethod
 	def _text_hash(dom_element: DOMElementNode) -> str:
 		""" """
 		text_string = dom_element.get_all_text_till_next_clickable_element()
-		return hashlib.sha256(text_string.encode()).hexdigest()
+		return _digest(text_string)
@@ -4,7 +4,7 @@ from typing import TYPE_CHECKING, Optional
 from pydantic import BaseModel
 
 
-@dataclass
+@dataclass(frozen=True)
 class HashedDomElement:
 	"""
 	Hash of the dom element to be used as a unique identifier
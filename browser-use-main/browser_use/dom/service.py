@@ -1,7 +1,8 @@
 import gc
 import json
 import logging
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, fields
 from importlib import resources
 from typing import TYPE_CHECKING, Optional
 
@@ -15,10 +16,23 @@ from browser_use.dom.views import (
 	DOMTextNode,
 	SelectorMap,
 )
-from browser_use.utils import time_execution_async
+from browser_use.utils import time_execution_async, time_execution_sync
 
 logger = logging.getLogger(__name__)
 
+# Flag bits of the packed tree format produced by buildDomTree.js (packTree)
+PACKED_VISIBLE = 1
+PACKED_TOP = 2
+PACKED_INTERACTIVE = 4
+PACKED_IN_VIEWPORT = 8
+PACKED_SHADOW_ROOT = 16
+PACKED_TEXT = 32
+PACKED_ABSOLUTE_XPATH = 64
+
+
+# Copied as is by _patch_dom_tree, parent and children are relinked
+_ELEMENT_COPY_FIELDS = tuple(f.name for f in fields(DOMElementNode) if f.name not in ('parent', 'children'))
+
 
 @dataclass
 class ViewportInfo:
@@ -31,6 +45,16 @@ class DomService:
 		self.page = page
 		self.xpath_cache = {}
 
+		# Incremental mode: nodes of the last built tree by their (stable) JS id, and the JS state version they match
+		self._node_map: dict[str, DOMBaseNode] = {}
+		self._root_id: str | None = None
+		self._children_ids: dict[str, list[str]] = {}
+		self._version: int | None = None
+		# Token of the page-side registry of highlighted elements written by the last build
+		self._elements_token: str | None = None
+		# Unique css selectors of the last build, by highlight index
+		self._unique_selectors: list[str | None] = []
+
 		self.js_code = resources.read_text('browser_use.dom', 'buildDomTree.js')
 
 	# region - Clickable elements
@@ -40,9 +64,31 @@ class DomService:
 		highlight_elements: bool = True,
 		focus_element: int = -1,
 		viewport_expansion: int = 0,
+		incremental: bool = False,
+		full_refresh_interval: int = 10,
+		unique_selectors: bool = False,
+		include_dynamic_attributes: bool = True,
 	) -> DOMState:
-		element_tree, selector_map = await self._build_dom_tree(highlight_elements, focus_element, viewport_expansion)
-		return DOMState(element_tree=element_tree, selector_map=selector_map)
+		"""
+		With incremental=True the page keeps a MutationObserver between calls and only the changed
+		subtrees are sent back and patched into the tree cached on this DomService.
+		Every full_refresh_interval calls (and on navigation, scroll or resize) the tree is rebuilt fully.
+		With unique_selectors=True every highlighted element gets the shortest css selector matching only it,
+		using data-* attributes only if include_dynamic_attributes is set.
+		"""
+		element_tree, selector_map = await self._build_dom_tree(
+			highlight_elements,
+			focus_element,
+			viewport_expansion,
+			incremental,
+			full_refresh_interval,
+			unique_selectors,
+			include_dynamic_attributes,
+		)
+		# Computed in the same evaluation as the tree, so they match its highlight indices
+		for index, node in selector_map.items():
+			node.unique_selector = self._unique_selectors[index] if index < len(self._unique_selectors) else None
+		return DOMState(element_tree=element_tree, selector_map=selector_map, elements_token=self._elements_token)
 
 	@time_execution_async('--build_dom_tree')
 	async def _build_dom_tree(
@@ -50,6 +96,10 @@ class DomService:
 		highlight_elements: bool,
 		focus_element: int,
 		viewport_expansion: int,
+		incremental: bool = False,
+		full_refresh_interval: int = 10,
+		unique_selectors: bool = False,
+		include_dynamic_attributes: bool = True,
 	) -> tuple[DOMElementNode, SelectorMap]:
 		if await self.page.evaluate('1+1') != 2:
 			raise ValueError('The page cannot evaluate javascript code properly')
@@ -63,7 +113,15 @@ class DomService:
 			'focusHighlightIndex': focus_element,
 			'viewportExpansion': viewport_expansion,
 			'debugMode': debug_mode,
+			'packed': True,
+			'uniqueSelectors': unique_selectors,
+			'dynamicAttributes': include_dynamic_attributes,
 		}
+		if incremental:
+			args['incremental'] = True
+			args['fullRefreshInterval'] = full_refresh_interval
+			# Only patch if our cached tree matches the page's state
+			args['baseVersion'] = self._version if self._node_map else None
 
 		try:
 			eval_page = await self.page.evaluate(self.js_code, args)
@@ -71,22 +129,44 @@ class DomService:
 			logger.error('Error evaluating JavaScript: %s', e)
 			raise
 
+		self._elements_token = eval_page.get('elementsToken')
+		self._unique_selectors = eval_page.get('uniqueSelectors') or []
+
 		# Only log performance metrics in debug mode
 		if debug_mode and 'perfMetrics' in eval_page:
 			logger.debug('DOM Tree Building Performance Metrics:\n%s', json.dumps(eval_page['perfMetrics'], indent=2))
 
-		return await self._construct_dom_tree(eval_page)
+		if not incremental:
+			return await self._construct_dom_tree(eval_page)
+
+		try:
+			if eval_page.get('incremental'):
+				result = self._patch_dom_tree(eval_page)
+			else:
+				result = await self._construct_dom_tree(eval_page, keep_node_map=True)
+		except Exception:
+			# Force a full rebuild next time, the cached tree may be half patched
+			self._node_map = {}
+			self._version = None
+			raise
+		self._version = eval_page.get('version')
+		return result
 
 	@time_execution_async('--construct_dom_tree')
 	async def _construct_dom_tree(
 		self,
 		eval_page: dict,
+		keep_node_map: bool = False,
 	) -> tuple[DOMElementNode, SelectorMap]:
+		if 'packed' in eval_page:
+			return self._decode_packed_tree(eval_page['packed'], keep_node_map)
+
 		js_node_map = eval_page['map']
 		js_root_id = eval_page['rootId']
 
 		selector_map = {}
 		node_map = {}
+		children_map: dict[str, list[str]] = {}
 
 		for id, node_data in js_node_map.items():
 			node, children_ids = self._parse_node(node_data)
@@ -94,6 +174,8 @@ class DomService:
 				continue
 
 			node_map[id] = node
+			if keep_node_map:
+				children_map[id] = [str(child_id) for child_id in children_ids]
 
 			if isinstance(node, DOMElementNode) and node.highlight_index is not None:
 				selector_map[node.highlight_index] = node
@@ -112,9 +194,14 @@ class DomService:
 
 		html_to_dict = node_map[str(js_root_id)]
 
-		del node_map
-		del js_node_map
-		del js_root_id
+		if keep_node_map:
+			self._node_map = node_map
+			self._children_ids = children_map
+			self._root_id = str(js_root_id)
+		else:
+			del node_map
+			del js_node_map
+			del js_root_id
 
 		gc.collect()
 
@@ -123,6 +210,180 @@ class DomService:
 
 		return html_to_dict, selector_map
 
+	@time_execution_sync('--decode_packed_tree')
+	def _decode_packed_tree(self, packed: dict, keep_node_map: bool = False) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Decode the column-wise tree from buildDomTree.js.
+		Nodes come in pre-order, so every parent is decoded before its children and children are appended in order.
+		"""
+		# Interned so tag and attribute names are shared with the trees of previous steps
+		strings = [sys.intern(string) for string in packed['strings']]
+		parents = packed['parents']
+		flags = packed['flags']
+		tags = packed['tags']
+		xpaths = packed['xpaths']
+		texts = packed['texts']
+		highlights = packed['highlights']
+		attributes = packed['attributes']
+		attribute_offsets = packed['attributeOffsets']
+
+		nodes: list[DOMBaseNode] = []
+		selector_map: SelectorMap = {}
+		# Nodes with identical attributes share one dict
+		attribute_dicts: dict[tuple[int, ...], dict[str, str]] = {}
+
+		for i, bits in enumerate(flags):
+			parent_position = parents[i]
+			parent = nodes[parent_position] if parent_position >= 0 else None
+
+			if bits & PACKED_TEXT:
+				node = DOMTextNode(text=texts[i], is_visible=bool(bits & PACKED_VISIBLE), parent=parent)
+			else:
+				xpath = xpaths[i]
+				if not bits & PACKED_ABSOLUTE_XPATH and parent is not None:
+					xpath = f'{parent.xpath}/{xpath}'  # type: ignore[union-attr]
+
+				attribute_key = tuple(attributes[attribute_offsets[i] : attribute_offsets[i + 1]])
+				node_attributes = attribute_dicts.get(attribute_key)
+				if node_attributes is None:
+					node_attributes = {
+						strings[attribute_key[j]]: strings[attribute_key[j + 1]] for j in range(0, len(attribute_key), 2)
+					}
+					attribute_dicts[attribute_key] = node_attributes
+
+				highlight_index = highlights[i] if highlights[i] >= 0 else None
+				node = DOMElementNode(
+					tag_name=strings[tags[i]],
+					xpath=xpath,
+					attributes=node_attributes,
+					children=[],
+					is_visible=bool(bits & PACKED_VISIBLE),
+					is_interactive=bool(bits & PACKED_INTERACTIVE),
+					is_top_element=bool(bits & PACKED_TOP),
+					is_in_viewport=bool(bits & PACKED_IN_VIEWPORT),
+					highlight_index=highlight_index,
+					shadow_root=bool(bits & PACKED_SHADOW_ROOT),
+					parent=parent,
+				)
+				if highlight_index is not None:
+					selector_map[highlight_index] = node
+
+			if parent is not None:
+				parent.children.append(node)  # type: ignore[union-attr]
+			nodes.append(node)
+
+		if not nodes or not isinstance(nodes[0], DOMElementNode):
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		if keep_node_map:
+			ids = packed['ids']
+			self._node_map = dict(zip(ids, nodes))
+			self._children_ids = {id: [] for id, node in zip(ids, nodes) if isinstance(node, DOMElementNode)}
+			for id, parent_position in zip(ids, parents):
+				if parent_position >= 0:
+					self._children_ids[ids[parent_position]].append(id)
+			self._root_id = ids[0]
+
+		return nodes[0], selector_map
+
+	@time_execution_sync('--patch_dom_tree')
+	def _patch_dom_tree(self, eval_page: dict) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Build the next tree from the cached one and an incremental build.
+		Earlier trees stay untouched, they may still be held by previous states and history items:
+		changed nodes are parsed anew and every other node is copied (parent links rule out sharing subtrees).
+		"""
+		old_map = self._node_map
+		removed = set(eval_page['removed'])
+		flags = eval_page['flags']
+		if not eval_page['map'] and not removed and not flags:
+			root = old_map[str(eval_page['rootId'])]
+			assert isinstance(root, DOMElementNode)
+			return root, self._selector_map(old_map)
+
+		changed: dict[str, DOMBaseNode] = {}
+		for node_id, node_data in eval_page['map'].items():
+			node, children_ids = self._parse_node(node_data)
+			if node is None:
+				continue
+			changed[node_id] = node
+			self._children_ids[node_id] = [str(child_id) for child_id in children_ids]
+		for node_id in removed - changed.keys():
+			self._children_ids.pop(node_id, None)
+
+		# Parent of every node in the cached tree, by id() of the node
+		old_parent_ids: dict[int, str] = {}
+		for node_id, node in old_map.items():
+			if isinstance(node, DOMElementNode):
+				for child in node.children:
+					old_parent_ids[id(child)] = node_id
+
+		node_map: dict[str, DOMBaseNode] = {}
+		for node_id, node in old_map.items():
+			if node_id in changed or node_id in removed:
+				continue
+			node_map[node_id] = self._copy_node(node)
+		node_map.update(changed)
+
+		for node_id, node_flags in flags.items():
+			node = node_map.get(node_id)
+			if not isinstance(node, DOMElementNode):
+				continue
+			node.is_top_element = node_flags['isTopElement']
+			node.is_interactive = node_flags['isInteractive']
+			node.is_in_viewport = node_flags['isInViewport']
+			node.highlight_index = node_flags['highlightIndex']
+
+		for node_id, node in node_map.items():
+			if not isinstance(node, DOMElementNode):
+				continue
+			for child_id in self._children_ids.get(node_id, []):
+				child_node = node_map.get(child_id)
+				if child_node is None:
+					continue
+				moved = old_parent_ids.get(id(old_map.get(child_id))) != node_id
+				if child_id not in changed and isinstance(child_node, DOMElementNode) and moved:
+					# Moved under a new parent, cached branch path hashes below it are stale
+					self._reset_hashes(child_node)
+				child_node.parent = node
+				node.children.append(child_node)
+
+		root = node_map.get(str(eval_page['rootId']))
+		if root is None or not isinstance(root, DOMElementNode):
+			raise ValueError('Failed to patch DOM tree: root node missing')
+		self._node_map = node_map
+		return root, self._selector_map(node_map)
+
+	@staticmethod
+	def _selector_map(node_map: dict[str, DOMBaseNode]) -> SelectorMap:
+		return {
+			node.highlight_index: node
+			for node in node_map.values()
+			if isinstance(node, DOMElementNode) and node.highlight_index is not None
+		}
+
+	@staticmethod
+	def _copy_node(node: DOMBaseNode) -> DOMBaseNode:
+		"""Detached copy of a node, keeping its cached hashes; attributes are read-only and stay shared"""
+		if isinstance(node, DOMTextNode):
+			return DOMTextNode(text=node.text, is_visible=node.is_visible, parent=None)
+		assert isinstance(node, DOMElementNode)
+		copy = DOMElementNode.__new__(DOMElementNode)
+		for name in _ELEMENT_COPY_FIELDS:
+			setattr(copy, name, getattr(node, name))
+		copy.parent = None
+		copy.children = []
+		return copy
+
+	@staticmethod
+	def _reset_hashes(node: DOMElementNode) -> None:
+		stack = [node]
+		while stack:
+			element = stack.pop()
+			element._hash = None
+			element._branch_path_hash = None
+			stack.extend(child for child in element.children if isinstance(child, DOMElementNode))
+
 	def _parse_node(
 		self,
 		node_data: dict,
@@ -150,9 +411,9 @@ class DomService:
 			)
 
 		element_node = DOMElementNode(
-			tag_name=node_data['tagName'],
+			tag_name=sys.intern(node_data['tagName']),
 			xpath=node_data['xpath'],
-			attributes=node_data.get('attributes', {}),
+			attributes={sys.intern(key): value for key, value in node_data.get('attributes', {}).items()},
 			children=[],
 			is_visible=node_data.get('isVisible', False),
 			is_interactive=node_data.get('isInteractive', False),
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
 from typing import TYPE_CHECKING, Dict, List, Optional
 
@@ -10,14 +10,15 @@ if TYPE_CHECKING:
 	from .views import DOMElementNode
 
 
-@dataclass(frozen=False)
+# Nodes use __slots__: large pages produce tens of thousands of them per step
+@dataclass(frozen=False, slots=True)
 class DOMBaseNode:
 	is_visible: bool
 	# Use None as default and set parent later to avoid circular reference issues
 	parent: Optional['DOMElementNode']
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMTextNode(DOMBaseNode):
 	text: str
 	type: str = 'TEXT_NODE'
@@ -43,11 +44,14 @@ class DOMTextNode(DOMBaseNode):
 		return self.parent.is_top_element
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMElementNode(DOMBaseNode):
 	"""
 	xpath: the xpath of the element from the last root node (shadow root or iframe OR document if no shadow root or iframe).
 	To properly reference the element we need to recursively switch the root node until we find the element (work you way up the tree with `.parent`)
+
+	attributes: tag and attribute names are interned and nodes with identical attributes may share one dict,
+	treat it as read-only.
 	"""
 
 	tag_name: str
@@ -62,6 +66,10 @@ class DOMElementNode(DOMBaseNode):
 	viewport_coordinates: Optional[CoordinateSet] = None
 	page_coordinates: Optional[CoordinateSet] = None
 	viewport_info: Optional[ViewportInfo] = None
+	# Shortest css selector matching only this element in its document when the tree was built, highlighted elements only
+	unique_selector: Optional[str] = None
+	_hash: Optional[HashedDomElement] = field(default=None, init=False, repr=False, compare=False)
+	_branch_path_hash: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
 	def __repr__(self) -> str:
 		tag_str = f'<{self.tag_name}'
@@ -89,13 +97,16 @@ class DOMElementNode(DOMBaseNode):
 
 		return tag_str
 
-	@cached_property
+	@property
 	def hash(self) -> HashedDomElement:
-		from browser_use.dom.history_tree_processor.service import (
-			HistoryTreeProcessor,
-		)
+		# Cached in a slot, reset _hash and _branch_path_hash to None when the node is modified or moved
+		if self._hash is None:
+			from browser_use.dom.history_tree_processor.service import (
+				HistoryTreeProcessor,
+			)
 
-		return HistoryTreeProcessor._hash_dom_element(self)
+			self._hash = HistoryTreeProcessor._hash_dom_element(self)
+		return self._hash
 
 	def get_all_text_till_next_clickable_element(self, max_depth: int = -1) -> str:
 		text_parts = []
@@ -105,7 +116,7 @@ class DOMElementNode(DOMBaseNode):
 				return
 
 			# Skip this branch if we hit a highlighted element (except for the current node)
-			if isinstance(node, DOMElementNode) and node != self and node.highlight_index is not None:
+			if isinstance(node, DOMElementNode) and node is not self and node.highlight_index is not None:
 				return
 
 			if isinstance(node, DOMTextNode):
@@ -120,49 +131,76 @@ class DOMElementNode(DOMBaseNode):
 	@time_execution_sync('--clickable_elements_to_string')
 	def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
 		"""Convert the processed DOM content to HTML."""
-		formatted_text = []
+		return '\n'.join(line for _, line in self.clickable_elements_to_lines(include_attributes))
+
+	def clickable_elements_to_lines(
+		self, include_attributes: list[str] | None = None
+	) -> list[tuple[Optional['DOMElementNode'], str]]:
+		"""Lines of clickable_elements_to_string with the highlighted element of each line (None for text).
+
+		Single pass over the tree: the text of each highlighted element (as returned by
+		get_all_text_till_next_clickable_element) is collected on the way down and its
+		line is filled in once the walk is complete.
+		"""
+		formatted_text: list[tuple[Optional[DOMElementNode], str]] = []
+		# Line position, element and text parts of every highlighted element
+		highlighted: list[tuple[int, DOMElementNode, list[str]]] = []
+
+		has_highlighted_parent = False
+		current = self.parent
+		while current is not None and not has_highlighted_parent:
+			has_highlighted_parent = current.highlight_index is not None
+			current = current.parent
 
-		def process_node(node: DOMBaseNode, depth: int) -> None:
+		# Each entry carries the text parts of the nearest highlighted ancestor (None if there is none)
+		# and whether any ancestor is highlighted, which is what DOMTextNode.has_parent_with_highlight_index checks
+		stack: list[tuple[DOMBaseNode, Optional[list[str]], bool]] = [(self, None, has_highlighted_parent)]
+		while stack:
+			node, text_parts, in_highlighted = stack.pop()
 			if isinstance(node, DOMElementNode):
-				# Add element with highlight_index
 				if node.highlight_index is not None:
-					attributes_str = ''
-					text = node.get_all_text_till_next_clickable_element()
-					if include_attributes:
-						attributes = list(
-							set(
-								[
-									str(value)
-									for key, value in node.attributes.items()
-									if key in include_attributes and value != node.tag_name
-								]
-							)
-						)
-						if text in attributes:
-							attributes.remove(text)
-						attributes_str = ';'.join(attributes)
-					line = f'[{node.highlight_index}]<{node.tag_name} '
-					if attributes_str:
-						line += f'{attributes_str}'
-					if text:
-						if attributes_str:
-							line += f'>{text}'
-						else:
-							line += f'{text}'
-					line += '/>'
-					formatted_text.append(line)
-
+					text_parts = []
+					in_highlighted = True
+					highlighted.append((len(formatted_text), node, text_parts))
+					formatted_text.append((node, ''))
 				# Process children regardless
-				for child in node.children:
-					process_node(child, depth + 1)
+				stack.extend((child, text_parts, in_highlighted) for child in reversed(node.children))
 
 			elif isinstance(node, DOMTextNode):
+				if text_parts is not None:
+					text_parts.append(node.text)
 				# Add text only if it doesn't have a highlighted parent
-				if not node.has_parent_with_highlight_index() and node.is_visible:  # and node.is_parent_top_element()
-					formatted_text.append(f'{node.text}')
-
-		process_node(self, 0)
-		return '\n'.join(formatted_text)
+				elif not in_highlighted and node.is_visible:  # and node.is_parent_top_element()
+					formatted_text.append((None, f'{node.text}'))
+
+		for position, node, text_parts in highlighted:
+			attributes_str = ''
+			text = '\n'.join(text_parts).strip()
+			if include_attributes:
+				attributes = list(
+					set(
+						[
+							str(value)
+							for key, value in node.attributes.items()
+							if key in include_attributes and value != node.tag_name
+						]
+					)
+				)
+				if text in attributes:
+					attributes.remove(text)
+				attributes_str = ';'.join(attributes)
+			line = f'[{node.highlight_index}]<{node.tag_name} '
+			if attributes_str:
+				line += f'{attributes_str}'
+			if text:
+				if attributes_str:
+					line += f'>{text}'
+				else:
+					line += f'{text}'
+			line += '/>'
+			formatted_text[position] = (node, line)
+
+		return formatted_text
 
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']:
 		# Check if current element is a file input
@@ -194,3 +232,12 @@ SelectorMap = dict[int, DOMElementNode]
 class DOMState:
 	element_tree: DOMElementNode
 	selector_map: SelectorMap
+	# Identifies the page-side registry of the highlighted elements of this tree (see buildDomTree.js)
+	elements_token: Optional[str] = field(default=None, kw_only=True)
+
+	@cached_property
+	def hash_index(self) -> dict[HashedDomElement, DOMElementNode]:
+		"""Highlighted elements of the tree by hash, built on first use"""
+		from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+
+		return HistoryTreeProcessor.build_hash_index(self.element_tree)
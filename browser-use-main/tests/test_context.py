@@ -2,8 +2,8 @@ import asyncio
 import base64
 import os
 import pytest
-from browser_use.browser.context import BrowserContext, BrowserContextConfig
-from browser_use.browser.views import BrowserState
+from browser_use.browser.context import BrowserContext, BrowserContextConfig, BrowserSession
+from browser_use.browser.views import BrowserState, screenshot_media_type
 from browser_use.dom.views import DOMElementNode
 from unittest.mock import Mock
 
@@ -323,4 +323,323 @@ async def test_remove_highlights_failure():
     try:
         await context.remove_highlights()
     except Exception as e:
-        pytest.fail(f"remove_highlights raised an exception: {e}")
\ No newline at end of file
+        pytest.fail(f"remove_highlights raised an exception: {e}")
+
+
+@pytest.mark.asyncio
+async def test_state_screenshot_reused_when_page_unchanged():
+    """
+    Test that _get_state_screenshot only captures a new screenshot when the page signature changes,
+    and reuses the previous one otherwise.
+    """
+    dummy_browser = Mock()
+    dummy_browser.config = Mock()
+    context = BrowserContext(browser=dummy_browser, config=BrowserContextConfig(skip_unchanged_screenshots=True))
+    context.session = BrowserSession(context=None, cached_state=None)
+    signatures = iter(["a", "a", "b"])
+    captured = []
+    async def dummy_signature(page):
+        return next(signatures)
+    async def dummy_take_screenshot(full_page=False):
+        captured.append(full_page)
+        return f"shot{len(captured)}"
+    context._get_page_signature = dummy_signature
+    context.take_screenshot = dummy_take_screenshot
+    assert await context._get_state_screenshot(page=None) == "shot1"
+    assert await context._get_state_screenshot(page=None) == "shot1"
+    assert await context._get_state_screenshot(page=None) == "shot2"
+    assert len(captured) == 2
+
+
+def test_screenshot_media_type():
+    """
+    Test that the screenshot media type is detected from the base64 prefix of PNG, JPEG and WebP images.
+    """
+    assert screenshot_media_type(base64.b64encode(b"\x89PNG\r\n\x1a\n").decode()) == "image/png"
+    assert screenshot_media_type(base64.b64encode(b"\xff\xd8\xff\xe0").decode()) == "image/jpeg"
+    assert screenshot_media_type(base64.b64encode(b"RIFF\x00\x00\x00\x00WEBP").decode()) == "image/webp"
+
+
+class FakeEventPage:
+    """Minimal page that lets tests emit request events"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, arg=None):
+        for handler in list(self.handlers.get(event, [])):
+            handler(arg)
+
+
+def fake_request(url="https://example.com/app.js", resource_type="script"):
+    return Mock(url=url, resource_type=resource_type, headers={})
+
+
+@pytest.mark.asyncio
+async def test_network_idle_tracker_events():
+    """
+    The tracker resolves as soon as the network is idle instead of polling,
+    drops failed requests and reports why the wait ended.
+    """
+    from browser_use.browser.network import NetworkIdleTracker
+
+    page = FakeEventPage()
+    tracker = NetworkIdleTracker(page, idle_time=0.05)
+
+    # A new tracker does not know what the page loaded before, it waits out idle_time once
+    result = await tracker.wait_for_idle(timeout=1)
+    assert result.reason == "idle" and result.waited >= 0.04
+
+    # Nothing loading: no wait at all
+    result = await tracker.wait_for_idle(timeout=1)
+    assert result.reason == "already_idle" and result.waited == 0
+
+    # A failed request no longer blocks until the timeout
+    script = fake_request()
+    page.emit("request", script)
+    page.emit("request", fake_request(url="https://example.com/analytics.js"))
+    assert len(tracker.pending) == 1
+    asyncio.get_running_loop().call_later(0.02, page.emit, "requestfailed", script)
+    result = await tracker.wait_for_idle(timeout=1)
+    assert result.reason == "idle"
+    assert 0.05 <= result.waited < 0.5
+
+    # A request that never finishes ends in a timeout that names it
+    page.emit("request", fake_request(url="https://example.com/slow.css", resource_type="stylesheet"))
+    result = await tracker.wait_for_idle(timeout=0.1)
+    assert result.reason == "timeout"
+    assert result.pending_urls == ["https://example.com/slow.css"]
+
+    # Closing the page releases waiters and the listeners can be removed
+    page.emit("close")
+    assert (await tracker.wait_for_idle(timeout=1)).reason == "closed"
+    tracker.detach()
+    assert not any(page.handlers.values())
+
+
+@pytest.mark.asyncio
+async def test_new_tab_tracked_from_the_start():
+    """
+    Pages opened after the session started get their network tracker when they open,
+    so the first wait on a new tab does not report it idle right away.
+    """
+    from unittest.mock import AsyncMock
+
+    class FakeContext:
+        def on(self, event, handler):
+            self.handler = handler
+
+    class FakeTab(FakeEventPage):
+        url = "https://example.com/new"
+        wait_for_load_state = AsyncMock()
+
+        def once(self, event, handler):
+            self.on(event, handler)
+
+    dummy_browser = Mock()
+    dummy_browser.config = Mock(cdp_url=None)
+    context = BrowserContext(browser=dummy_browser, config=BrowserContextConfig(wait_for_network_idle_page_load_time=0.05))
+    context.session = BrowserSession(context=None, cached_state=None)
+    playwright_context = FakeContext()
+    context._add_new_page_listener(playwright_context)
+
+    tab = FakeTab()
+    await playwright_context.handler(tab)
+    tracker = context.session.network_trackers[tab]
+    assert context._get_network_tracker(context.session, tab) is tracker
+    assert (await tracker.wait_for_idle(timeout=1)).reason == "idle"
+
+
+@pytest.mark.asyncio
+async def test_request_blocker_profiles():
+    """
+    Blocked requests are aborted before they are sent, documents always go through,
+    and images a HEAD request reports as oversized are withheld from the page with their size counted.
+    """
+    from unittest.mock import AsyncMock
+    from browser_use.browser.network import RequestBlocker
+
+    def route():
+        return Mock(abort=AsyncMock(), fallback=AsyncMock(), fetch=AsyncMock(), fulfill=AsyncMock())
+
+    blocker = RequestBlocker("light")
+    tracker_route = route()
+    await blocker.handle(tracker_route, fake_request(url="https://www.google-analytics.com/collect"))
+    tracker_route.abort.assert_awaited_once_with("blockedbyclient")
+
+    font_route = route()
+    await blocker.handle(font_route, fake_request(url="https://example.com/a.woff2", resource_type="font"))
+    font_route.abort.assert_awaited_once()
+
+    document_route = route()
+    await blocker.handle(document_route, fake_request(url="https://example.com/analytics-jobs", resource_type="document"))
+    document_route.fallback.assert_awaited_once()
+
+    def image_request(url):
+        request = fake_request(url=url, resource_type="image")
+        request.method = "GET"
+        return request
+
+    image_route = route()
+    image_route.fetch.return_value = Mock(ok=True, headers={"content-length": str(3 * 1024 * 1024)})
+    await blocker.handle(image_route, image_request("https://example.com/hero.png"))
+    image_route.fetch.assert_awaited_once_with(method="HEAD")
+    image_route.fulfill.assert_awaited_once_with(status=204, body=b"")
+
+    # Small or unknown sizes go on to the next handler, a failing HEAD never leaves the request hanging
+    small_route = route()
+    small_route.fetch.return_value = Mock(ok=True, headers={"content-length": "2048"})
+    await blocker.handle(small_route, image_request("https://example.com/logo.png"))
+    small_route.fallback.assert_awaited_once()
+    small_route.fulfill.assert_not_awaited()
+
+    failing_route = route()
+    failing_route.fetch.side_effect = ConnectionResetError()
+    await blocker.handle(failing_route, image_request("https://example.com/photo.jpg"))
+    failing_route.fallback.assert_awaited_once()
+
+    broken_route = route()
+    broken_route.abort.side_effect = RuntimeError("Target closed")
+    await blocker.handle(broken_route, fake_request(url="https://example.com/a.woff2", resource_type="font"))
+    broken_route.fallback.assert_awaited_once()
+
+    assert blocker.stats.requests == 4
+    assert blocker.stats.bytes == 3 * 1024 * 1024
+    assert blocker.stats.by_reason == {"url_pattern": 1, "font": 2, "max_content_length": 1}
+
+    with pytest.raises(ValueError):
+        RequestBlocker("everything")
+
+
+@pytest.mark.asyncio
+async def test_asset_cache_hits_revalidation_and_eviction(tmp_path):
+    """
+    Cacheable assets are served from disk while fresh, revalidated with their ETag once stale,
+    never stored with no-store, and least recently used entries are evicted beyond max_size.
+    """
+    from unittest.mock import AsyncMock
+    from browser_use.browser.asset_cache import AssetCache
+
+    def route(status=200, headers=None, body=b""):
+        response = Mock(status=status, headers=headers or {}, body=AsyncMock(return_value=body))
+        return Mock(fallback=AsyncMock(), fetch=AsyncMock(return_value=response), fulfill=AsyncMock())
+
+    def request(url):
+        return Mock(url=url, method="GET", resource_type="script", headers={})
+
+    cache = AssetCache(str(tmp_path), max_size=1000)
+    bundle = "https://boards.example.com/app.js"
+
+    await cache.handle(route(headers={"Cache-Control": "max-age=3600"}, body=b"x" * 60), request(bundle))
+    warm = route()
+    await cache.handle(warm, request(bundle))
+    warm.fetch.assert_not_awaited()
+    warm.fulfill.assert_awaited_once()
+    assert warm.fulfill.await_args.kwargs["body"] == b"x" * 60
+
+    # A shared cache in another process sees the same entries
+    assert AssetCache(str(tmp_path))._load(bundle) is not None
+
+    stale = "https://boards.example.com/app.css"
+    await cache.handle(route(headers={"cache-control": "no-cache", "etag": '"v1"'}, body=b"css"), request(stale))
+    revalidate = route(status=304)
+    await cache.handle(revalidate, request(stale))
+    assert revalidate.fetch.await_args.kwargs["headers"]["if-none-match"] == '"v1"'
+    assert revalidate.fulfill.await_args.kwargs["body"] == b"css"
+
+    await cache.handle(route(headers={"cache-control": "no-store"}, body=b"secret"), request("https://example.com/me.js"))
+    assert cache._load("https://example.com/me.js") is None
+
+    assert (cache.stats.hits, cache.stats.revalidated, cache.stats.misses) == (1, 1, 3)
+
+    # Fill past max_size: the least recently used entries go first
+    for i in range(20):
+        await cache.handle(route(headers={"cache-control": "max-age=60"}, body=b"y" * 90), request(f"https://example.com/{i}.js"))
+    assert cache.stats.evicted > 0
+    assert cache._current_size() <= 1000
+    assert cache._load("https://example.com/19.js") is not None
+    assert cache._load(bundle) is None
+
+    other = route()
+    await cache.handle(other, Mock(url=bundle, method="POST", resource_type="script", headers={}))
+    other.fallback.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_locate_element_uses_registry_and_cache():
+    """
+    Highlighted elements of the cached state are fetched from the page-side registry without a selector,
+    their handles are reused for the same state, and elements inside iframes fall back to a cached css selector.
+    """
+    from unittest.mock import AsyncMock
+    from playwright.async_api import FrameLocator
+
+    body = DOMElementNode(tag_name="body", is_visible=True, parent=None, xpath="/html/body", attributes={}, children=[])
+    button = DOMElementNode(
+        tag_name="button", is_visible=True, parent=body, xpath="/html/body/button", attributes={}, children=[], highlight_index=0
+    )
+    iframe = DOMElementNode(tag_name="iframe", is_visible=True, parent=body, xpath="/html/body/iframe", attributes={}, children=[])
+    framed = DOMElementNode(
+        tag_name="input", is_visible=True, parent=iframe, xpath="/html/body/input", attributes={}, children=[], highlight_index=1
+    )
+    state = BrowserState(
+        element_tree=body,
+        selector_map={0: button, 1: framed},
+        elements_token="token-1",
+        url="https://example.com",
+        title="",
+        tabs=[],
+    )
+
+    handle = Mock(evaluate=AsyncMock(return_value=True), scroll_into_view_if_needed=AsyncMock(), dispose=AsyncMock())
+    framed_handle = Mock()
+    frame_locator = Mock(spec=FrameLocator)
+    frame_locator.locator.return_value = Mock(element_handle=AsyncMock(return_value=framed_handle))
+    page = Mock(
+        evaluate_handle=AsyncMock(return_value=Mock(as_element=Mock(return_value=handle))),
+        query_selector=AsyncMock(),
+    )
+    page.frame_locator.return_value = frame_locator
+
+    dummy_browser = Mock()
+    dummy_browser.config = Mock()
+    context = BrowserContext(browser=dummy_browser, config=BrowserContextConfig())
+    context.session = BrowserSession(context=None, cached_state=state)
+    context.get_current_page = AsyncMock(return_value=page)
+
+    assert await context.get_locate_element(button, scroll_into_view=False) is handle
+    assert page.evaluate_handle.await_args.args[1] == ["token-1", 0, "button"]
+    handle.scroll_into_view_if_needed.assert_not_awaited()
+
+    # Same state: the handle is reused after checking it is still attached
+    assert await context.get_locate_element(button) is handle
+    assert page.evaluate_handle.await_count == 1
+    handle.scroll_into_view_if_needed.assert_awaited_once()
+    page.query_selector.assert_not_awaited()
+
+    # Inside an iframe: css selectors, computed once per node of the state
+    selectors = []
+    def dummy_selector(element, include_dynamic_attributes=True):
+        selectors.append(element.tag_name)
+        return element.tag_name
+    context._enhanced_css_selector_for_element = dummy_selector
+    assert await context.get_locate_element(framed) is framed_handle
+    assert await context.get_locate_element(framed) is framed_handle
+    assert selectors == ["iframe", "input"]
+    page.frame_locator.assert_called_with("iframe")
+    assert page.evaluate_handle.await_count == 1
+
+    # A new state drops the cache and releases its handles in the page
+    context.session.cached_state = BrowserState(
+        element_tree=body, selector_map={0: button}, elements_token="token-2", url="https://example.com", title="", tabs=[]
+    )
+    handle.dispose.assert_not_awaited()
+    assert await context.get_locate_element(button) is handle
+    assert page.evaluate_handle.await_count == 2
+    handle.dispose.assert_awaited_once()
@@ -0,0 +1,323 @@
+import random
+import time
+
+import pytest
+
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+
+def _element(tag_name, xpath, children, **extra):
+	return {'tagName': tag_name, 'xpath': xpath, 'attributes': {}, 'children': children, 'isVisible': True, **extra}
+
+
+@pytest.mark.asyncio
+async def test_patch_dom_tree_leaves_previous_tree_untouched():
+	"""
+	An incremental result replaces the changed subtree, drops removed nodes and applies
+	flag changes to untouched nodes in a new tree, while the previous tree and selector map stay as they were.
+	"""
+	service = DomService(page=None)  # type: ignore
+	full = {
+		'rootId': '0',
+		'map': {
+			'3': {'type': 'TEXT_NODE', 'text': 'Old', 'isVisible': True},
+			'2': _element('button', 'html/body/div/button', [], isTopElement=True, isInteractive=True, highlightIndex=1),
+			'1': _element('div', 'html/body/div', ['3', '2']),
+			'4': _element('a', 'html/body/a', [], isTopElement=True, isInteractive=True, highlightIndex=0),
+			'0': {'tagName': 'body', 'xpath': '/body', 'attributes': {}, 'children': ['4', '1']},
+		},
+	}
+	root, selector_map = await service._construct_dom_tree(full, keep_node_map=True)
+	old_div, old_link = service._node_map['1'], service._node_map['4']
+	link_hash = old_link.hash
+	assert set(selector_map) == {0, 1}
+
+	patch = {
+		'rootId': '0',
+		'map': {
+			'5': {'type': 'TEXT_NODE', 'text': 'New', 'isVisible': True},
+			'6': _element('input', 'html/body/div/input', [], isTopElement=True, isInteractive=True, highlightIndex=1),
+			'1': _element('div', 'html/body/div', ['5', '6']),
+		},
+		'removed': ['3', '2'],
+		'flags': {'4': {'isTopElement': False, 'isInteractive': False, 'isInViewport': False, 'highlightIndex': None}},
+		'incremental': True,
+	}
+	patched_root, patched_map = service._patch_dom_tree(patch)
+
+	div = service._node_map['1']
+	assert patched_root is not root and div is not old_div
+	assert '2' not in service._node_map and '3' not in service._node_map
+	assert [type(child) for child in div.children] == [DOMTextNode, DOMElementNode]
+	assert div.children[0].text == 'New'
+	assert div.children[1].parent is div and div.parent is patched_root
+	assert patched_map == {1: service._node_map['6']}
+	assert service._node_map['4'].highlight_index is None
+	# Unchanged nodes keep their cached hash
+	assert service._node_map['4']._hash == link_hash
+
+	# The previous state still sees its own tree
+	assert selector_map == {0: old_link, 1: old_div.children[1]}
+	assert old_link.highlight_index == 0 and old_link.parent is root
+	assert [child.text for child in old_div.children if isinstance(child, DOMTextNode)] == ['Old']
+	assert root.children == [old_link, old_div]
+
+	# Nothing changed: the same tree is returned
+	unchanged_root, _ = service._patch_dom_tree({'rootId': '0', 'map': {}, 'removed': [], 'flags': {}, 'incremental': True})
+	assert unchanged_root is patched_root
+
+
+def test_decode_packed_tree():
+	"""
+	The packed format decodes to the same tree as the per-node map: children in order,
+	xpaths rebuilt from parent-relative segments, attributes from the string table.
+	"""
+	packed = {
+		'strings': ['body', 'a', 'href', '/x', 'div', 'class', 'x', 'button', 'type', 'submit', 'iframe', 'html'],
+		'ids': ['0', '4', '1', '3', '2', '7', '8'],
+		'parents': [-1, 0, 0, 2, 2, 2, 5],
+		'flags': [64, 79, 65, 33, 15, 1, 65],
+		'tags': [0, 1, 4, -1, 7, 10, 11],
+		'xpaths': ['/body', 'html/body/a', 'html/body/div', None, 'button', 'iframe', 'html'],
+		'texts': [None, None, None, 'Hello', None, None, None],
+		'highlights': [-1, 0, -1, -1, 1, -1, -1],
+		'attributes': [2, 3, 5, 6, 5, 6, 8, 9],
+		'attributeOffsets': [0, 0, 2, 4, 4, 8, 8, 8],
+	}
+	service = DomService(page=None)  # type: ignore
+	root, selector_map = service._decode_packed_tree(packed, keep_node_map=True)
+
+	link, div = root.children
+	text, button, iframe = div.children
+	assert root.xpath == '/body' and root.parent is None
+	assert link.xpath == 'html/body/a' and link.attributes == {'href': '/x'}
+	assert isinstance(text, DOMTextNode) and text.text == 'Hello' and text.parent is div
+	assert button.xpath == 'html/body/div/button'
+	assert button.attributes == {'class': 'x', 'type': 'submit'}
+	assert button.is_interactive and button.is_top_element and button.is_in_viewport
+	assert iframe.xpath == 'html/body/div/iframe'
+	assert iframe.children[0].xpath == 'html'
+	assert selector_map == {0: link, 1: button}
+	assert service._node_map['2'] is button
+
+
+@pytest.mark.asyncio
+async def test_unique_selectors_from_build_are_used_for_locating():
+	"""
+	Unique selectors are only requested when enabled, are set on the highlighted nodes by index
+	and are preferred over the selector built from xpath and attributes, unless they rely on
+	data-* attributes while dynamic attributes are disabled.
+	"""
+	from browser_use.browser.context import BrowserContext
+
+	eval_page = {
+		'rootId': '0',
+		'map': {
+			'2': _element('button', 'html/body/div/button', [], isTopElement=True, isInteractive=True, highlightIndex=1),
+			'1': _element('input', 'html/body/input', [], isTopElement=True, isInteractive=True, highlightIndex=0),
+			'0': {'tagName': 'body', 'xpath': '/body', 'attributes': {}, 'children': ['1', '2']},
+		},
+		'elementsToken': 'token',
+		'uniqueSelectors': ['input[name="email"]', 'button[data-testid="submit"]'],
+	}
+	calls = []
+
+	class FakePage:
+		async def evaluate(self, script, args=None):
+			calls.append(args)
+			return 2 if script == '1+1' else eval_page
+
+	service = DomService(page=FakePage())  # type: ignore
+	state = await service.get_clickable_elements(highlight_elements=False, unique_selectors=True)
+
+	email, button = state.selector_map[0], state.selector_map[1]
+	assert calls[-1]['uniqueSelectors'] is True and calls[-1]['dynamicAttributes'] is True
+	assert state.elements_token == 'token'
+	assert email.unique_selector == 'input[name="email"]'
+	assert BrowserContext._enhanced_css_selector_for_element(email) == 'input[name="email"]'
+	assert BrowserContext._enhanced_css_selector_for_element(button) == 'button[data-testid="submit"]'
+	assert (
+		BrowserContext._enhanced_css_selector_for_element(button, include_dynamic_attributes=False)
+		== 'html > body > div > button'
+	)
+
+	eval_page.pop('uniqueSelectors')
+	state = await service.get_clickable_elements(highlight_elements=False)
+	assert calls[-1]['uniqueSelectors'] is False
+	assert state.selector_map[0].unique_selector is None
+
+
+@pytest.mark.asyncio
+async def test_element_hash_matches_history_element_and_is_indexed():
+	"""
+	Hashes built from the parent's cached branch hash equal the hash of the serialized
+	history element, and the hash index finds the element without walking the tree.
+	"""
+	service = DomService(page=None)  # type: ignore
+	eval_page = {
+		'rootId': '0',
+		'map': {
+			'3': _element('button', 'html/body/div/form/button', [], isInteractive=True, highlightIndex=1),
+			'2': _element('form', 'html/body/div/form', ['3']),
+			'1': _element('div', 'html/body/div', ['2'], isInteractive=True, highlightIndex=0),
+			'0': {'tagName': 'body', 'xpath': '/body', 'attributes': {}, 'children': ['1']},
+		},
+	}
+	root, selector_map = await service._construct_dom_tree(eval_page)
+	button = selector_map[1]
+
+	history_element = HistoryTreeProcessor.convert_dom_element_to_history_element(button)
+	assert history_element.entire_parent_branch_path == ['div', 'form', 'button']
+	assert button.hash is button.hash
+	assert button.hash == HistoryTreeProcessor._hash_dom_history_element(history_element)
+
+	index = HistoryTreeProcessor.build_hash_index(root)
+	assert [id(node) for node in index.values()] == [id(selector_map[0]), id(button)]
+	assert HistoryTreeProcessor.find_history_element_in_tree(history_element, root, index) is button
+	assert HistoryTreeProcessor.find_history_element_in_tree(history_element, root) is button
+
+
+def test_find_similar_element_falls_back_on_attributes():
+	"""
+	When the exact hash misses, the candidate with the same tag and the closest attributes
+	is chosen; ties and weak matches return None instead of guessing.
+	"""
+	history_element = DOMHistoryElement(
+		'input', 'html/body/form/input[2]', 3, ['form', 'input'], {'id': 'email', 'name': 'email', 'class': 'field-a1'}
+	)
+	moved = DOMElementNode(
+		tag_name='input',
+		xpath='html/body/div/form/input[2]',
+		attributes={'id': 'email', 'name': 'email', 'class': 'field-b7'},
+		children=[],
+		is_visible=True,
+		parent=None,
+	)
+	other = DOMElementNode(
+		tag_name='input',
+		xpath='html/body/div/form/input[1]',
+		attributes={'id': 'phone', 'name': 'phone', 'class': 'field-b7'},
+		children=[],
+		is_visible=True,
+		parent=None,
+	)
+	link = DOMElementNode(
+		tag_name='a', xpath='html/body/a', attributes=dict(history_element.attributes), children=[], is_visible=True, parent=None
+	)
+
+	assert HistoryTreeProcessor.find_similar_element(history_element, [other, link, moved]) is moved
+	assert HistoryTreeProcessor.find_similar_element(history_element, [other, link]) is None
+
+	twin = DOMElementNode(
+		tag_name='input',
+		xpath='html/body/aside/input',
+		attributes=dict(moved.attributes),
+		children=[],
+		is_visible=True,
+		parent=None,
+	)
+	assert HistoryTreeProcessor.find_similar_element(history_element, [moved, twin]) is None
+
+
+def _reference_clickable_elements_to_string(root, include_attributes=None):
+	"""The recursive serializer clickable_elements_to_string replaced, kept to check its output"""
+	formatted_text = []
+
+	def process_node(node):
+		if isinstance(node, DOMElementNode):
+			if node.highlight_index is not None:
+				attributes_str = ''
+				text = node.get_all_text_till_next_clickable_element()
+				if include_attributes:
+					attributes = list(
+						set(
+							[
+								str(value)
+								for key, value in node.attributes.items()
+								if key in include_attributes and value != node.tag_name
+							]
+						)
+					)
+					if text in attributes:
+						attributes.remove(text)
+					attributes_str = ';'.join(attributes)
+				line = f'[{node.highlight_index}]<{node.tag_name} '
+				if attributes_str:
+					line += f'{attributes_str}'
+				if text:
+					line += f'>{text}' if attributes_str else f'{text}'
+				line += '/>'
+				formatted_text.append(line)
+			for child in node.children:
+				process_node(child)
+		elif isinstance(node, DOMTextNode):
+			if not node.has_parent_with_highlight_index() and node.is_visible:
+				formatted_text.append(f'{node.text}')
+
+	process_node(root)
+	return '\n'.join(formatted_text)
+
+
+def _synthetic_tree(n_nodes, max_depth, seed=0):
+	"""Random tree with nested highlighted elements, hidden text and attributes"""
+	rng = random.Random(seed)
+	root = DOMElementNode(tag_name='body', xpath='/body', attributes={}, children=[], is_visible=True, parent=None)
+	elements = [(root, 0)]
+	highlight_index = 0
+	for i in range(n_nodes):
+		parent, depth = elements[-1] if rng.random() < 0.7 else rng.choice(elements)
+		if depth >= max_depth:
+			parent, depth = rng.choice(elements[: max(1, len(elements) // 10)])
+		if rng.random() < 0.4:
+			text = rng.choice(['', ' ', 'Apply', f'Label {i}', ' Submit '])
+			parent.children.append(DOMTextNode(text=text, is_visible=rng.random() < 0.9, parent=parent))
+			continue
+		tag_name = rng.choice(['div', 'span', 'a', 'button', 'input'])
+		attributes = {'role': rng.choice(['button', 'link', tag_name]), 'aria-label': rng.choice(['Apply', f'Field {i}'])}
+		highlighted = rng.random() < 0.3
+		element = DOMElementNode(
+			tag_name=tag_name,
+			xpath=f'{parent.xpath}/{tag_name}[{i}]',
+			attributes=attributes,
+			children=[],
+			is_visible=True,
+			parent=parent,
+			highlight_index=highlight_index if highlighted else None,
+		)
+		highlight_index += highlighted
+		parent.children.append(element)
+		elements.append((element, depth + 1))
+	return root
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_clickable_elements_to_string_matches_recursive_serializer(seed):
+	root = _synthetic_tree(600, max_depth=40, seed=seed)
+	subtree = root.children[0] if isinstance(root.children[0], DOMElementNode) else root
+	for node in (root, subtree):
+		for include_attributes in (None, ['role', 'aria-label']):
+			expected = _reference_clickable_elements_to_string(node, include_attributes)
+			assert node.clickable_elements_to_string(include_attributes) == expected
+
+
+def test_clickable_elements_to_string_benchmark():
+	"""
+	Large synthetic page: the single pass is linear in the tree size, while the recursive
+	serializer re-walked subtrees and ancestor chains. Run with -s to see the timings.
+	"""
+	root = _synthetic_tree(20_000, max_depth=200, seed=1)
+	include_attributes = ['role', 'aria-label']
+
+	start = time.perf_counter()
+	expected = _reference_clickable_elements_to_string(root, include_attributes)
+	reference_seconds = time.perf_counter() - start
+
+	start = time.perf_counter()
+	result = root.clickable_elements_to_string(include_attributes)
+	single_pass_seconds = time.perf_counter() - start
+
+	assert result == expected
+	print(f'\nclickable_elements_to_string on 20k nodes: {single_pass_seconds:.3f}s (recursive: {reference_seconds:.3f}s)')
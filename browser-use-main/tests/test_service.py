@@ -1,17 +1,37 @@
+import asyncio
+import base64
+import struct
+import threading
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from pydantic import BaseModel
 
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager import utils as message_utils
+from browser_use.agent.message_manager.utils import anthropic_cache_marker, get_cache_marker, get_token_counter, image_token_cost
+from browser_use.agent.replay import compile_history
 from browser_use.agent.service import Agent
-from browser_use.agent.views import ActionResult
+from browser_use.agent.views import (
+	ActionResult,
+	AgentBrain,
+	AgentHistory,
+	AgentHistoryList,
+	AgentOutput,
+	MessageManagerState,
+)
 from browser_use.browser.browser import Browser
 from browser_use.browser.context import BrowserContext
-from browser_use.browser.views import BrowserState
+from browser_use.browser.views import BrowserState, BrowserStateHistory, TabInfo
 from browser_use.controller.registry.service import Registry
 from browser_use.controller.registry.views import ActionModel
 from browser_use.controller.service import Controller
+from browser_use.controller.views import FillFieldsAction
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement
+from browser_use.dom.views import DOMElementNode, DOMTextNode
 
 # run with python -m pytest tests/test_service.py
 
@@ -218,3 +238,506 @@ class TestRegistry:
 			param1='test_value', browser=mock_browser
 		)
 		registry.registry.actions['test_action_without_browser'].function.assert_called_once_with(param1='test_value')
+
+
+class TestFillFields:
+	@staticmethod
+	def _node(tag_name, parent=None, highlight_index=None):
+		return DOMElementNode(
+			tag_name=tag_name,
+			is_visible=True,
+			parent=parent,
+			xpath=f'html/body/{tag_name}',
+			attributes={},
+			children=[],
+			highlight_index=highlight_index,
+		)
+
+	@pytest.mark.asyncio
+	async def test_fill_fields_batches_document_fields_and_reports_each(self):
+		"""
+		Fields in the top-level document are filled in one _fill_elements call,
+		fields inside an iframe fall back to _input_text_element_node,
+		and every field gets its own line in the result.
+		"""
+		body = self._node('body')
+		document_input = self._node('input', parent=body, highlight_index=1)
+		iframe = self._node('iframe', parent=body)
+		iframe_input = self._node('input', parent=iframe, highlight_index=2)
+
+		browser = MagicMock()
+		browser.config.include_dynamic_attributes = True
+		browser.get_selector_map = AsyncMock(return_value={1: document_input, 2: iframe_input})
+		browser._enhanced_css_selector_for_element = MagicMock(return_value='input#first')
+		browser._fill_elements = AsyncMock(
+			return_value=[
+				{'status': 'ok', 'value': 'Ada', 'error': None},
+				{'status': 'not_found', 'value': None, 'error': None},
+			]
+		)
+		browser._input_text_element_node = AsyncMock()
+
+		controller = Controller()
+		fill_fields = controller.registry.registry.actions['fill_fields'].function
+		params = FillFieldsAction(
+			fields=[
+				{'index': 1, 'value': 'Ada'},
+				{'selector': '#missing', 'value': 'x'},
+				{'index': 2, 'value': 'Lovelace'},
+			]
+		)
+
+		result = await fill_fields(params, browser=browser)
+
+		browser._fill_elements.assert_awaited_once_with(
+			[
+				{'selector': 'input#first', 'xpath': 'html/body/input', 'value': 'Ada'},
+				{'selector': '#missing', 'xpath': None, 'value': 'x'},
+			]
+		)
+		browser._input_text_element_node.assert_awaited_once_with(iframe_input, 'Lovelace')
+		assert 'Filled 2/3 fields' in result.extracted_content
+		assert '#missing: element not found' in result.extracted_content
+
+	@pytest.mark.asyncio
+	async def test_fill_fields_with_sensitive_data_through_registry(self):
+		"""
+		Secrets are substituted into the nested fields when fill_fields runs through execute_action,
+		and the result does not echo them, not even what a mismatching field shows.
+		"""
+		body = self._node('body')
+		password_input = self._node('input', parent=body, highlight_index=1)
+
+		browser = MagicMock()
+		browser.config.include_dynamic_attributes = True
+		browser.get_selector_map = AsyncMock(return_value={1: password_input})
+		browser._enhanced_css_selector_for_element = MagicMock(return_value='input#password')
+		browser._fill_elements = AsyncMock(
+			return_value=[
+				{'status': 'ok', 'value': 'hunter2', 'error': None},
+				{'status': 'mismatch', 'value': 'hunter', 'error': None},
+			]
+		)
+
+		controller = Controller()
+		result = await controller.registry.execute_action(
+			'fill_fields',
+			{
+				'fields': [
+					{'index': 1, 'value': '<secret>password</secret>'},
+					{'selector': '#confirm', 'value': '<secret>password</secret>'},
+				]
+			},
+			browser=browser,
+			sensitive_data={'password': 'hunter2'},
+		)
+
+		browser._fill_elements.assert_awaited_once_with(
+			[
+				{'selector': 'input#password', 'xpath': 'html/body/input', 'value': 'hunter2'},
+				{'selector': '#confirm', 'xpath': None, 'value': 'hunter2'},
+			]
+		)
+		assert 'hunter' not in result.extracted_content
+		assert '#confirm: input does not show the expected sensitive data' in result.extracted_content
+
+	def test_fill_field_requires_index_or_selector(self):
+		with pytest.raises(ValueError):
+			FillFieldsAction(fields=[{'value': 'no target'}])
+
+
+class TestFastReplay:
+	@staticmethod
+	def _history(controller):
+		action_model = controller.registry.create_action_model()
+		output_model = AgentOutput.type_with_custom_actions(action_model)
+		email = DOMHistoryElement(
+			'input',
+			'html/body/form/input[2]',
+			4,
+			['form', 'input'],
+			{'id': 'email', 'name': 'email'},
+			css_selector='html > body > form > input:nth-of-type(2)[id="email"]',
+		)
+		output = output_model(
+			current_state=AgentBrain(evaluation_previous_goal='', memory='', next_goal='fill'),
+			action=[
+				action_model(input_text={'index': 4, 'text': 'ada@example.com'}),
+				action_model(extract_content={'goal': 'read the form'}),
+				action_model(go_to_url={'url': 'https://example.com/next'}),
+			],
+		)
+		state = BrowserStateHistory(url='https://example.com', title='', tabs=[], interacted_element=[email, None, None])
+		return AgentHistoryList(history=[AgentHistory(model_output=output, result=[], state=state)])
+
+	def test_compile_history_builds_locators_and_skips_extraction(self):
+		history = self._history(Controller())
+
+		steps = compile_history(history)
+
+		assert [step.action_name for step in steps] == ['input_text', 'go_to_url']
+		assert steps[0].locator.selectors() == [
+			'html > body > form > input:nth-of-type(2)[id="email"]',
+			'xpath=/html/body/form/input[2]',
+			'input[id="email"]',
+			'input[name="email"]',
+		]
+		assert steps[1].locator is None
+		assert steps[0].action is not history.history[0].model_output.action[0]
+
+	@pytest.mark.asyncio
+	async def test_fast_rerun_acts_on_locators_without_dom_state(self):
+		"""
+		Steps whose recorded element is found by selector run directly on the locator,
+		other steps go through the controller, and no DOM state is built.
+		"""
+		controller = Controller()
+		history = self._history(controller)
+		browser_context = Mock(spec=BrowserContext)
+		browser_context.get_current_page = AsyncMock()
+		browser_context.get_state = AsyncMock()
+		locator = MagicMock()
+		locator.fill = AsyncMock()
+
+		agent = Agent(task='Apply', llm=Mock(spec=BaseChatModel), controller=controller, browser_context=browser_context)
+		agent.controller = Mock(wraps=controller)
+		agent.controller.act = AsyncMock(return_value=ActionResult(extracted_content='navigated'))
+
+		with patch('browser_use.agent.service.resolve_locator', AsyncMock(return_value=locator)):
+			results = await agent.fast_rerun_history(history)
+
+		locator.fill.assert_awaited_once_with('ada@example.com', timeout=5000)
+		agent.controller.act.assert_awaited_once()
+		browser_context.get_state.assert_not_called()
+		assert [result.error for result in results] == [None, None]
+
+
+	@pytest.mark.asyncio
+	async def test_fast_rerun_substitutes_sensitive_data(self):
+		"""Secrets in a replayed input_text step are typed as their values, not as placeholders"""
+		controller = Controller()
+		history = self._history(controller)
+		history.history[0].model_output.action[0].input_text.text = '<secret>email</secret>'
+		browser_context = Mock(spec=BrowserContext)
+		browser_context.get_current_page = AsyncMock()
+		browser_context.get_state = AsyncMock()
+		locator = MagicMock()
+		locator.fill = AsyncMock()
+
+		agent = Agent(
+			task='Apply',
+			llm=Mock(spec=BaseChatModel),
+			controller=controller,
+			browser_context=browser_context,
+			sensitive_data={'email': 'ada@example.com'},
+		)
+		agent.controller = Mock(wraps=controller)
+		agent.controller.act = AsyncMock(return_value=ActionResult(extracted_content='navigated'))
+
+		with patch('browser_use.agent.service.resolve_locator', AsyncMock(return_value=locator)):
+			results = await agent.fast_rerun_history(history)
+
+		locator.fill.assert_awaited_once_with('ada@example.com', timeout=5000)
+		assert 'ada@example.com' not in results[0].extracted_content
+		assert history.history[0].model_output.action[0].input_text.text == '<secret>email</secret>'
+
+
+class TestStateDiff:
+	@staticmethod
+	def _state(values, url='https://boards.example.com/apply'):
+		"""A form with one input per value, rebuilt from scratch like every get_state"""
+		body = DOMElementNode(tag_name='body', xpath='/body', attributes={}, children=[], is_visible=True, parent=None)
+		body.children.append(DOMTextNode(text='Apply for this job', is_visible=True, parent=body))
+		selector_map = {}
+		for i, (name, value) in enumerate(values.items()):
+			element = DOMElementNode(
+				tag_name='input',
+				xpath=f'html/body/input[{i + 1}]',
+				attributes={'name': name, 'value': value},
+				children=[],
+				is_visible=True,
+				parent=body,
+				highlight_index=i,
+			)
+			body.children.append(element)
+			selector_map[i] = element
+		return BrowserState(
+			element_tree=body,
+			selector_map=selector_map,
+			url=url,
+			title='Apply',
+			tabs=[TabInfo(page_id=0, url=url, title='Apply')],
+		)
+
+	def test_diff_steps_between_full_snapshots(self):
+		"""
+		The first state is sent in full and stays in history without its screenshot, the following
+		steps only list the elements that changed since, and every full_state_interval steps a new
+		full snapshot replaces the old one.
+		"""
+		manager = MessageManager(
+			task='Apply',
+			system_message=SystemMessage(content='system'),
+			settings=MessageManagerSettings(include_attributes=['name', 'value'], state_diff=True, full_state_interval=3),
+		)
+		values = {'first_name': '', 'last_name': '', 'email': ''}
+		n_initial = len(manager.state.history.messages)
+
+		manager.add_state_message(self._state(values))
+		full_message = manager.state.history.messages[-1]
+		assert '[1]<input last_name/>' in full_message.message.content
+		manager._remove_last_state_message()
+		assert manager.state.history.messages[-1] is full_message
+
+		values['first_name'] = 'Ada'
+		manager.add_state_message(self._state(values))
+		diff_text = manager.state.history.messages[-1].message.content
+		assert 'Changed elements' in diff_text and 'first_name' in diff_text and 'Ada' in diff_text
+		assert 'last_name' not in diff_text and 'Apply for this job' not in diff_text
+		manager._remove_last_state_message()
+		assert len(manager.state.history.messages) == n_initial + 1
+
+		# Diffs are relative to the snapshot in history, not to the previous step
+		manager.add_state_message(self._state(values))
+		repeated_text = manager.state.history.messages[-1].message.content
+		assert repeated_text.split('Current date')[0] == diff_text.split('Current date')[0]
+		manager._remove_last_state_message()
+
+		manager.add_state_message(self._state(values))
+		manager._remove_last_state_message()
+		messages = manager.state.history.messages
+		assert len(messages) == n_initial + 1 and messages[-1] is not full_message
+		assert '[1]<input last_name/>' in messages[-1].message.content
+
+	def test_new_url_sends_full_snapshot(self):
+		manager = MessageManager(
+			task='Apply',
+			system_message=SystemMessage(content='system'),
+			settings=MessageManagerSettings(include_attributes=['name'], state_diff=True),
+		)
+		manager.add_state_message(self._state({'email': ''}))
+		manager._remove_last_state_message()
+		manager.add_state_message(self._state({'email': ''}, url='https://boards.example.com/apply/2'))
+		assert 'Interactive elements from top layer' in manager.state.history.messages[-1].message.content
+
+
+class TestTokenAccounting:
+	@staticmethod
+	def _png_b64(width, height):
+		header = struct.pack('>I', 13) + b'IHDR' + struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+		return base64.b64encode(b'\x89PNG\r\n\x1a\n' + header + b'\x00' * 4).decode()
+
+	def test_pluggable_counter_is_memoized_per_text(self):
+		counter = Mock(side_effect=lambda text: len(text.split()))
+		manager = MessageManager(
+			task='Apply', system_message=SystemMessage(content='system'), settings=MessageManagerSettings(token_counter=counter)
+		)
+		calls = counter.call_count
+
+		assert manager._count_tokens(HumanMessage(content='one two three')) == 3
+		assert manager._count_tokens(HumanMessage(content='one two three')) == 3
+		assert counter.call_count == calls + 1
+
+	def test_tokenizer_loads_off_the_event_loop(self):
+		"""Counting starts with the characters estimate right away and switches to the encoding once it has loaded"""
+		released = threading.Event()
+		encoding = Mock(encode=Mock(side_effect=lambda text, disallowed_special: text.split()))
+
+		def load(model_name):
+			released.wait(5)
+			return encoding
+
+		with patch('browser_use.agent.message_manager.utils._load_tiktoken_encoding', side_effect=load):
+			counter = get_token_counter('slow-model', characters_per_token=3)
+			assert counter('one two three') == 4
+			released.set()
+			message_utils._encoding_threads['slow-model'].join(5)
+			# The estimate was not memoized, the same text is counted again with the encoding
+			assert counter('one two three') == 3
+			assert counter('one two three') == 3
+			assert encoding.encode.call_count == 1
+
+	def test_image_cost_from_dimensions(self):
+		manager = MessageManager(
+			task='Apply',
+			system_message=SystemMessage(content='system'),
+			settings=MessageManagerSettings(model_name='gpt-4o', token_counter=lambda text: 0, image_tokens=800),
+		)
+		small = f'data:image/png;base64,{self._png_b64(512, 512)}'
+		large = f'data:image/png;base64,{self._png_b64(1280, 1100)}'
+
+		def tokens(url):
+			return manager._count_tokens(HumanMessage(content=[{'type': 'image_url', 'image_url': {'url': url}}]))
+
+		assert tokens(small) == 85 + 170
+		assert tokens(large) == 85 + 170 * 4
+		assert tokens('https://example.com/screenshot.png') == 800
+		assert image_token_cost(1280, 1100, 'claude-3-5-sonnet') == 1600
+		assert image_token_cost(300, 200, 'gemini-2.0-flash') == 258
+
+
+class TestHistoryCompaction:
+	@staticmethod
+	def _manager(**settings):
+		return MessageManager(
+			task='Apply',
+			system_message=SystemMessage(content='system'),
+			settings=MessageManagerSettings(token_counter=lambda text: len(text), **settings),
+			state=MessageManagerState(),
+		)
+
+	@staticmethod
+	def _add_step(manager, step):
+		manager._add_message_with_tokens(HumanMessage(content=f'Action result: clicked button {step}'))
+		args = {
+			'current_state': {'memory': f'memory after step {step}', 'next_goal': f'goal {step}'},
+			'action': [{'click_element': {'index': step}}],
+		}
+		tool_calls = [{'name': 'AgentOutput', 'args': args, 'id': str(step)}]
+		manager._add_message_with_tokens(AIMessage(content='', tool_calls=tool_calls))
+		manager.add_tool_message(content='')
+
+	@pytest.mark.asyncio
+	async def test_older_steps_become_one_summary(self):
+		manager = self._manager(keep_recent_steps=2, max_input_tokens=1000, history_compaction_ratio=0.5)
+		initial = len(manager.state.history.messages)
+		for step in range(1, 7):
+			self._add_step(manager, step)
+		assert manager.needs_compaction()
+		recent = manager.state.history.messages[-6:]
+
+		assert await manager.compact_history()
+
+		messages = manager.state.history.messages
+		assert len(messages) == initial + 1 + 6
+		assert all(a is b for a, b in zip(messages[-6:], recent))
+		summary = messages[initial].message.content
+		assert summary.split('\n')[:4] == [
+			'[Summary of earlier steps]',
+			'Memory: memory after step 4',
+			'Action result: clicked button 1',
+			'Goal: goal 1 -> click_element({"index":1})',
+		]
+		assert 'goal 5' not in summary
+		assert manager.state.history.current_tokens == sum(m.metadata.tokens for m in messages)
+
+		# A second compaction folds the previous summary into the new one
+		for step in range(7, 9):
+			self._add_step(manager, step)
+		assert await manager.compact_history()
+		summary = manager.state.history.messages[initial].message.content
+		assert 'Memory: memory after step 6' in summary
+		assert 'goal 1 ' in summary and 'goal 6 ' in summary and 'goal 7' not in summary
+		assert summary.count('[Summary of earlier steps]') == 1
+
+	@pytest.mark.asyncio
+	async def test_summary_llm_with_fallback(self):
+		manager = self._manager(keep_recent_steps=1)
+		for step in range(1, 4):
+			self._add_step(manager, step)
+		llm = AsyncMock()
+		llm.ainvoke.side_effect = Exception('rate limited')
+		assert await manager.compact_history(llm)
+		assert 'Goal: goal 2' in manager.state.history.messages[-4].message.content
+
+		self._add_step(manager, 4)
+		llm.ainvoke.side_effect = None
+		llm.ainvoke.return_value = AIMessage(content='Clicked buttons 1 to 3.')
+		assert await manager.compact_history(llm)
+		assert manager.state.history.messages[-4].message.content == '[Summary of earlier steps]\nClicked buttons 1 to 3.'
+		assert not await manager.compact_history(llm)
+
+
+class TestPromptCaching:
+	def test_cache_breakpoints_on_copies(self):
+		manager = MessageManager(
+			task='Apply',
+			system_message=SystemMessage(content='system'),
+			settings=MessageManagerSettings(cache_marker=get_cache_marker('ChatAnthropic')),
+			state=MessageManagerState(),
+		)
+		TestHistoryCompaction._add_step(manager, 1)
+		manager._add_message_with_tokens(HumanMessage(content='current state'))
+
+		messages = manager.get_messages()
+		marked = [i for i, m in enumerate(messages) if isinstance(m.content, list) and 'cache_control' in m.content[-1]]
+		stored = manager.state.history.messages
+		placeholder = next(i for i, m in enumerate(stored) if m.message.content == '[Your task history memory starts here]')
+		# System prompt, end of the initial messages, and the last history message that can carry a marker
+		assert marked == [0, placeholder, len(messages) - 4]
+		assert messages[-4].content[-1]['text'] == 'Action result: clicked button 1'
+		assert all(isinstance(m.message.content, str) for m in stored if isinstance(m.message, HumanMessage))
+		assert not any(isinstance(m.content, list) for m in manager.get_messages(cache_markers=False))
+
+	def test_marker_skips_messages_without_text(self):
+		assert anthropic_cache_marker(AIMessage(content='')) is None
+		assert anthropic_cache_marker(HumanMessage(content='')) is None
+		image_only = HumanMessage(content=[{'type': 'image_url', 'image_url': {'url': 'https://example.com/a.png'}}])
+		assert anthropic_cache_marker(image_only) is None
+		assert get_cache_marker('ChatOpenAI') is None
+
+	def test_cached_token_metrics(self):
+		usage = {'input_tokens': 5000, 'output_tokens': 100, 'total_tokens': 5100, 'input_token_details': {'cache_read': 4200}}
+		agent = SimpleNamespace(_last_token_usage=usage)
+		assert Agent._prompt_cache_usage(agent) == {'cached_input_tokens': 4200, 'uncached_input_tokens': 800}  # type: ignore
+		assert Agent._prompt_cache_usage(SimpleNamespace(_last_token_usage=None)) == {}  # type: ignore
+
+
+class TestPipelinedStep:
+	@staticmethod
+	def _agent(**kwargs):
+		controller = Controller()
+		browser_context = Mock(spec=BrowserContext)
+		browser_context.get_state = AsyncMock(
+			side_effect=lambda include_screenshot: TestStateDiff._state({'email': ''}, url='https://example.com')
+		)
+		agent = Agent(task='Apply', llm=Mock(spec=BaseChatModel), controller=controller, browser_context=browser_context, **kwargs)
+		action_model = controller.registry.create_action_model()
+		agent.get_next_action = AsyncMock(
+			return_value=AgentOutput.type_with_custom_actions(action_model)(
+				current_state=AgentBrain(evaluation_previous_goal='', memory='', next_goal='fill'),
+				action=[action_model(scroll_down={'amount': 100})],
+			)
+		)
+		agent.multi_act = AsyncMock(return_value=[ActionResult(extracted_content='scrolled', include_in_memory=True)])
+		return agent
+
+	@pytest.mark.asyncio
+	async def test_next_state_is_prefetched_after_actions(self):
+		agent = self._agent(use_vision=False, prefetch_state=True)
+
+		await agent.step()
+		assert agent.browser_context.get_state.call_count == 2
+		prefetched = agent._next_state_task
+
+		await agent.step()
+		# The second step used the prefetched state and started the next capture
+		assert prefetched.done()
+		assert agent.browser_context.get_state.call_count == 3
+		assert agent._next_state_task is not prefetched
+
+		agent.pause()
+		assert agent._next_state_task is None
+		await agent._stop_pipeline()
+
+	@pytest.mark.asyncio
+	async def test_concurrent_planner_does_not_block_main_call(self):
+		planner = Mock(spec=BaseChatModel)
+		plan_released = asyncio.Event()
+
+		async def plan(messages):
+			await plan_released.wait()
+			return AIMessage(content='Fill in the email first')
+
+		planner.ainvoke = AsyncMock(side_effect=plan)
+		agent = self._agent(use_vision=False, planner_llm=planner, concurrent_planner=True, prefetch_state=False)
+
+		await agent.step()
+		agent.get_next_action.assert_awaited_once()
+		assert agent._plan_task is not None and not agent._plan_task.done()
+
+		plan_released.set()
+		await agent.step()
+		plans = [m.content for m in agent.message_manager.get_messages() if m.content == 'Fill in the email first']
+		assert len(plans) == 1
+		await agent._stop_pipeline()
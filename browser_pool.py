@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """Bounded pool of warm Chromium instances that hands out isolated contexts.
+
+    Each job gets its own BrowserContext (separate cookies/storage), but the
+    expensive Chromium process behind it is launched once and reused.
+    """
+
+    def __init__(self, size=2, browser_config=None, context_config=None, max_contexts_per_browser=4):
+        if size < 1:
+            raise ValueError("Browser pool size must be at least 1")
+        self.size = size
+        self.browser_config = browser_config or BrowserConfig(headless=False, disable_security=True)
+        self.context_config = context_config or BrowserContextConfig()
+        self.max_contexts_per_browser = max_contexts_per_browser
+
+        self._browsers = []
+        self._active = {}
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(size * max_contexts_per_browser)
+        self._started = False
+
+    async def start(self):
+        """Launch all browsers up front so the first jobs don't pay Chromium startup"""
+        async with self._lock:
+            if self._started:
+                return
+            self._browsers = [Browser(config=self.browser_config) for _ in range(self.size)]
+            await asyncio.gather(*(browser.get_playwright_browser() for browser in self._browsers))
+            self._active = {id(browser): 0 for browser in self._browsers}
+            self._started = True
+            logger.info(f"Browser pool started with {self.size} browser(s)")
+
+    async def _acquire_browser(self):
+        """Pick the least loaded browser, relaunching it if Chromium went away"""
+        async with self._lock:
+            index, browser = min(enumerate(self._browsers), key=lambda item: self._active[id(item[1])])
+            playwright_browser = browser.playwright_browser
+            if playwright_browser is None or not playwright_browser.is_connected():
+                logger.warning(f"Browser {index} in pool is disconnected, relaunching")
+                del self._active[id(browser)]
+                await browser.close()
+                browser = Browser(config=self.browser_config)
+                await browser.get_playwright_browser()
+                self._browsers[index] = browser
+                self._active[id(browser)] = 0
+            self._active[id(browser)] += 1
+            return browser
+
+    async def _release_browser(self, browser):
+        async with self._lock:
+            if id(browser) in self._active:
+                self._active[id(browser)] -= 1
+
+    @asynccontextmanager
+    async def context(self, config=None):
+        """Borrow an isolated BrowserContext; it is closed when the block exits"""
+        if not self._started:
+            await self.start()
+
+        async with self._slots:
+            browser = await self._acquire_browser()
+            browser_context = BrowserContext(browser=browser, config=config or self.context_config)
+            try:
+                yield browser_context
+            finally:
+                try:
+                    await browser_context.close()
+                except Exception as e:
+                    logger.debug(f"Failed to close pooled browser context: {e}")
+                await self._release_browser(browser)
+
+    async def close(self):
+        """Close every browser in the pool"""
+        async with self._lock:
+            await asyncio.gather(*(browser.close() for browser in self._browsers), return_exceptions=True)
+            self._browsers = []
+            self._active = {}
+            self._started = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS form_analyses (
+    board TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (board, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS form_analyses_lru ON form_analyses (last_used_at);
+"""
+
+
+def board_key(url):
+    """Job board host plus company slug, e.g. 'job-boards.greenhouse.io/affirm'"""
+    parsed = urlparse(url)
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    company = segments[0] if segments else ""
+    return f"{parsed.netloc.lower()}/{company}"
+
+
+def _label_for(soup, field):
+    field_id = field.get("id")
+    if field_id:
+        label = soup.find("label", attrs={"for": field_id})
+        if label:
+            return label.get_text(" ", strip=True)
+    parent_label = field.find_parent("label")
+    if parent_label:
+        return parent_label.get_text(" ", strip=True)
+    return field.get("aria-label") or field.get("placeholder") or ""
+
+
+def extract_form_structure(application_html):
+    """Reduce application HTML to the parts that determine how the form is filled
+
+    Returns a list of dicts with the id, name, tag, type, label and options of
+    every form field, in document order.
+    """
+    soup = BeautifulSoup(application_html, "html.parser")
+    fields = []
+    for field in soup.find_all(["input", "select", "textarea"]):
+        field_type = field.get("type", "").lower()
+        if field_type == "hidden":
+            continue
+        options = []
+        if field.name == "select":
+            options = [option.get_text(strip=True) for option in field.find_all("option")]
+        fields.append({
+            "id": field.get("id", ""),
+            "name": field.get("name", ""),
+            "tag": field.name,
+            "type": field_type,
+            "label": _label_for(soup, field),
+            "options": options,
+        })
+    return fields
+
+
+def fingerprint_form(application_html):
+    """Stable hash of the form structure; cosmetic HTML changes do not affect it"""
+    structure = extract_form_structure(application_html)
+    canonical = json.dumps(structure, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class FormAnalysisCache:
+    """On-disk cache of LLM form analyses keyed by job board and form fingerprint
+
+    Entries expire after ttl_seconds and the least recently used entries are
+    evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, db_path="form_cache.db", ttl_seconds=14 * 24 * 3600, max_entries=1000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, url, application_html):
+        """Cached analysis for this form, or None on a miss"""
+        board = board_key(url)
+        fingerprint = fingerprint_form(application_html)
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT analysis, created_at FROM form_analyses WHERE board = ? AND fingerprint = ?",
+            (board, fingerprint),
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        analysis, created_at = row
+        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+            with self.conn:
+                self.conn.execute("DELETE FROM form_analyses WHERE board = ? AND fingerprint = ?", (board, fingerprint))
+            self.misses += 1
+            return None
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE form_analyses SET last_used_at = ?, hits = hits + 1 WHERE board = ? AND fingerprint = ?",
+                (now, board, fingerprint),
+            )
+        self.hits += 1
+        logger.info(f"Form analysis cache hit for {board} ({fingerprint[:12]})")
+        return analysis
+
+    def put(self, url, application_html, analysis):
+        """Store an analysis and evict expired / least recently used entries"""
+        board = board_key(url)
+        fingerprint = fingerprint_form(application_html)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO form_analyses (board, fingerprint, analysis, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (board, fingerprint, analysis, now, now),
+            )
+            if self.ttl_seconds is not None:
+                self.conn.execute("DELETE FROM form_analyses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.conn.execute(
+                "DELETE FROM form_analyses WHERE rowid NOT IN "
+                "(SELECT rowid FROM form_analyses ORDER BY last_used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
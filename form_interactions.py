@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+
+from playwright.async_api import expect
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 5000  # ms
+POLL_INTERVAL = 0.05  # s
+
+# Rendered options of react-select and generic ARIA listboxes
+OPTION_SELECTOR = 'div[class*="select__option"], div[class*="select-option"], li[class*="dropdown-item"], [role="option"]'
+
+# An option list that stays open while several options are picked: ARIA multiselectable listboxes and
+# react-select multi inputs, whose menu sits next to an "is-multi" value container
+IS_MULTI_SELECT_JS = """(option) => {
+    let node = option;
+    for (let depth = 0; node && node !== document.body && depth < 4; depth++, node = node.parentElement) {
+        if (node.getAttribute("aria-multiselectable") === "true") return true;
+        if (node.querySelector('[class*="is-multi"], [aria-multiselectable="true"]')) return true;
+    }
+    return false;
+}"""
+
+# A multi-select option counts as committed once it is marked selected, or removed from the list
+# (react-select hides picked options), or shown as a selected chip
+MULTI_OPTION_COMMITTED_JS = """([option, text]) => {
+    if (!option.isConnected || option.offsetParent === null) return true;
+    if (option.getAttribute("aria-selected") === "true" || option.getAttribute("aria-checked") === "true") return true;
+    if (option.querySelector("input:checked")) return true;
+    const chips = document.querySelectorAll('[class*="multi-value"], [class*="multiValue"], [class*="chip"], [class*="tag"]');
+    return Array.from(chips).some((chip) => (chip.textContent || "").trim() === text);
+}"""
+
+# Elements Greenhouse and similar boards render once a file has been attached
+UPLOAD_INDICATOR_SELECTOR = 'div[class*="file-name"], span[class*="file-uploaded"], [class*="filename"], [class*="upload-success"]'
+
+
+async def wait_for_stable(locator, timeout=DEFAULT_TIMEOUT):
+    """Wait until the element is visible and its bounding box stops moving
+
+    Replaces a fixed sleep after scrolling or opening animations: returns as soon
+    as two consecutive polls report the same position and size.
+    """
+    await locator.wait_for(state="visible", timeout=timeout)
+    deadline = time.monotonic() + timeout / 1000
+    previous = None
+    while True:
+        box = await locator.bounding_box()
+        if box is not None and box == previous:
+            return box
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Element did not settle within {timeout}ms")
+        previous = box
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def scroll_into_view(locator, timeout=DEFAULT_TIMEOUT):
+    """Scroll the element into view and wait for it to settle"""
+    await locator.scroll_into_view_if_needed(timeout=timeout)
+    return await wait_for_stable(locator, timeout=timeout)
+
+
+async def fill_and_verify(locator, value, timeout=DEFAULT_TIMEOUT):
+    """Fill a text input in one step and wait until the value is committed"""
+    await locator.fill(value, timeout=timeout)
+    await expect(locator).to_have_value(value, timeout=timeout)
+
+
+async def click_when_ready(locator, timeout=DEFAULT_TIMEOUT):
+    """Click once the element is visible, stable and enabled"""
+    await scroll_into_view(locator, timeout=timeout)
+    await expect(locator).to_be_enabled(timeout=timeout)
+    await locator.click(timeout=timeout)
+
+
+async def wait_for_options(page, timeout=DEFAULT_TIMEOUT):
+    """Wait until an opened dropdown has rendered its option list"""
+    options = page.locator(OPTION_SELECTOR)
+    await options.first.wait_for(state="visible", timeout=timeout)
+    return options
+
+
+async def _click_option(page, option, selected_text, timeout):
+    """Click an option and wait until the choice is committed
+
+    Single selects commit by closing the list (or re-rendering without the
+    option). Multi-selects keep their list open, so there the option being
+    marked selected, removed or shown as a chip is waited for instead.
+    """
+    handle = await option.element_handle(timeout=timeout)
+    is_multi = await handle.evaluate(IS_MULTI_SELECT_JS)
+    await option.click(timeout=timeout)
+    try:
+        if is_multi:
+            await page.wait_for_function(MULTI_OPTION_COMMITTED_JS, arg=[handle, selected_text], timeout=timeout)
+        else:
+            await option.wait_for(state="hidden", timeout=timeout)
+    except Exception:
+        logger.debug(f"Could not confirm the selection of {selected_text!r}")
+    finally:
+        await handle.dispose()
+
+
+async def select_option_by_text(page, trigger, option_text, timeout=DEFAULT_TIMEOUT):
+    """Open a custom dropdown, click the option matching option_text and wait for it to close
+
+    Returns the text of the option that was clicked.
+    """
+    await click_when_ready(trigger, timeout=timeout)
+    options = await wait_for_options(page, timeout=timeout)
+    option = options.filter(has_text=option_text).first
+    await option.wait_for(state="visible", timeout=timeout)
+    selected_text = (await option.text_content() or "").strip()
+    await _click_option(page, option, selected_text, timeout)
+    return selected_text
+
+
+async def select_option_by_index(page, trigger, option_index, timeout=DEFAULT_TIMEOUT):
+    """Open a custom dropdown and click the option at option_index
+
+    Returns the text of the option that was clicked.
+    """
+    await click_when_ready(trigger, timeout=timeout)
+    options = await wait_for_options(page, timeout=timeout)
+    count = await options.count()
+    if option_index >= count:
+        raise IndexError(f"Option index {option_index} out of range (only {count} options found)")
+    option = options.nth(option_index)
+    selected_text = (await option.text_content() or "").strip()
+    await _click_option(page, option, selected_text, timeout)
+    return selected_text
+
+
+async def upload_file(page, locator, file_path, indicator_selector=UPLOAD_INDICATOR_SELECTOR, timeout=DEFAULT_TIMEOUT,
+                      indicator_timeout=2000):
+    """Attach a file and wait until the page acknowledges it
+
+    Waits for an upload indicator to render; if the page has none, the file
+    being present on the input is taken as success. Returns True if an
+    indicator was seen.
+    """
+    await locator.set_input_files(file_path, timeout=timeout)
+    if not await locator.evaluate("(input) => !!input.files && input.files.length > 0"):
+        raise RuntimeError(f"File input did not accept {file_path}")
+    try:
+        await page.locator(indicator_selector).first.wait_for(state="visible", timeout=indicator_timeout)
+        return True
+    except Exception:
+        logger.debug(f"No upload indicator appeared for {file_path}")
+        return False
@@ -0,0 +1,234 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+GREENHOUSE_HOSTS = ("job-boards.greenhouse.io", "boards.greenhouse.io")
+
+# Greenhouse's stable field ids and where their values live in job_config.yaml
+STANDARD_FIELDS = {
+    "first_name": ("personal_information", "name"),
+    "last_name": ("personal_information", "surname"),
+    "preferred_name": ("personal_information", "preferred_name"),
+    "email": ("personal_information", "email"),
+    "phone": ("personal_information", "phone"),
+}
+
+# Label phrases for custom `question_<id>` fields, checked in order (first match wins)
+LABEL_RULES = [
+    (("linkedin",), ("personal_information", "social_profiles", "linkedin")),
+    (("github",), ("personal_information", "social_profiles", "github")),
+    (("twitter",), ("personal_information", "social_profiles", "twitter")),
+    (("stack overflow", "stackoverflow"), ("personal_information", "social_profiles", "stackoverflow")),
+    (("portfolio", "website", "personal site"), ("personal_information", "social_profiles", "portfolio")),
+    (("current company", "current employer", "most recent employer"), ("personal_information", "current_company")),
+    (("preferred name", "preferred first name"), ("personal_information", "preferred_name")),
+    (("pronoun",), ("personal_information", "pronouns")),
+    (("zip", "postal code"), ("personal_information", "zip_code")),
+    (("street address", "address"), ("personal_information", "address")),
+    (("city",), ("personal_information", "city")),
+    (("state", "province"), ("personal_information", "state")),
+    (("country",), ("personal_information", "country")),
+    (("years of experience", "years of professional experience"), ("professional_profile", "years_of_experience")),
+    (("previously been employed", "previously employed", "worked at", "former employee"), ("professional_profile", "previous_employee")),
+]
+
+PARSE_FORM_JS = """
+() => {
+  const fields = [];
+  for (const el of document.querySelectorAll('input, select, textarea')) {
+    const type = (el.getAttribute('type') || '').toLowerCase();
+    if (['hidden', 'submit', 'button', 'reset', 'search'].includes(type)) continue;
+    if (!el.id) continue;
+
+    let label = '';
+    const forLabel = document.querySelector(`label[for="${CSS.escape(el.id)}"]`);
+    if (forLabel) label = forLabel.innerText;
+    if (!label && el.closest('label')) label = el.closest('label').innerText;
+    if (!label) label = el.getAttribute('aria-label') || el.getAttribute('placeholder') || '';
+
+    let kind = el.tagName.toLowerCase();
+    if (type === 'file') kind = 'file';
+    else if (type === 'checkbox' || type === 'radio') kind = type;
+    else if (el.classList.contains('select__input') || el.closest('.select__control') || el.getAttribute('role') === 'combobox') kind = 'react_select';
+
+    fields.push({
+      id: el.id,
+      name: el.getAttribute('name') || '',
+      kind: kind,
+      label: label.replace(/\\*/g, '').replace(/\\s+/g, ' ').trim(),
+      required: el.required || el.getAttribute('aria-required') === 'true',
+      filled: kind !== 'file' && kind !== 'checkbox' && kind !== 'radio' && !!el.value,
+    });
+  }
+  return fields;
+}
+"""
+
+
+def is_greenhouse_url(url):
+    return urlparse(url).netloc.lower() in GREENHOUSE_HOSTS
+
+
+def load_profile(config_path="job_config.yaml"):
+    """Load the applicant profile from job_config.yaml"""
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _lookup(profile, path):
+    value = profile
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+
+def _normalize_label(text):
+    """Lowercase words of a label or question, without punctuation"""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _selector(field_id):
+    escaped = field_id.replace("\\", "\\\\").replace('"', '\\"')
+    return f'[id="{escaped}"]'
+
+
+@dataclass
+class FillReport:
+    """Outcome of a direct fill pass over one form"""
+
+    filled: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    unmapped: list = field(default_factory=list)
+
+    @property
+    def needs_agent(self):
+        """Whether a required question is still open after the direct pass"""
+        return bool(self.failed) or any(form_field["required"] for form_field in self.unmapped)
+
+
+class GreenhouseFiller:
+    """Fills Greenhouse application forms directly through Playwright
+
+    Known fields are mapped from the job_config.yaml profile (and explicit
+    answers keyed by field id or question text) and filled in a single pass.
+    Anything that cannot be mapped or filled is reported back so the caller can
+    hand just those questions to the LLM agent.
+    """
+
+    def __init__(self, profile, answers=None, resume_path=None, option_timeout=3000):
+        self.profile = profile
+        self.answers = answers or {}
+        self.resume_path = resume_path or profile.get("resume_path")
+        self.option_timeout = option_timeout
+
+    def resolve_value(self, form_field):
+        """Value for a parsed form field, or None if the profile has no answer"""
+        field_id = form_field["id"]
+        label = form_field["label"].lower()
+
+        if form_field["kind"] == "file":
+            if field_id == "resume" or "resume" in label or "cv" in label.split():
+                return self.resume_path
+            return None
+
+        if field_id in self.answers:
+            return str(self.answers[field_id])
+        bare_id = field_id.removeprefix("question_")
+        if bare_id in self.answers:
+            return str(self.answers[bare_id])
+        # Exact question first, otherwise the longest question found as whole words ("gender" never matches "transgender")
+        normalized_label = _normalize_label(label)
+        best = None
+        for question, answer in self.answers.items():
+            normalized_question = _normalize_label(str(question))
+            if not normalized_question:
+                continue
+            if normalized_question == normalized_label:
+                return str(answer)
+            if re.search(rf"\b{re.escape(normalized_question)}\b", normalized_label):
+                if best is None or len(normalized_question) > len(best[0]):
+                    best = (normalized_question, answer)
+        if best is not None:
+            return str(best[1])
+
+        if field_id in STANDARD_FIELDS:
+            return _lookup(self.profile, STANDARD_FIELDS[field_id])
+
+        for phrases, path in LABEL_RULES:
+            if any(re.search(rf"\b{re.escape(phrase)}\b", label) for phrase in phrases):
+                return _lookup(self.profile, path)
+        return None
+
+    async def parse_form(self, page):
+        """Collect the fillable fields of the application form on the page"""
+        return await page.evaluate(PARSE_FORM_JS)
+
+    async def fill(self, page):
+        """Fill every mapped field on the current page and report the rest"""
+        report = FillReport()
+        for form_field in await self.parse_form(page):
+            if form_field["filled"]:
+                continue
+            value = self.resolve_value(form_field)
+            if value is None:
+                if form_field["required"] or form_field["kind"] not in ("checkbox", "radio"):
+                    report.unmapped.append(form_field)
+                continue
+            try:
+                await self._fill_field(page, form_field, value)
+                report.filled.append(form_field["id"])
+            except Exception as e:
+                logger.debug(f"Direct fill of {form_field['id']} failed: {e}")
+                report.failed[form_field["id"]] = str(e)
+
+        logger.info(
+            f"Greenhouse filler: {len(report.filled)} filled, {len(report.failed)} failed, {len(report.unmapped)} unmapped"
+        )
+        return report
+
+    async def _fill_field(self, page, form_field, value):
+        selector = _selector(form_field["id"])
+        kind = form_field["kind"]
+
+        if kind == "file":
+            if not value or not os.path.exists(value):
+                raise FileNotFoundError(f"Resume not found at {value}")
+            await page.set_input_files(selector, value)
+        elif kind == "react_select":
+            await self._select_react_option(page, selector, value)
+        elif kind == "select":
+            await page.select_option(selector, label=value)
+        elif kind in ("checkbox", "radio"):
+            if value.strip().lower() in ("yes", "true", "1", "checked"):
+                await page.check(selector)
+        else:
+            await page.fill(selector, value)
+
+    async def _select_react_option(self, page, selector, value):
+        """Open a react-select dropdown, filter it by typing and click the matching option"""
+        select_input = page.locator(selector)
+        await select_input.click()
+        await select_input.fill(value)
+        option = page.locator(".select__option", has_text=value).first
+        await option.wait_for(state="visible", timeout=self.option_timeout)
+        await option.click()
+
+    def describe_for_agent(self, report):
+        """Task text listing only what the direct pass could not handle"""
+        lines = []
+        for form_field in report.unmapped:
+            required = " (required)" if form_field["required"] else ""
+            lines.append(f"- {form_field['label'] or form_field['id']} [id={form_field['id']}, {form_field['kind']}]{required}")
+        for field_id, error in report.failed.items():
+            lines.append(f"- field id={field_id} could not be filled automatically ({error.splitlines()[0] if error else 'unknown error'})")
+        return "\n".join(lines)
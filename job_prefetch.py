@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+}
+
+# Potential selectors for application containers, tried in order
+APPLICATION_SELECTORS = [
+    {"class": "application--container"},
+    {"id": "main_fields"},
+    {"class": "application-form"},
+    {"class": "job-application"},
+    {"id": "application-form"},
+    {"class": "greenhouse-job-application"},
+]
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def default_parser():
+    """lxml when it is installed (several times faster), html.parser otherwise"""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def extract_application_container(html, url, parser="html.parser"):
+    """Find the application form container in a job page, or None"""
+    soup = BeautifulSoup(html, parser)
+    for selector in APPLICATION_SELECTORS:
+        container = soup.find("div", selector)
+        if container:
+            return {
+                "application_html": str(container),
+                "url": url,
+                "selector_used": selector,
+            }
+    logger.warning(f"No application container found for {url}")
+    return None
+
+
+class ConditionalGetCache:
+    """On-disk store of page bodies with their ETag / Last-Modified validators"""
+
+    def __init__(self, db_path="http_cache.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body = row
+        return {"etag": etag, "last_modified": last_modified, "body": body}
+
+    def validators(self, url):
+        """Conditional request headers for a cached URL"""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            # Nothing to revalidate against, so a cached copy would never be reused
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, response.text, time.time()),
+            )
+
+
+class JobPagePrefetcher:
+    """Fetches and parses job pages ahead of the browser stage
+
+    All requests share one pooled httpx client (keep-alive, bounded
+    connections, at most max_per_host in flight per host). Transient failures
+    are retried with exponential backoff, and pages are revalidated against the
+    on-disk cache so unchanged pages cost a 304 instead of a full download.
+    Parsing runs in a worker thread so it never blocks the event loop.
+    At most lookahead pages are fetched or held in memory ahead of get(); the
+    window moves on as pages are consumed.
+    """
+
+    def __init__(self, cache_path="http_cache.db", max_connections=10, max_per_host=4, retries=3,
+                 backoff=0.5, timeout=10, parser=None, lookahead=8):
+        self.lookahead = lookahead
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.parser = parser or default_parser()
+        self.cache = ConditionalGetCache(cache_path) if cache_path else None
+        self.revalidated = 0
+
+        self._client = None
+        self._host_slots = {}
+        self._tasks = {}
+        self._upcoming = deque()
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+
+    async def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks = {}
+        self._upcoming.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.cache is not None:
+            self.cache.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_slots[host]
+
+    async def fetch_html(self, url):
+        """GET a page with retries and conditional revalidation; returns the body text"""
+        await self.start()
+        headers = self.cache.validators(url) if self.cache else {}
+
+        async with self._host_slot(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self._client.get(url, headers=headers)
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        break
+                    error = httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+                except httpx.TransportError as e:
+                    error = e
+                if attempt == self.retries:
+                    raise error
+                delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                logger.debug(f"Retrying {url} in {delay:.2f}s after: {error}")
+                await asyncio.sleep(delay)
+
+        if response.status_code == 304 and self.cache:
+            self.revalidated += 1
+            return self.cache.get(url)["body"]
+
+        response.raise_for_status()
+        if self.cache:
+            self.cache.put(url, response)
+        return response.text
+
+    async def extract_job_details(self, url):
+        """Async counterpart of extract_job_details: fetch and parse one job page"""
+        try:
+            html = await self.fetch_html(url)
+            return await asyncio.to_thread(extract_application_container, html, url, self.parser)
+        except httpx.HTTPError as e:
+            logger.error(f"Network error for {url}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error extracting application container from {url}: {e}")
+            return None
+
+    def prefetch(self, urls):
+        """Queue pages to fetch and parse in the background, in the order they will be consumed"""
+        self._upcoming.extend(url for url in urls if url not in self._tasks)
+        self._fill()
+
+    def _fill(self):
+        """Start prefetches for the next queued pages until lookahead of them are running or waiting"""
+        while self._upcoming and len(self._tasks) < self.lookahead:
+            url = self._upcoming.popleft()
+            if url not in self._tasks:
+                self._tasks[url] = asyncio.create_task(self.extract_job_details(url))
+
+    def discard(self, url):
+        """Drop a page that will not be consumed, so it stops holding a slot of the window"""
+        task = self._tasks.pop(url, None)
+        if task is not None:
+            task.cancel()
+        try:
+            self._upcoming.remove(url)
+        except ValueError:
+            pass
+        self._fill()
+
+    async def get(self, url):
+        """Job details for a URL, waiting on its prefetch if one is running"""
+        task = self._tasks.pop(url, None)
+        if task is None:
+            try:
+                self._upcoming.remove(url)
+            except ValueError:
+                pass
+        self._fill()
+        if task is None:
+            return await self.extract_job_details(url)
+        return await task
@@ -0,0 +1,188 @@
+import csv
+import json
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+# How each queue state is written to the CSV `Status` column (and read back on ingest)
+STATUS_LABELS = {
+    PENDING: "",
+    IN_PROGRESS: "In progress",
+    DONE: "Applied",
+    FAILED: "Failed",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    url TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    row_json TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, position);
+"""
+
+
+class JobQueue:
+    """Durable SQLite-backed queue of job application URLs
+
+    Every URL moves through pending -> in_progress -> done/failed. State is
+    committed on each transition, so a crashed run can be restarted and will
+    only pick up work that has not finished yet.
+    """
+
+    def __init__(self, db_path="job_queue.db", max_attempts=3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def ingest_csv(self, csv_path, url_column="URL"):
+        """Add CSV rows to the queue; URLs already known keep their state
+
+        Returns the number of newly added URLs.
+        """
+        label_to_state = {label.lower(): state for state, label in STATUS_LABELS.items() if label}
+        added = 0
+        now = time.time()
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            with self.conn:
+                for position, row in enumerate(reader):
+                    url = (row.get(url_column) or "").strip()
+                    if not url:
+                        continue
+                    status = (row.get("Status") or "").strip().lower()
+                    state = label_to_state.get(status, PENDING)
+                    if state == IN_PROGRESS:
+                        state = PENDING
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO jobs (url, position, row_json, state, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (url, position, json.dumps(row), state, now),
+                    )
+                    added += cursor.rowcount
+        logger.info(f"Ingested {added} new job(s) from {csv_path}")
+        return added
+
+    def requeue_interrupted(self):
+        """Return jobs left in_progress by a crashed run to pending"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, started_at = NULL WHERE state = ?",
+                (PENDING, IN_PROGRESS),
+            )
+        if cursor.rowcount:
+            logger.info(f"Requeued {cursor.rowcount} interrupted job(s)")
+        return cursor.rowcount
+
+    def pending_urls(self, retry_failed=True):
+        """URLs still to be processed, in CSV order"""
+        if retry_failed:
+            rows = self.conn.execute(
+                "SELECT url FROM jobs WHERE state = ? OR (state = ? AND attempts < ?) ORDER BY position",
+                (PENDING, FAILED, self.max_attempts),
+            )
+        else:
+            rows = self.conn.execute("SELECT url FROM jobs WHERE state = ? ORDER BY position", (PENDING,))
+        return [row["url"] for row in rows]
+
+    def mark_in_progress(self, url):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, started_at = ?, finished_at = NULL WHERE url = ?",
+                (IN_PROGRESS, time.time(), url),
+            )
+
+    def mark_done(self, url):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, last_error = NULL WHERE url = ?",
+                (DONE, time.time(), url),
+            )
+
+    def mark_failed(self, url, error=None):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, last_error = ? WHERE url = ?",
+                (FAILED, time.time(), error, url),
+            )
+
+    def get(self, url):
+        """Full queue record for a URL, or None if unknown"""
+        row = self.conn.execute("SELECT * FROM jobs WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """Number of jobs in each state"""
+        counts = {state: 0 for state in STATUS_LABELS}
+        for row in self.conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+            counts[row["state"]] = row["n"]
+        return counts
+
+    def export_csv(self, csv_path, url_column="URL"):
+        """Fill in the Status column of csv_path from the queue
+
+        Every row of an existing file is kept as is, including rows without a
+        URL or with a duplicate one; only the Status of queued URLs changes.
+        Queued jobs missing from the file are appended.
+        """
+        statuses = {}
+        queued = []
+        for row in self.conn.execute("SELECT url, row_json, state FROM jobs ORDER BY position"):
+            statuses[row["url"]] = STATUS_LABELS.get(row["state"], row["state"])
+            queued.append((row["url"], json.loads(row["row_json"])))
+
+        records = []
+        fieldnames = []
+        try:
+            with open(csv_path, newline="", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                fieldnames = list(reader.fieldnames or [])
+                records = list(reader)
+        except FileNotFoundError:
+            pass
+
+        seen = set()
+        for record in records:
+            url = (record.get(url_column) or "").strip()
+            if url in statuses:
+                record["Status"] = statuses[url]
+                seen.add(url)
+        for url, record in queued:
+            if url not in seen:
+                record["Status"] = statuses[url]
+                records.append(record)
+        for record in records:
+            for key in record:
+                if key not in fieldnames:
+                    fieldnames.append(key)
+
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames or [url_column, "Status"], restval="")
+            writer.writeheader()
+            writer.writerows(records)
+        logger.info(f"Exported status of {len(statuses)} job(s) to {csv_path}")